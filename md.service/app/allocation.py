@@ -0,0 +1,144 @@
+"""
+Rezervasyon tahsis motoru (POST /stock/bulk-reserve).
+- Her kalemin bekleyen ("Beklemede") rezervasyonları düşülme sırasında sıralı bir listede tutulur
+  (ekleme / silme bisect ile). Talep sırası: yüksek `priority` önce, aynı öncelikte önce
+  oluşturulan önce (FIFO), sonra id.
+- Tüketim kalemin serbest stoğunu aşarsa eksik kısım diğer işlerin rezervasyonlarından, sıranın
+  sonundan (en düşük öncelikli, en yeni) başlanarak düşülür; en eski talep en son etkilenir.
+  İstek içinde her düşme O(log n) yığın işlemidir.
+- Etki raporu deterministiktir: aynı veriyle aynı rezervasyonlar aynı sırada, aynı miktarda etkilenir.
+ReservationQueues, import sırasında reservations.json'un "pending" arama indeksi olarak kaydedilir
+(data_loader.register_search_index); kayıt yazmalarında add/remove ile güncel tutulur. Allocator
+bir isteğin çalışma kopyasıdır.
+"""
+import heapq
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Iterable, Optional
+
+from .data_loader import register_search_index
+
+PENDING = "Beklemede"
+CANCELLED = "İptal"
+
+
+def _timestamp(created_at: Optional[str]) -> float:
+  try:
+    return datetime.fromisoformat(created_at).timestamp()
+  except (TypeError, ValueError):
+    return float("-inf")  # tarihsiz eski kayıt: en eski talep sayılır
+
+
+def steal_key(reservation: dict) -> tuple:
+  """Küçük anahtar önce düşülür: düşük öncelik, sonra en yeni"""
+  return (reservation.get("priority") or 0, -_timestamp(reservation.get("createdAt")), reservation.get("id"))
+
+
+def _pending(reservation: dict) -> bool:
+  return reservation.get("status") == PENDING and (reservation.get("qty") or 0) > 0
+
+
+class ReservationQueues:
+  """Kalem başına bekleyen rezervasyon anahtarları, düşülme sırasında sıralı listeler"""
+
+  def __init__(self, records: Iterable[dict] = ()):
+    self._queues: dict[str, list[tuple]] = {}
+    self._live: dict[str, tuple] = {}  # id -> (itemId, anahtar)
+    for rec in records:
+      key = self._track(rec)
+      if key is not None:
+        self._queues.setdefault(rec.get("itemId"), []).append(key)
+    for queue in self._queues.values():
+      queue.sort()
+
+  def _track(self, record: dict) -> Optional[tuple]:
+    if record.get("id") is None or not _pending(record) or record["id"] in self._live:
+      return None
+    key = steal_key(record)
+    self._live[record["id"]] = (record.get("itemId"), key)
+    return key
+
+  def add(self, record: dict) -> None:
+    key = self._track(record)
+    if key is not None:
+      insort(self._queues.setdefault(record.get("itemId"), []), key)
+
+  def remove(self, rec_id: str) -> None:
+    live = self._live.pop(rec_id, None)
+    if live is None:
+      return
+    item_id, key = live
+    queue = self._queues[item_id]
+    idx = bisect_left(queue, key)
+    if idx < len(queue) and queue[idx] == key:
+      del queue[idx]
+    if not queue:
+      del self._queues[item_id]
+
+  def search(self, item_id: str) -> list[str]:
+    """Kalemin bekleyen rezervasyon id'leri, düşülme sırasıyla"""
+    return [key[2] for key in self._queues.get(item_id, ())]
+
+
+register_search_index("reservations.json", "pending", ReservationQueues)
+
+
+class Allocator:
+  """
+  Bir isteğin tahsis durumu: kalem kuyrukları ilk kullanımda `load(item_id)` ile (düşülme
+  sırasında kayıt listesi) doldurulur; düşülen kayıtlar `changed` içinde birikir.
+  """
+
+  def __init__(self, load):
+    self._load = load
+    self._queues: dict[str, list[tuple]] = {}
+    self.changed: dict[str, dict] = {}
+
+  def _queue(self, item_id: str) -> list[tuple]:
+    queue = self._queues.get(item_id)
+    if queue is None:
+      # sıralı liste zaten geçerli bir yığındır
+      queue = self._queues[item_id] = [(steal_key(rec), rec) for rec in self._load(item_id)]
+    return queue
+
+  def steal(self, item_id: str, amount: float, job_id: str) -> list[dict]:
+    """`job_id` dışındaki işlerin bekleyen rezervasyonlarından `amount` kadar düşer; etkilenenler sırayla"""
+    queue = self._queue(item_id)
+    impacts = []
+    own = []
+    while amount > 0 and queue:
+      key, rsv = heapq.heappop(queue)
+      if rsv.get("jobId") == job_id:
+        own.append((key, rsv))
+        continue
+      reduce_by = min(rsv.get("qty") or 0, amount)
+      amount -= reduce_by
+      rsv["qty"] = (rsv.get("qty") or 0) - reduce_by
+      rsv["affectedBy"] = job_id
+      rsv["note"] = f"Stok başka iş için kullanıldı (-{reduce_by})"
+      if rsv["qty"] <= 0:
+        rsv["status"] = CANCELLED
+      else:
+        heapq.heappush(queue, (key, rsv))
+      self.changed[rsv["id"]] = rsv
+      impacts.append({
+        "reservationId": rsv.get("id"),
+        "jobId": rsv.get("jobId"),
+        "reducedBy": reduce_by,
+        "remainingQty": rsv["qty"],
+        "cancelled": rsv["status"] == CANCELLED,
+      })
+    for entry in own:
+      heapq.heappush(queue, entry)
+    return impacts
+
+
+def impact_report(lines: list[dict]) -> list[dict]:
+  """Satırların etkilediği rezervasyonlar iş bazında (jobId sırası)"""
+  jobs: dict[str, dict] = {}
+  for line in lines:
+    for impact in line.get("affectedReservations", ()):
+      job = jobs.setdefault(impact["jobId"], {"jobId": impact["jobId"], "totalReduced": 0, "reservations": []})
+      job["totalReduced"] += impact["reducedBy"]
+      job["reservations"].append({"itemId": line["itemId"], **impact})
+  return [jobs[job_id] for job_id in sorted(jobs, key=lambda j: (j is None, j or ""))]
@@ -0,0 +1,108 @@
+"""
+İçerik adresli belge deposu (SHA-256).
+- Her içerik bir kez saklanır: md.docs/blobs/<özetin ilk 2 hanesi>/<sha256>. Belge kaydının `path`
+  alanı blobu gösterir ("blobs/ab/ab12..."), `sha256` alanı özeti taşır.
+- Referans sayısı ayrıca tutulmaz, documents.json'dan gelir: `sha256` INDEXES'te tanımlıdır,
+  sayım O(1). Sadece `path`i blobu gösteren kayıtlar sayılır (eski, klasörde duran dosyalar sayılmaz).
+- Aynı içerik tekrar yüklenirse blob zaten vardır: geçici dosya silinir, ikinci yazma olmaz.
+- Blob, ona bağlı son belge kaydı silinince silinir.
+Blob ekleme / silme ve belge kaydı yazma documents.json kilidi altında yapılır; aynı içeriğin
+eşzamanlı yüklenmesi ya da silinmesi birbirini bozmaz.
+Eski belgeleri depoya taşımak için: python -m app.blobs
+"""
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+from .data_loader import collection_lock, count_records, load_json, update_one
+from .uploads import Upload
+
+DOCUMENTS = "documents.json"
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobStore:
+  """`root` (md.docs) altındaki `folder` dizininde SHA-256 adlı, değişmez dosyalar"""
+
+  def __init__(self, root: Path, folder: str = "blobs"):
+    self.root = root
+    self.folder = folder
+
+  def relative(self, sha256: str) -> str:
+    """Belge kaydındaki `path` değeri (root'a göre)"""
+    return f"{self.folder}/{sha256[:2]}/{sha256}"
+
+  def path(self, sha256: str) -> Path:
+    return self.root / self.relative(sha256)
+
+  def references(self, sha256: str) -> int:
+    relative = self.relative(sha256)
+    return count_records(DOCUMENTS, "sha256", sha256, lambda doc: doc.get("path") == relative)
+
+  def put(self, upload: Upload) -> bool:
+    """
+    Yüklemeyi depoya alır; içerik yeniyse geçici dosya blob olarak taşınır (True), zaten varsa
+    geçici dosya silinir (False). documents.json kilidi altında çağrılmalıdır.
+    """
+    target = self.path(upload.sha256)
+    if target.exists():
+      upload.discard()
+      return False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    upload.move_to(target)
+    return True
+
+  def release(self, sha256: str) -> bool:
+    """Referansı kalmamış blobu siler (silindiyse True). documents.json kilidi altında çağrılmalıdır."""
+    if self.references(sha256):
+      return False
+    self.path(sha256).unlink(missing_ok=True)
+    return True
+
+
+def _hash_file(path: Path) -> str:
+  digest = hashlib.sha256()
+  with open(path, "rb") as f:
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+
+def migrate(store: BlobStore) -> dict:
+  """
+  Klasörlerde duran eski belgeleri depoya taşır: dosya özetlenir, içerik depoda yoksa blob olarak
+  taşınır, varsa kopya silinir; kayıttaki path / sha256 güncellenir. Tekrar çalıştırılabilir.
+  """
+  moved = deduplicated = missing = 0
+  for doc in load_json(DOCUMENTS):
+    if doc.get("sha256") and doc.get("path") == store.relative(doc["sha256"]):
+      continue
+    source = store.root / doc.get("path", "")
+    if not doc.get("path") or not source.is_file():
+      missing += 1
+      continue
+    sha256 = _hash_file(source)
+    with collection_lock(DOCUMENTS):
+      target = store.path(sha256)
+      if target.exists():
+        deduplicated += 1
+      else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, target)
+        moved += 1
+      update_one(DOCUMENTS, doc["id"], {"path": store.relative(sha256), "sha256": sha256})
+      source.unlink(missing_ok=True)
+  return {"moved": moved, "deduplicated": deduplicated, "missing": missing}
+
+
+def main() -> int:
+  from .routers.documents import BLOBS
+
+  result = migrate(BLOBS)
+  print(f"taşınan: {result['moved']}, tekrar eden (silinen kopya): {result['deduplicated']}, dosyası olmayan: {result['missing']}")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
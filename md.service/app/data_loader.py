@@ -1,8 +1,95 @@
-import json
+import hashlib
+from bisect import bisect_left, insort
 import os
+import pickle
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
 from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+from .storage.journal import apply_ops, delete_op, insert_op, patch_op
+from .storage.locks import CollectionLocks
+
+# Lock name serializing appends to the change feed (never held while taking collection locks)
+EVENTS_LOCK = "events"
+
+# Every record written through the data layer carries a revision counter;
+# its ETag is the quoted revision ("3"). Records never written yet count as 0.
+REV_FIELD = "_rev"
+
+
+# Declarative secondary indexes: collection -> indexed fields (foreign keys).
+# find_by() answers equality lookups on these from the cache instead of scanning.
+INDEXES: dict[str, tuple[str, ...]] = {
+  "assemblyTasks.json": ("jobId", "teamId"),
+  "documents.json": ("jobId", "sha256"),
+  "productionOrders.json": ("jobId", "supplierId"),
+  "purchaseOrders.json": ("supplierId",),
+  "reservations.json": ("jobId", "itemId"),
+  "stockCountLines.json": ("sessionId",),
+  "stockItems.json": ("supplierId",),
+  "stockMovements.json": ("itemId", "jobId"),
+  "supplierTransactions.json": ("supplierId",),
+  "task_assignments.json": ("taskId",),
+  "team_members.json": ("teamId",),
+}
+
+# Segmented collections ("stockMovements-2026-01.json", see app/ledger.py) share the
+# INDEXES declaration of their family ("stockMovements.json").
+_SEGMENT_SUFFIX = re.compile(r"-\d{4}-\d{2}(?=\.json$)")
+
+# Unique composite indexes: collection -> name -> fields. A write that would give two
+# records the same key (all fields set) raises DuplicateKeyError; get_by_key() is O(1).
+UNIQUE_INDEXES: dict[str, dict[str, tuple[str, ...]]] = {
+  "stockCountLines.json": {"item": ("sessionId", "itemId")},
+  "stockItems.json": {"code": ("productCode", "colorCode")},
+}
+
+# Search indexes: collection -> name -> index class. The index is built from the records
+# on first use and kept current through add(record) / remove(id); see search_records().
+SEARCH_INDEXES: dict[str, dict[str, Callable[..., Any]]] = {}
+
+# Derived fields stored on the records of a collection: collection -> record -> fields.
+# They are recomputed on every write that goes through the data layer (and filled in
+# for records loaded without them), so readers never compute them.
+COMPUTED: dict[str, Callable[[dict], dict]] = {}
+
+# Sorted partial indexes: collection -> name -> sort key of a record (None: not indexed).
+# sorted_index() returns the indexed records in key order; writes keep it sorted.
+# sorted_records() pages them without copying the collection (keyset cursors).
+SORTED_INDEXES: dict[str, dict[str, Callable[[dict], Any]]] = {}
+
+# COMPUTED, SORTED_INDEXES and SEARCH_INDEXES hold domain logic: the modules that own it
+# register it at import (register_computed() etc.), the data layer imports none of them.
+
+
+def register_computed(filename: str, compute: Callable[[dict], dict]) -> None:
+  """Declare the COMPUTED fields of a collection; a cached copy without them is dropped."""
+  COMPUTED[filename] = compute
+  with _cache_lock:
+    _cache.pop(filename, None)
+
+
+def register_sorted_index(filename: str, name: str, key: Callable[[dict], Any]) -> None:
+  """Declare a sorted index (see SORTED_INDEXES); it is built on first use."""
+  SORTED_INDEXES.setdefault(filename, {})[name] = key
+
+
+def register_search_index(filename: str, name: str, factory: Callable[..., Any]) -> None:
+  """Declare a search index (see SEARCH_INDEXES); it is built on first use."""
+  SEARCH_INDEXES.setdefault(filename, {})[name] = factory
+
+
+class ConflictError(Exception):
+  """A record was changed by someone else since it was read (HTTP 409)."""
+
+
+class DuplicateKeyError(ConflictError):
+  """A write would break a unique index declared in UNIQUE_INDEXES (HTTP 409)."""
 
 
 @lru_cache(maxsize=None)
@@ -14,37 +101,1058 @@ def get_data_dir() -> Path:
   return Path(__file__).resolve().parent.parent.parent / "md.data"
 
 
+@lru_cache(maxsize=None)
+def get_backend():
+  # DATA_BACKEND=json (default) | sqlite, see app/storage
+  from .storage import create_backend
+  return create_backend(get_data_dir())
+
+
+@lru_cache(maxsize=None)
+def get_locks() -> CollectionLocks:
+  return CollectionLocks(get_data_dir())
+
+
+def collection_lock(*filenames: str):
+  """Exclusive cross-process write lock on one or more collections (re-entrant per thread)."""
+  return get_locks().hold(*filenames)
+
+
+def _copy(value: Any) -> Any:
+  # pickle round-trip: the fastest deep copy for plain JSON values
+  return pickle.loads(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class _Entry:
+  """
+  Cached collection. `data` is private to the data layer and never handed out;
+  callers get their own copy from the pickled snapshot, so in-place mutations
+  in routers can never leak back into the cache. Record lists also get an
+  id -> record index and per-field secondary indexes (field -> value -> records
+  in collection order), built on first use and kept current by `apply`, as are
+  the sorted indexes (name -> (key, [(sort key, id)], id -> sort key)) and the
+  unique indexes (name -> (fields, key -> record)) and search indexes.
+  """
+  __slots__ = ("signature", "data", "_blob", "_ids", "_by", "_sorted", "_unique", "_search")
+
+  def __init__(self, signature: tuple, data: Any):
+    self.signature = signature
+    self.data = data
+    self._blob = None
+    self._ids = None
+    self._by: dict[str, dict[Any, list[dict]]] = {}
+    self._sorted: dict[str, tuple[Callable[[dict], Any], list[tuple], dict]] = {}
+    self._unique: dict[str, tuple[tuple[str, ...], dict[tuple, dict]]] = {}
+    self._search: dict[str, Any] = {}
+
+  def ids(self) -> dict | None:
+    if self._ids is None and isinstance(self.data, list):
+      # reversed: with duplicate ids the first record wins, like a linear scan
+      self._ids = {rec["id"]: rec for rec in reversed(self.data) if isinstance(rec, dict) and "id" in rec}
+    return self._ids
+
+  def by(self, field: str) -> dict[Any, list[dict]]:
+    index = self._by.get(field)
+    if index is None:
+      index = {}
+      if isinstance(self.data, list):
+        for rec in self.data:
+          if isinstance(rec, dict) and _indexable(rec.get(field)):
+            index.setdefault(rec.get(field), []).append(rec)
+      self._by[field] = index
+    return index
+
+  def sorted(self, name: str, key: Callable[[dict], Any]) -> list[dict]:
+    ids = self.ids()
+    if ids is None:
+      return []
+    index = self._sorted.get(name)
+    if index is None:
+      keys = {}
+      for rec_id, rec in ids.items():
+        sort_key = key(rec)
+        if sort_key is not None:
+          keys[rec_id] = sort_key
+      index = (key, sorted((sort_key, rec_id) for rec_id, sort_key in keys.items()), keys)
+      self._sorted[name] = index
+    return [ids[rec_id] for _, rec_id in index[1]]
+
+  def unique(self, name: str, fields: tuple[str, ...]) -> dict[tuple, dict]:
+    index = self._unique.get(name)
+    if index is None:
+      keys = {}
+      if isinstance(self.data, list):
+        # reversed: with duplicate keys the first record wins, like ids()
+        for rec in reversed(self.data):
+          key = _unique_key(rec, fields) if isinstance(rec, dict) else None
+          if key is not None:
+            keys[key] = rec
+      index = (fields, keys)
+      self._unique[name] = index
+    return index[1]
+
+  def search(self, name: str, factory: Callable[..., Any]) -> Any:
+    index = self._search.get(name)
+    if index is None:
+      ids = self.ids() or {}
+      index = self._search[name] = factory(ids.values())
+    return index
+
+  def apply(self, ops: list[dict]) -> None:
+    """apply_ops on the cached data, keeping the indexes built so far in step."""
+    ids = self.ids()
+    if (not self._by and not self._sorted and not self._unique and not self._search) or ids is None:
+      apply_ops(self.data, ops, ids)
+      return
+    for op in ops:
+      record_id = op["record"].get("id") if op["op"] == "insert" else op["id"]
+      old = ids.get(record_id)
+      before = {field: old.get(field) for field in self._by} if old is not None else None
+      old_keys = {name: _unique_key(old, fields) if old is not None else None
+                  for name, (fields, _) in self._unique.items()}
+      apply_ops(self.data, [op], ids)
+      new = ids.get(record_id)
+      for field in list(self._by):
+        index = self._by[field]
+        if old is None and new is not None:
+          if _indexable(new.get(field)):
+            bucket = index.setdefault(new.get(field), [])
+            if op.get("at") == "end":
+              bucket.append(new)
+            else:
+              bucket.insert(0, new)
+        elif old is not None and new is None:
+          bucket = index.get(before[field]) if _indexable(before[field]) else None
+          if bucket:
+            bucket[:] = [rec for rec in bucket if rec is not old]
+        elif old is not None and before[field] != new.get(field):
+          # moved to another key: its place among that key's records is unknown, rebuild lazily
+          del self._by[field]
+      for key, order, keys in self._sorted.values():
+        old_key = keys.pop(record_id, None)
+        if old_key is not None:
+          del order[bisect_left(order, (old_key, record_id))]
+        new_key = key(new) if new is not None else None
+        if new_key is not None:
+          keys[record_id] = new_key
+          insort(order, (new_key, record_id))
+      for name, (fields, keys) in self._unique.items():
+        old_key = old_keys[name]
+        if old_key is not None and keys.get(old_key) is old:
+          del keys[old_key]
+        new_key = _unique_key(new, fields) if new is not None else None
+        if new_key is not None:
+          keys.setdefault(new_key, new)
+      for index in self._search.values():
+        if old is not None:
+          index.remove(record_id)
+        if new is not None:
+          index.add(new)
+
+  def blob(self) -> bytes:
+    if self._blob is None:
+      self._blob = pickle.dumps(self.data, protocol=pickle.HIGHEST_PROTOCOL)
+    return self._blob
+
+  def changed(self, signature: tuple) -> None:
+    self.signature = signature
+    self._blob = None
+
+
+def _indexable(value: Any) -> bool:
+  return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _unique_key(record: dict, fields: tuple[str, ...]) -> tuple | None:
+  # records with a missing part of the key are not indexed (like NULLs in SQL)
+  key = tuple(record.get(field) for field in fields)
+  if any(value is None or not _indexable(value) for value in key):
+    return None
+  return key
+
+
+# Parsed-document cache: filename -> _Entry, refreshed when the backend signature changes
+_cache: dict[str, _Entry] = {}
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+class _View:
+  """
+  Materialized view (see cached_view): the built object, the signatures of the
+  sources it reflects and, per source, an optional function that applies record
+  ops to it. Readers get copies of the pickled snapshot, as with _Entry.
+  """
+  __slots__ = ("key", "filenames", "data", "updates", "_blob")
+
+  def __init__(self, key: tuple, filenames: tuple[str, ...], data: Any, updates: dict[str, Callable[[Any, list[dict]], bool]]):
+    self.key = key
+    self.filenames = filenames
+    self.data = data
+    self.updates = updates
+    self._blob = None
+
+  def blob(self) -> bytes:
+    if self._blob is None:
+      self._blob = pickle.dumps(self.data, protocol=pickle.HIGHEST_PROTOCOL)
+    return self._blob
+
+
+# Derived views: name -> _View, see cached_view()
+_views: dict[str, _View] = {}
+
+# ---------- Versions / ETags ----------
+
+def collection_version(*filenames: str) -> str:
+  """
+  Opaque version of one or more collections, derived from their backend signatures
+  (a stat on the JSON backend, the version counter on SQLite); nothing is read or
+  parsed. It changes whenever any of them is written, by any worker.
+  """
+  backend = get_backend()
+  digest = hashlib.blake2b(digest_size=12)
+  for filename in filenames:
+    digest.update(repr((filename, backend.signature(filename))).encode("utf-8"))
+  return digest.hexdigest()
+
+
+# ---------- Revisions / If-Match ----------
+
+def record_rev(record: dict) -> int:
+  return record.get(REV_FIELD) or 0
+
+
+def record_etag(record: dict) -> str:
+  return f'"{record_rev(record)}"'
+
+
+def parse_etags(header: str) -> set[str]:
+  tags = set()
+  for tag in header.split(","):
+    tag = tag.strip()
+    if tag.startswith("W/"):
+      tag = tag[2:]
+    if tag:
+      tags.add(tag if tag == "*" or tag.startswith('"') else f'"{tag}"')
+  return tags
+
+
+class RequestPreconditions:
+  """
+  Data-layer state of the current write request, bound by the HTTP middleware and
+  dropped when the request ends. The If-Match header applies to records whose id
+  appears in the request path. `reads` holds what the request last read per
+  collection (filename -> (signature, snapshot)): save_json merges against it as the
+  common ancestor, so a merge never uses a snapshot taken by another request.
+  """
+
+  def __init__(self, if_match: str | None, path: str):
+    self.tags = parse_etags(if_match) if if_match else None
+    self.path_ids = set(filter(None, path.split("/")))
+    self.etag: str | None = None  # ETag of the addressed record after a write
+    self.reads: dict[str, tuple[tuple, bytes]] = {}
+
+  def check(self, record_id: Any, current: dict | None) -> None:
+    if self.tags is None or record_id not in self.path_ids:
+      return
+    if current is not None and ("*" in self.tags or record_etag(current) in self.tags):
+      return
+    raise ConflictError("Kayıt siz okuduktan sonra değiştirildi (If-Match uyuşmuyor)")
+
+  def written(self, record: dict) -> None:
+    if record.get("id") in self.path_ids:
+      self.etag = record_etag(record)
+
+
+_preconditions: ContextVar[RequestPreconditions | None] = ContextVar("preconditions", default=None)
+
+
+def bind_request(if_match: str | None, path: str):
+  """Start the data-layer state of a write request (If-Match, reads); returns (state, reset token)."""
+  state = RequestPreconditions(if_match, path)
+  return state, _preconditions.set(state)
+
+
+def unbind_request(token) -> None:
+  _preconditions.reset(token)
+
+
+def _content(record: Any) -> Any:
+  if isinstance(record, dict) and REV_FIELD in record:
+    return {k: v for k, v in record.items() if k != REV_FIELD}
+  return record
+
+
+def _differs(a: dict | None, b: dict | None) -> bool:
+  if a is None or b is None:
+    return a is not b
+  return a != b and _content(a) != _content(b)
+
+
+def _is_record_list(data: Any) -> bool:
+  return isinstance(data, list) and all(isinstance(rec, dict) and "id" in rec for rec in data)
+
+
+def _derive(filename: str, data: Any) -> Any:
+  """Fill in the COMPUTED fields of every record of a whole collection (in place)."""
+  compute = COMPUTED.get(filename)
+  if compute is not None and isinstance(data, list):
+    for rec in data:
+      if isinstance(rec, dict):
+        rec.update(compute(rec))
+  return data
+
+
+def _derived_changes(filename: str, current: dict, changes: dict) -> dict:
+  """
+  Add the COMPUTED fields that a patch of `current` changes to the patch;
+  returns all computed fields of the patched record.
+  """
+  compute = COMPUTED.get(filename)
+  if compute is None or not changes:
+    return {}
+  derived = compute({**current, **changes})
+  changes.update({k: v for k, v in derived.items() if k not in current or current[k] != v})
+  return derived
+
+
+def _conflict(filename: str, record_id: Any) -> ConflictError:
+  return ConflictError(f"{filename} içindeki {record_id} kaydı başka bir işlem tarafından değiştirildi")
+
+
+def _duplicate(filename: str, fields: tuple[str, ...], key: tuple) -> DuplicateKeyError:
+  return DuplicateKeyError(f"{filename} içinde {'+'.join(fields)} = {'/'.join(map(str, key))} olan bir kayıt zaten var")
+
+
+def _check_unique(filename: str, entry: _Entry, record: dict, pending: dict | None = None) -> None:
+  """
+  Raise DuplicateKeyError if another record already holds one of `record`'s unique
+  keys. `pending` (index name, key) -> id tracks keys written earlier in a transaction.
+  """
+  for name, fields in UNIQUE_INDEXES.get(filename, {}).items():
+    key = _unique_key(record, fields)
+    if key is None:
+      continue
+    with _cache_lock:
+      holder = entry.unique(name, fields).get(key)
+    holder_id = holder.get("id") if holder is not None else None
+    if pending is not None:
+      holder_id = pending.get((name, key), holder_id)
+      pending[(name, key)] = record.get("id")
+    if holder_id is not None and holder_id != record.get("id"):
+      raise _duplicate(filename, fields, key)
+
+
+def _check_unique_all(filename: str, data: Any) -> None:
+  """Unique index check for a whole-collection save."""
+  if filename not in UNIQUE_INDEXES or not isinstance(data, list):
+    return
+  for fields in UNIQUE_INDEXES[filename].values():
+    seen = {}
+    for rec in data:
+      key = _unique_key(rec, fields) if isinstance(rec, dict) else None
+      if key is None:
+        continue
+      if seen.setdefault(key, rec.get("id")) != rec.get("id"):
+        raise _duplicate(filename, fields, key)
+
+
+# ---------- Cache ----------
+
+def _entry(filename: str) -> _Entry:
+  backend = get_backend()
+  signature = backend.signature(filename)
+
+  with _cache_lock:
+    entry = _cache.get(filename)
+    if entry is not None and entry.signature == signature:
+      _cache_stats["hits"] += 1
+      return entry
+    _cache_stats["misses"] += 1
+
+  signature, data = backend.read(filename)
+  entry = _Entry(signature, _derive(filename, data))
+  with _cache_lock:
+    _cache[filename] = entry
+  return entry
+
+
 def load_json(filename: str) -> Any:
-  data_dir = get_data_dir()
-  path = data_dir / filename
-  if not path.exists():
-    raise FileNotFoundError(f"Data file not found: {path}")
-  
-  # Try different encodings
-  for encoding in ["utf-8", "utf-8-sig", "utf-16", "latin-1"]:
+  entry = _entry(filename)
+  with _cache_lock:
+    signature, blob = entry.signature, entry.blob()
+  request = _preconditions.get()
+  if request is not None:
+    request.reads[filename] = (signature, blob)
+  return pickle.loads(blob)
+
+
+def iter_records(filename: str, chunk_size: int = 500, reverse: bool = False) -> Iterator[dict]:
+  """
+  Yield copies of a collection's records in order (or last first) without copying
+  the whole collection: the record list is snapshotted (references only) and records
+  are copied `chunk_size` at a time under the cache lock. Records written after the
+  snapshot may show their newer state; records added after it are not included.
+  """
+  entry = _entry(filename)
+  with _cache_lock:
+    records = list(entry.data) if isinstance(entry.data, list) else []
+  if reverse:
+    records.reverse()
+  for start in range(0, len(records), chunk_size):
+    with _cache_lock:
+      chunk = _copy(records[start:start + chunk_size])
+    yield from chunk
+
+
+def cached_view(
+  name: str,
+  filenames: tuple[str, ...],
+  build: Callable[..., Any],
+  updates: dict[str, Callable[[Any, list[dict]], bool]] | None = None,
+) -> Any:
+  """
+  Materialized view over one or more collections: `build(*collections)` runs only
+  when one of the sources has changed since the last build (any write to them,
+  from any worker, changes their signature). Each call gets its own copy.
+  `updates` maps a source to `apply(view, ops)`, which brings the view up to date
+  with record ops written to that source in this process instead of rebuilding it;
+  it returns False when it cannot, and the view is rebuilt on the next read.
+  """
+  entries = [_entry(filename) for filename in filenames]
+  with _cache_lock:
+    key = tuple(entry.signature for entry in entries)
+    view = _views.get(name)
+    if view is not None and view.key == key:
+      return pickle.loads(view.blob())
+    blobs = [entry.blob() for entry in entries]
+
+  view = _View(key, filenames, build(*(pickle.loads(blob) for blob in blobs)), updates or {})
+  with _cache_lock:
+    _views[name] = view
+    blob = view.blob()
+  return pickle.loads(blob)
+
+
+def _update_views(filename: str, before: tuple, after: tuple | None, ops: list[dict]) -> None:
+  # Caller holds _cache_lock and has just written `ops` to `filename` (signature before -> after)
+  for name, view in list(_views.items()):
+    if filename not in view.filenames:
+      continue
+    pos = view.filenames.index(filename)
+    update = view.updates.get(filename)
     try:
-      with path.open(encoding=encoding) as f:
-        return json.load(f)
-    except (UnicodeDecodeError, json.JSONDecodeError):
+      current = after is not None and update is not None and view.key[pos] == before and update(view.data, ops)
+    except Exception:
+      current = False  # the write is committed; a view that cannot follow it is rebuilt
+    if not current:
+      del _views[name]
       continue
-  
-  # If all encodings fail, raise error
-  raise ValueError(f"Cannot decode JSON file: {path}")
+    view.key = view.key[:pos] + (after,) + view.key[pos + 1:]
+    view._blob = None
+
+
+# ---------- Whole-collection writes ----------
+
+def _read_base(filename: str) -> tuple | None:
+  # What the current request read of the collection (see RequestPreconditions.reads)
+  request = _preconditions.get()
+  return request.reads.pop(filename, None) if request is not None else None
+
+
+def _merge(filename: str, data: Any, entry: _Entry, base: tuple | None) -> Any:
+  """
+  Three-way merge of a whole-collection save against the stored state, using what
+  the caller read (`base`, a (signature, snapshot) pair) as the common ancestor.
+  Without a base the stored state is the ancestor. Records the caller changed get
+  a new revision; records another writer changed meanwhile are kept; both sides
+  changing the same record raises ConflictError.
+  """
+  current = entry.data
+  concurrent = base is not None and base[0] != entry.signature
+  ancestor = pickle.loads(base[1]) if concurrent else current
+
+  if not _is_record_list(data) or not _is_record_list(current) or not _is_record_list(ancestor):
+    if concurrent and data != ancestor and current != ancestor and data != current:
+      raise ConflictError(f"{filename} başka bir işlem tarafından değiştirildi")
+    return data
+
+  preconditions = _preconditions.get()
+  current_by_id = entry.ids()
+  ancestor_by_id = {rec["id"]: rec for rec in ancestor}
+  merged = []
+  seen = set()
+
+  for rec in data:
+    rec_id = rec["id"]
+    seen.add(rec_id)
+    cur = current_by_id.get(rec_id)
+    anc = ancestor_by_id.get(rec_id)
+    if not _differs(rec, anc):
+      # untouched by the caller: keep whatever is stored now
+      if cur is not None:
+        merged.append(cur)
+      continue
+    if not _differs(rec, cur):
+      merged.append(cur)
+      continue
+    if _differs(cur, anc):
+      raise _conflict(filename, rec_id)
+    if preconditions is not None:
+      preconditions.check(rec_id, cur)
+    rec = {**_content(rec), REV_FIELD: record_rev(cur) + 1 if cur is not None else 1}
+    if preconditions is not None:
+      preconditions.written(rec)
+    merged.append(rec)
+
+  # Records the caller dropped are deleted, unless someone else changed them meanwhile
+  for rec_id, anc in ancestor_by_id.items():
+    if rec_id in seen:
+      continue
+    cur = current_by_id.get(rec_id)
+    if _differs(cur, anc) and cur is not None:
+      raise _conflict(filename, rec_id)
+    if preconditions is not None and cur is not None:
+      preconditions.check(rec_id, cur)
+
+  # Records another writer added after the caller's read are kept (newest first)
+  if concurrent:
+    added = [rec for rec in current if rec["id"] not in ancestor_by_id and rec["id"] not in seen]
+    merged = added + merged
+  return merged
 
 
 def save_json(filename: str, data: Any) -> None:
-  data_dir = get_data_dir()
-  data_dir.mkdir(parents=True, exist_ok=True)
-  path = data_dir / filename
-  # Atomic write: temp file + rename to prevent corruption
-  temp_path = path.with_suffix(path.suffix + '.tmp')
+  """
+  Save a whole collection, merged against writes made since the current request
+  read it (see RequestPreconditions.reads).
+  """
+  with collection_lock(filename):
+    base = _read_base(filename)
+    try:
+      data = _merge(filename, data, _entry(filename), base)
+    except FileNotFoundError:
+      pass  # new collection
+    _derive(filename, data)
+    _check_unique_all(filename, data)
+
+    try:
+      signature = get_backend().write(filename, data)
+    except Exception:
+      with _cache_lock:
+        _cache.pop(filename, None)
+      raise
+
+    with _cache_lock:
+      _store(filename, signature, _copy(data))
+
+
+def _store(filename: str, signature: tuple | None, data: Any) -> None:
+  # Keep the cache warm with what we just wrote instead of re-parsing it on the next read.
+  # Unknown signature (another process wrote in between): leave it to the next load.
+  # Caller holds _cache_lock.
+  if signature is not None:
+    _cache[filename] = _Entry(signature, data)
+  else:
+    _cache.pop(filename, None)
+
+
+# ---------- Per-record writes ----------
+
+def _commit_ops(filename: str, entry: _Entry, ops: list[dict]) -> None:
+  # Caller holds the collection lock. Apply to the cached copy, then persist either
+  # as journal ops or, when the journal has grown large, as a full compaction.
+  backend = get_backend()
+  before = entry.signature
+  with _cache_lock:
+    entry.apply(ops)
+    entry.changed(entry.signature)
   try:
-    with temp_path.open("w", encoding="utf-8") as f:
-      json.dump(data, f, ensure_ascii=False, indent=2)
-    temp_path.replace(path)  # Atomic rename
+    if backend.compaction_due(filename):
+      signature = backend.write(filename, entry.data)
+    else:
+      signature = backend.append_ops(filename, ops)
   except Exception:
-    if temp_path.exists():
-      temp_path.unlink()
+    with _cache_lock:
+      _cache.pop(filename, None)
     raise
+  with _cache_lock:
+    if signature is not None:
+      entry.changed(signature)
+    else:
+      _cache.pop(filename, None)
+    _update_views(filename, before, signature, ops)
+
+
+def compact_journals() -> list[str]:
+  """Fold every pending op journal into its collection file (run at shutdown)."""
+  backend = get_backend()
+  compacted = []
+  for filename in backend.journaled():
+    with collection_lock(filename):
+      try:
+        entry = _entry(filename)
+      except FileNotFoundError:
+        continue
+      before = entry.signature
+      signature = backend.write(filename, entry.data)
+      with _cache_lock:
+        if signature is not None:
+          entry.changed(signature)
+        else:
+          _cache.pop(filename, None)
+        _update_views(filename, before, signature, [])
+      compacted.append(filename)
+  return compacted
+
+
+def _find(entry: _Entry, record_id: str) -> dict | None:
+  ids = entry.ids()
+  return ids.get(record_id) if ids is not None else None
+
+
+def get_by_id(filename: str, record_id: str) -> dict | None:
+  """Return a copy of one record through the id index (None if the id is unknown)."""
+  entry = _entry(filename)
+  with _cache_lock:
+    record = _find(entry, record_id)
+    return _copy(record) if record is not None else None
+
+
+def get_by_ids(filename: str, record_ids: Iterable[str]) -> dict[str, dict]:
+  """Copies of several records in one pass over the id index: id -> record (unknown ids left out)."""
+  entry = _entry(filename)
+  with _cache_lock:
+    ids = entry.ids() or {}
+    return _copy({record_id: ids[record_id] for record_id in record_ids if record_id in ids})
+
+
+def find_by(filename: str, field: str, value: Any) -> list[dict]:
+  """
+  Copies of the records whose `field` equals `value`, in collection order, read
+  from the secondary index declared for the collection in INDEXES.
+  """
+  _check_index(filename, field)
+  entry = _entry(filename)
+  with _cache_lock:
+    records = entry.by(field).get(value, []) if _indexable(value) else []
+    return _copy(records)
+
+
+def count_records(
+  filename: str,
+  field: str | None = None,
+  value: Any = None,
+  where: Callable[[dict], bool] | None = None,
+) -> int:
+  """
+  Number of records, optionally only those whose indexed `field` equals `value` and
+  for which `where(record)` holds, counted without copying (`where` must not modify).
+  """
+  entry = _entry(filename)
+  with _cache_lock:
+    if field is not None:
+      _check_index(filename, field)
+      records = entry.by(field).get(value, []) if _indexable(value) else []
+    else:
+      records = entry.data if isinstance(entry.data, list) else []
+    return len(records) if where is None else sum(1 for rec in records if where(rec))
+
+
+def distinct_values(filename: str, field: str) -> set:
+  """The values of the indexed `field` that occur in the collection (the index keys)."""
+  _check_index(filename, field)
+  entry = _entry(filename)
+  with _cache_lock:
+    return set(entry.by(field))
+
+
+def _check_index(filename: str, field: str) -> None:
+  declared = INDEXES.get(filename) or INDEXES.get(_SEGMENT_SUFFIX.sub("", filename), ())
+  if field not in declared:
+    raise ValueError(f"{filename} has no index on {field}")
+
+
+def sorted_index(filename: str, name: str) -> list[dict]:
+  """Copies of the records in a sorted index declared in SORTED_INDEXES, in key order."""
+  key = SORTED_INDEXES.get(filename, {}).get(name)
+  if key is None:
+    raise ValueError(f"{filename} has no sorted index {name}")
+  entry = _entry(filename)
+  with _cache_lock:
+    return _copy(entry.sorted(name, key))
+
+
+class SortedRecords(Sequence):
+  """
+  Read-only sequence over a sorted index, in (sort key, id) order or reversed.
+  Only record references are snapshotted; records are copied when accessed, so
+  bisecting to a cursor and slicing a page copy just the records touched. Records
+  written after the snapshot may show their newer state (like iter_records).
+  """
+
+  def __init__(self, records: list[dict], descending: bool):
+    self._records = records[::-1] if descending else records
+
+  def __len__(self) -> int:
+    return len(self._records)
+
+  def __getitem__(self, position):
+    with _cache_lock:
+      return _copy(self._records[position])
+
+
+def sorted_records(filename: str, name: str, descending: bool = False) -> SortedRecords:
+  """The records in a sorted index declared in SORTED_INDEXES, copied on access."""
+  key = SORTED_INDEXES.get(filename, {}).get(name)
+  if key is None:
+    raise ValueError(f"{filename} has no sorted index {name}")
+  entry = _entry(filename)
+  with _cache_lock:
+    return SortedRecords(entry.sorted(name, key), descending)
+
+
+def search_records(filename: str, index: str, **criteria: Any) -> list[dict]:
+  """
+  Copies of the records matched by a search index declared in SEARCH_INDEXES, in
+  the index's ranking order; `criteria` are passed to its search() method.
+  """
+  factory = SEARCH_INDEXES.get(filename, {}).get(index)
+  if factory is None:
+    raise ValueError(f"{filename} has no search index {index}")
+  entry = _entry(filename)
+  with _cache_lock:
+    ids = entry.search(index, factory).search(**criteria)
+    records = entry.ids() or {}
+    return _copy([records[rec_id] for rec_id in ids])
+
+
+def _unique_fields(filename: str, index: str) -> tuple[str, ...]:
+  fields = UNIQUE_INDEXES.get(filename, {}).get(index)
+  if fields is None:
+    raise ValueError(f"{filename} has no unique index {index}")
+  return fields
+
+
+def get_by_key(filename: str, index: str, *values: Any) -> dict | None:
+  """
+  Copy of the record whose unique key (UNIQUE_INDEXES[filename][index]) equals
+  `values`, e.g. get_by_key("stockItems.json", "code", productCode, colorCode).
+  """
+  fields = _unique_fields(filename, index)
+  entry = _entry(filename)
+  with _cache_lock:
+    record = entry.unique(index, fields).get(tuple(values))
+    return _copy(record) if record is not None else None
+
+
+def update_one(filename: str, record_id: str, patch: dict, expected_rev: int | None = None) -> dict | None:
+  """
+  Merge `patch` into the top-level fields of one record and return a copy of the result.
+  Only fields that actually changed are persisted; returns None if the id is unknown.
+  With `expected_rev` (the revision the caller read), a record that has moved on
+  since raises ConflictError instead of being overwritten.
+  """
+  with collection_lock(filename):
+    entry = _entry(filename)
+    current = _find(entry, record_id)
+    if current is None:
+      return None
+    if expected_rev is not None and expected_rev != record_rev(current):
+      raise _conflict(filename, record_id)
+    preconditions = _preconditions.get()
+    changes = {k: v for k, v in patch.items() if k != REV_FIELD and (k not in current or current[k] != v)}
+    if changes:
+      _derived_changes(filename, current, changes)
+      _check_unique(filename, entry, {**current, **changes})
+      if preconditions is not None:
+        preconditions.check(record_id, current)
+      changes[REV_FIELD] = record_rev(current) + 1
+      _commit_ops(filename, entry, [patch_op(record_id, _copy(changes))])
+      current = _find(entry, record_id)
+    if preconditions is not None:
+      preconditions.written(current)
+    return _copy(current)
+
+
+def insert_one(filename: str, record: dict, at: str = "start") -> dict:
+  """Add a record at the start (default, newest first) or the end of a collection."""
+  record[REV_FIELD] = 1
+  _derive(filename, [record])
+  with collection_lock(filename):
+    entry = _entry(filename)
+    _check_unique(filename, entry, record)
+    _commit_ops(filename, entry, [insert_op(_copy(record), at)])
+    return record
+
+
+def delete_one(filename: str, record_id: str) -> bool:
+  with collection_lock(filename):
+    entry = _entry(filename)
+    current = _find(entry, record_id)
+    if current is None:
+      return False
+    preconditions = _preconditions.get()
+    if preconditions is not None:
+      preconditions.check(record_id, current)
+    _commit_ops(filename, entry, [delete_op(record_id)])
+    return True
+
+
+# ---------- Multi-collection transactions ----------
+
+class Transaction:
+  """
+  Buffered writes to several collections, committed atomically by `transaction()`.
+  Within one transaction a collection is either saved whole or changed through
+  record ops (insert/update), not both. Every record touched by ops has a working
+  image that later updates are compared against, and one pending op (its insert,
+  or one patch): a record updated several times gets a single new revision.
+  """
+
+  def __init__(self, filenames: tuple[str, ...]):
+    self.filenames = set(filenames)
+    self._writes: dict[str, Any] = {}
+    self._ops: dict[str, list[dict]] = {}
+    self._events: list[tuple[str, dict]] = []
+    self._records: dict[tuple[str, Any], dict] = {}  # working copies handed to the caller
+    self._state: dict[tuple[str, Any], dict] = {}  # records as written so far
+    self._pending: dict[tuple[str, Any], dict] = {}  # (filename, id) -> its insert or patch op
+    self._keys: dict[str, dict[tuple[str, tuple], Any]] = {}  # unique keys written, per collection
+    self.rolled_back = False
+
+  def _check(self, filename: str, kind: str) -> None:
+    if self.rolled_back:
+      raise ValueError("write after rollback")
+    if filename not in self.filenames:
+      raise ValueError(f"{filename} is not part of this transaction")
+    if filename in (self._ops if kind == "write" else self._writes):
+      raise ValueError(f"{filename} is both saved whole and changed by ops in one transaction")
+
+  def _current(self, filename: str, record_id: Any) -> dict | None:
+    key = (filename, record_id)
+    current = self._state.get(key)
+    if current is None:
+      entry = _entry(filename)
+      with _cache_lock:
+        stored = _find(entry, record_id)
+        if stored is None:
+          return None
+        current = self._state[key] = _copy(stored)
+    return current
+
+  def load(self, filename: str) -> Any:
+    if filename not in self.filenames:
+      raise ValueError(f"{filename} is not part of this transaction")
+    return load_json(filename)
+
+  def save(self, filename: str, data: Any) -> None:
+    self._check(filename, "write")
+    self._writes[filename] = data
+
+  def insert(self, filename: str, record: dict, at: str = "start") -> dict:
+    """Queue a new record; the returned dict is its working copy (see get_by_id)."""
+    self._check(filename, "ops")
+    record[REV_FIELD] = 1
+    _derive(filename, [record])
+    _check_unique(filename, _entry(filename), record, self._keys.setdefault(filename, {}))
+    op = insert_op(_copy(record), at)
+    self._ops.setdefault(filename, []).append(op)
+    key = (filename, record.get("id"))
+    self._state[key] = _copy(record)
+    self._pending[key] = op
+    self._records[key] = record
+    return record
+
+  def update(self, filename: str, record_id: str, patch: dict, expected_rev: int | None = None) -> dict:
+    """
+    Like update_one: returns a copy of the record as written so far in this transaction;
+    `expected_rev` is the revision the caller read (ConflictError if it has moved on).
+    """
+    self._check(filename, "ops")
+    current = self._current(filename, record_id)
+    if current is None:
+      raise KeyError(record_id)
+    if expected_rev is not None and expected_rev != record_rev(current):
+      raise _conflict(filename, record_id)
+    changes = {k: v for k, v in patch.items() if k != REV_FIELD and (k not in current or current[k] != v)}
+    if not changes:
+      return _copy(current)
+    # the caller usually patches with the record it holds: keep its derived fields current too
+    patch.update(_derived_changes(filename, current, changes))
+    _check_unique(filename, _entry(filename), {**current, **changes}, self._keys.setdefault(filename, {}))
+    preconditions = _preconditions.get()
+    key = (filename, record_id)
+    op = self._pending.get(key)
+    if op is None:
+      # first change of a stored record in this transaction: `current` is what is stored
+      if preconditions is not None:
+        preconditions.check(record_id, current)
+      changes[REV_FIELD] = record_rev(current) + 1
+      op = self._pending[key] = patch_op(record_id, {})
+      self._ops.setdefault(filename, []).append(op)
+    (op["record"] if op["op"] == "insert" else op["patch"]).update(_copy(changes))
+    current.update(changes)
+    if preconditions is not None:
+      preconditions.written(current)
+    return _copy(current)
+
+  def get_by_key(self, filename: str, index: str, *values: Any) -> dict | None:
+    """
+    Working copy of the record holding a unique key (see get_by_key), including
+    records inserted or re-keyed earlier in this transaction.
+    """
+    if filename not in self.filenames:
+      raise ValueError(f"{filename} is not part of this transaction")
+    fields = _unique_fields(filename, index)
+    record_id = self._keys.get(filename, {}).get((index, tuple(values)))
+    if record_id is None:
+      entry = _entry(filename)
+      with _cache_lock:
+        record = entry.unique(index, fields).get(tuple(values))
+        if record is None:
+          return None
+        record_id = record.get("id")
+    current = self._current(filename, record_id)
+    if current is None or _unique_key(current, fields) != tuple(values):
+      return None  # moved to another key in this transaction
+    return self.get_by_id(filename, record_id)
+
+  def get_by_id(self, filename: str, record_id: str) -> dict | None:
+    """
+    Working copy of one record by id, as changed so far in this transaction. Repeated
+    calls return the same dict (shared with get_by_key and insert), so changes made to
+    it are seen by later lookups; they are written only through update().
+    """
+    if filename not in self.filenames:
+      raise ValueError(f"{filename} is not part of this transaction")
+    key = (filename, record_id)
+    record = self._records.get(key)
+    if record is None:
+      current = self._current(filename, record_id)
+      if current is None:
+        return None
+      record = self._records[key] = _copy(current)
+    return record
+
+  def publish(self, event_type: str, data: dict) -> None:
+    """Queue a change event; it is published only if the transaction commits."""
+    self._events.append((event_type, _copy(data)))
+
+  def rollback(self) -> None:
+    """
+    Discard everything buffered so far (dry runs, all-or-nothing batches): the block
+    runs to its end under the locks, but nothing is written and no event is published.
+    """
+    self._writes.clear()
+    self._ops.clear()
+    self._events.clear()
+    self._records.clear()
+    self._state.clear()
+    self._pending.clear()
+    self._keys.clear()
+    self.rolled_back = True
+
+  def _commit(self) -> None:
+    # Caller holds the locks of all collections
+    writes = {}
+    for filename, data in self._writes.items():
+      base = _read_base(filename)
+      try:
+        writes[filename] = _merge(filename, data, _entry(filename), base)
+      except FileNotFoundError:
+        writes[filename] = data
+      _derive(filename, writes[filename])
+      _check_unique_all(filename, writes[filename])
+    entries = {filename: _entry(filename) for filename in self._ops}
+    if not writes and not self._ops:
+      return
+
+    try:
+      signatures = get_backend().commit(writes, self._ops)
+    except Exception:
+      with _cache_lock:
+        for filename in {*writes, *self._ops}:
+          _cache.pop(filename, None)
+      raise
+
+    with _cache_lock:
+      for filename, data in writes.items():
+        _store(filename, signatures.get(filename), _copy(data))
+      for filename, ops in self._ops.items():
+        before = entries[filename].signature
+        if signatures.get(filename) is not None:
+          entries[filename].apply(ops)
+          entries[filename].changed(signatures[filename])
+        else:
+          _cache.pop(filename, None)
+        _update_views(filename, before, signatures.get(filename), ops)
+
+
+@contextmanager
+def transaction(*filenames: str):
+  """
+  Lock the given collections and commit everything saved through the yielded
+  Transaction atomically (write-ahead log on the JSON backend, one SQLite
+  transaction on SQLite). Nothing is written if the block raises or calls
+  tx.rollback().
+  """
+  with collection_lock(*filenames):
+    tx = Transaction(filenames)
+    yield tx
+    if tx.rolled_back:
+      return
+    tx._commit()
+    # Still under the collection locks, so the feed order matches the commit order
+    for event_type, data in tx._events:
+      publish(event_type, data)
+
+
+# ---------- Change feed ----------
+
+def publish(event_type: str, data: dict) -> int:
+  """
+  Append a typed change event ("job.status.updated", ...) to the change feed
+  served by GET /events; returns its sequence number. Call after the write it
+  describes has been committed.
+  """
+  event = {"type": event_type, "at": datetime.utcnow().isoformat(), "data": data}
+  with collection_lock(EVENTS_LOCK):
+    return get_backend().append_event(event)
+
+
+def read_events(after: int, limit: int = 500) -> list[dict]:
+  """Events with a sequence number above `after`, oldest first."""
+  return get_backend().read_events(after, limit)
+
+
+def event_bounds() -> tuple[int, int]:
+  """(oldest retained, latest) event sequence number; (0, 0) while the feed is empty."""
+  return get_backend().event_bounds()
+
+
+def recover() -> int:
+  """Finish transactions that were committed but not fully applied (run at startup)."""
+  backend = get_backend()
+  replayed = 0
+  for name, filenames in backend.pending_transactions():
+    with collection_lock(*filenames):
+      if backend.replay(name):
+        replayed += 1
+  if replayed:
+    clear_cache()
+  return replayed
+
+
+def cache_stats() -> dict:
+  """Parsed-document cache counters (hits / misses / cached files)."""
+  with _cache_lock:
+    return {**_cache_stats, "entries": len(_cache), "backend": get_backend().name}
 
 
+def clear_cache() -> None:
+  with _cache_lock:
+    _cache.clear()
+    _views.clear()
+    _cache_stats["hits"] = 0
+    _cache_stats["misses"] = 0
@@ -0,0 +1,348 @@
+"""
+Stok hareket defteri (ledger): tek ve sürekli büyüyen stockMovements.json yerine aylık segmentler.
+- Segmentler: stockMovements-YYYY-MM.json, eskiden yeniye. Yeni hareket o ayın segmentinin sonuna
+  tek kayıt op'u olarak eklenir (sadece ekleme); kapanmış aylara yazılmaz.
+- Her hareket, uygulandıktan sonraki kalem bakiyesini taşır: "balance": {"onHand", "reserved"};
+  yazıldığı an da "createdAt" alanındadır (sayım farkları buna göre hesaplanır).
+- stockLedger.json: segment listesi. stockSnapshots.json: kapanmış her ay için özet (rollup):
+  kalem bazlı kapanış bakiyeleri ve kalem / iş bazında hareket tipi toplamları. Özetler yazma
+  tarafında üretilir: yeni ayın ilk hareketi segmentini açarken ve uygulama açılışında.
+Bir kalemin D günündeki bakiyesi = önceki ayın kapanış snapshot'ı + D ayının segmenti (kuyruk).
+Okuma fonksiyonları depoya yazmaz; özeti henüz yazılmamış ay bellekte hesaplanır.
+Uygulama açılışında (ensure_ledger) eski stockMovements.json segmentlere bölünür; dosya arşiv
+olarak yerinde kalır. Bakım adımı olarak da çalıştırılabilir: python -m app.ledger
+"""
+import sys
+from datetime import datetime
+from typing import Iterator, Optional
+
+from .data_loader import (
+  collection_lock,
+  count_records,
+  find_by,
+  get_backend,
+  get_by_id,
+  insert_one,
+  iter_records,
+  load_json,
+  save_json,
+  update_one,
+)
+
+LEDGER = "stockLedger.json"
+SNAPSHOTS = "stockSnapshots.json"
+LEGACY_MOVEMENTS = "stockMovements.json"
+SEGMENT_PREFIX = "stockMovements-"
+
+
+def segment_file(month: str) -> str:
+  return f"{SEGMENT_PREFIX}{month}.json"
+
+
+def _today() -> str:
+  return datetime.utcnow().isoformat()[:10]
+
+
+def effect(movement: dict) -> tuple[float, float]:
+  """Hareketin (onHand, reserved) üzerindeki etkisi; `change` çıkışlarda negatiftir"""
+  change = movement.get("change") or 0
+  kind = movement.get("type")
+  if kind in ("stockIn", "stockOut"):
+    return change, 0
+  if kind in ("reserve", "release"):
+    return 0, change
+  if kind == "consume":
+    return change, change
+  return 0, 0
+
+
+def _balance(balance: dict) -> dict:
+  return {"onHand": balance.get("onHand") or 0, "reserved": balance.get("reserved") or 0}
+
+
+def balance_before(movement: dict) -> dict:
+  """Kalemin hareketten hemen önceki {onHand, reserved} değeri"""
+  d_on_hand, d_reserved = effect(movement)
+  balance = _balance(movement["balance"])
+  return {"onHand": max(0, balance["onHand"] - d_on_hand), "reserved": max(0, balance["reserved"] - d_reserved)}
+
+
+# ---------- Kurulum / eski dosyadan geçiş ----------
+
+def ensure_ledger() -> int:
+  """
+  Defter yoksa eski dosyadan oluşturur ve kapanmış ayların eksik özetlerini yazar (yazılan ay
+  sayısı döner). Uygulama açılışında, istek almadan önce bir kez çalışır.
+  """
+  _ensure()
+  return close_months()
+
+
+def _ensure() -> None:
+  backend = get_backend()
+  if backend.exists(LEDGER):
+    return
+  with collection_lock(LEDGER):
+    if not backend.exists(LEDGER):
+      _migrate()
+
+
+def _migrate() -> None:
+  # Eski liste yeniden eskiye sıralı; bakiyeler bugünkü kalem değerlerinden geriye doğru hesaplanır
+  try:
+    legacy = load_json(LEGACY_MOVEMENTS)
+  except FileNotFoundError:
+    legacy = []
+  try:
+    items = {item["id"]: item for item in load_json("stockItems.json")}
+  except FileNotFoundError:
+    items = {}
+
+  running: dict[str, tuple[float, float]] = {}
+  for movement in legacy:
+    item_id = movement.get("itemId")
+    if item_id not in running:
+      item = items.get(item_id, {})
+      running[item_id] = (item.get("onHand") or 0, item.get("reserved") or 0)
+    on_hand, reserved = running[item_id]
+    movement.setdefault("balance", {"onHand": on_hand, "reserved": reserved})
+    d_on_hand, d_reserved = effect(movement)
+    # eski kayıtlarda kırpılmış (max 0) ya da elle düzeltilmiş değerler olabilir; stok eksiye düşmez
+    running[item_id] = (max(0, on_hand - d_on_hand), max(0, reserved - d_reserved))
+
+  months: dict[str, list[dict]] = {}
+  for movement in reversed(legacy):
+    months.setdefault((movement.get("date") or _today())[:7], []).append(movement)
+  for month in sorted(months):
+    save_json(segment_file(month), months[month])
+  # Defter en son yazılır: var olması geçişin tamamlandığı anlamına gelir
+  save_json(LEDGER, [{"id": month, "file": segment_file(month)} for month in sorted(months)])
+
+
+def segment_months() -> list[str]:
+  """Defterdeki aylar (YYYY-MM), eskiden yeniye"""
+  if not get_backend().exists(LEDGER):
+    return []  # ensure_ledger henüz çalışmadı: hareket yok
+  return sorted(segment["id"] for segment in load_json(LEDGER))
+
+
+# ---------- Yazma ----------
+
+def ledger_files(day: Optional[str] = None) -> tuple[str, ...]:
+  """
+  Hareket yazan transaction(...) için defter koleksiyonları: bu ayın segmenti
+  (yoksa oluşturulur; yeni ay açılınca önceki ayların özetleri yazılır).
+  Kullanım: transaction("stockItems.json", *ledger_files()).
+  """
+  month = (day or _today())[:7]
+  filename = segment_file(month)
+  _ensure()
+  backend = get_backend()
+  if not backend.exists(filename):
+    with collection_lock(LEDGER):
+      if not backend.exists(filename):
+        save_json(filename, [])
+      if get_by_id(LEDGER, month) is None:
+        insert_one(LEDGER, {"id": month, "file": filename}, at="end")
+    close_months()
+  return (filename,)
+
+
+def append_movement(tx, movement: dict, item: dict) -> dict:
+  """Hareketi işlemin segmentinin sonuna ekler; kalemin hareket sonrası bakiyesini de saklar"""
+  segment = next(filename for filename in tx.filenames if filename.startswith(SEGMENT_PREFIX))
+  # tam zaman damgası: hareketler kalem kilidi altında yazıldığından commit sırasıyla artar
+  movement.setdefault("createdAt", datetime.utcnow().isoformat())
+  movement["balance"] = {"onHand": item.get("onHand") or 0, "reserved": item.get("reserved") or 0}
+  return tx.insert(segment, movement, at="end")
+
+
+# ---------- Okuma ----------
+
+def _range_months(since: Optional[str], until: Optional[str]) -> list[str]:
+  return [
+    month for month in reversed(segment_months())
+    if (since is None or month >= since[:7]) and (until is None or month <= until[:7])
+  ]
+
+
+def _in_range(since: Optional[str], until: Optional[str]):
+  def check(movement: dict) -> bool:
+    day = movement.get("date") or ""
+    return (since is None or day >= since) and (until is None or day <= until)
+  return check
+
+
+def movements(
+  item_id: Optional[str] = None,
+  job_id: Optional[str] = None,
+  since: Optional[str] = None,
+  until: Optional[str] = None,
+) -> Iterator[dict]:
+  """Hareketler yeniden eskiye; sadece [since, until] aralığına düşen aylık segmentler okunur"""
+  in_range = _in_range(since, until)
+  for month in _range_months(since, until):
+    filename = segment_file(month)
+    if item_id:
+      rows: Iterator[dict] = reversed(find_by(filename, "itemId", item_id))
+    elif job_id:
+      rows = reversed(find_by(filename, "jobId", job_id))
+    else:
+      rows = iter_records(filename, reverse=True)
+    for movement in rows:
+      if job_id and movement.get("jobId") != job_id:
+        continue
+      if in_range(movement):
+        yield movement
+
+
+def count_movements(
+  item_id: Optional[str] = None,
+  job_id: Optional[str] = None,
+  since: Optional[str] = None,
+  until: Optional[str] = None,
+) -> int:
+  """movements(...) ile aynı filtrelerle kayıt sayısı (kopyalamadan)"""
+  in_range = _in_range(since, until)
+  if item_id and job_id:
+    where = lambda movement: movement.get("jobId") == job_id and in_range(movement)
+  elif since or until:
+    where = in_range
+  else:
+    where = None
+  field, value = ("itemId", item_id) if item_id else ("jobId", job_id) if job_id else (None, None)
+  return sum(count_records(segment_file(month), field, value, where) for month in _range_months(since, until))
+
+
+def add_totals(totals: dict, key: str, movement: dict) -> None:
+  """Hareketin mutlak miktarını totals[key][tip] toplamına ekler"""
+  kinds = totals.setdefault(key, {})
+  kind = movement.get("type") or "other"
+  kinds[kind] = kinds.get(kind, 0) + abs(movement.get("change") or 0)
+
+
+def _scan(month: str, opening: dict) -> dict:
+  """`opening` bakiyelerinden başlayıp ayın segmentini bir kez okuyarak ay özetini çıkarır"""
+  balances = dict(opening)
+  totals: dict[str, dict] = {}
+  jobs: dict[str, dict] = {}
+  for movement in iter_records(segment_file(month)):
+    if "balance" in movement:
+      balances[movement.get("itemId")] = _balance(movement["balance"])
+    add_totals(totals, movement.get("itemId"), movement)
+    if movement.get("jobId"):
+      add_totals(jobs, movement["jobId"], movement)
+  return {"id": month, "items": balances, "totals": totals, "jobs": jobs}
+
+
+def close_months(before: Optional[str] = None) -> int:
+  """
+  `before` ayından (varsayılan: bu ay) önceki, özeti olmayan ya da toplamları eksik ayların özetini
+  stockSnapshots.json'a yazar; yazılan ay sayısı döner. Her ay bir kez, önceki ayın kapanışından
+  devam edilerek taranır. Tekrar çalıştırılabilir.
+  """
+  before = before or _today()[:7]
+  written = 0
+  with collection_lock(SNAPSHOTS):
+    if not get_backend().exists(SNAPSHOTS):
+      save_json(SNAPSHOTS, [])
+    opening: dict = {}
+    for month in segment_months():
+      if month >= before:
+        break
+      snapshot = get_by_id(SNAPSHOTS, month)
+      if snapshot is not None and "totals" in snapshot:
+        opening = snapshot["items"]
+        continue
+      if snapshot is None:
+        rollup = _scan(month, opening)
+        insert_one(SNAPSHOTS, rollup, at="end")
+      else:
+        # toplamlardan önce yazılmış snapshot: kapanış bakiyeleri korunur, toplamlar eklenir
+        rollup = _scan(month, snapshot["items"])
+        update_one(SNAPSHOTS, month, {"totals": rollup["totals"], "jobs": rollup["jobs"]})
+      opening = rollup["items"]
+      written += 1
+  return written
+
+
+def month_rollup(month: str) -> dict:
+  """
+  Ayın özeti: {"id", "items": itemId -> kapanış {onHand, reserved}, "totals": itemId -> {tip: miktar},
+  "jobs": jobId -> {tip: miktar}}. Miktarlar mutlak değerdir (stockOut 5 -> 5).
+  Yazılmış özet varsa doğrudan döner; yoksa en yakın özetten devam edilerek bellekte hesaplanır
+  (saklanmaz, bkz. close_months). Hareketi olmayan ayın kapanışı önceki hareketli ayınkiyle
+  aynıdır, toplamları boştur.
+  """
+  months = [m for m in segment_months() if m <= month]
+  stored = get_backend().exists(SNAPSHOTS)
+  rollup: dict = {"id": month, "items": {}, "totals": {}, "jobs": {}}
+  start = 0
+  for idx in range(len(months) - 1, -1, -1):
+    snapshot = get_by_id(SNAPSHOTS, months[idx]) if stored else None
+    if snapshot is None or "totals" not in snapshot:
+      continue
+    if months[idx] == month:
+      return snapshot
+    rollup, start = snapshot, idx + 1
+    break
+
+  for m in months[start:]:
+    rollup = _scan(m, rollup["items"])
+  if rollup["id"] != month:
+    return {"id": month, "items": rollup["items"], "totals": {}, "jobs": {}}
+  return rollup
+
+
+def closing_balances(month: str) -> dict[str, dict]:
+  """
+  `month` sonundaki kalem bakiyeleri (itemId -> {onHand, reserved}); o aya kadar hiç hareketi
+  olmayan kalemler yer almaz.
+  """
+  return month_rollup(month)["items"]
+
+
+def balance_at(item_id: str, day: str) -> Optional[dict]:
+  """
+  Kalemin `day` günü sonundaki {onHand, reserved} değeri: önceki ayın kapanışı + o ayın
+  segmenti. Bilinmeyen kalem için None.
+  """
+  months = segment_months()
+  month = day[:7]
+
+  # 1) O ayın segmentinde `day`e kadar olan son hareket
+  if month in months:
+    for movement in reversed(find_by(segment_file(month), "itemId", item_id)):
+      if (movement.get("date") or "") <= day and "balance" in movement:
+        return _balance(movement["balance"])
+
+  # 2) Önceki ayların kapanış snapshot'ı
+  earlier = [m for m in months if m < month]
+  if earlier:
+    closing = closing_balances(earlier[-1])
+    if item_id in closing:
+      return closing[item_id]
+
+  # 3) `day`den önce hareketi yok: sonraki ilk hareketin öncesi
+  for m in months:
+    if m < month:
+      continue
+    for movement in find_by(segment_file(m), "itemId", item_id):
+      if (movement.get("date") or "") > day and "balance" in movement:
+        return balance_before(movement)
+
+  # 4) Hiç hareketi yok: bugünkü değer
+  item = get_by_id("stockItems.json", item_id)
+  if item is None:
+    return None
+  return _balance(item)
+
+
+def main() -> int:
+  ensure_ledger()
+  print(f"defter: {len(segment_months())} ay, {len(load_json(SNAPSHOTS))} ay özeti")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
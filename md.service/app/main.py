@@ -1,6 +1,24 @@
-from fastapi import FastAPI
+import zlib
+from contextlib import asynccontextmanager
+from datetime import date
+
+from fastapi import FastAPI, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from .data_loader import (
+    ConflictError,
+    bind_request,
+    cache_stats,
+    collection_version,
+    compact_journals,
+    parse_etags,
+    recover,
+    unbind_request,
+)
+from .ledger import ensure_ledger
+from .pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
 from .routers import (
     archive,
     assembly,
@@ -8,6 +26,7 @@ from .routers import (
     customers,
     dashboard,
     documents,
+    events,
     finance,
     folders,
     jobs,
@@ -24,11 +43,26 @@ from .routers import (
     teams,
     colors,
 )
+from .stock_counts import ensure_collections as ensure_count_collections
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  # Yarıda kalmış çok koleksiyonlu işlemleri tamamla (write-ahead log)
+  recover()
+  # Stok defteri: eski hareket dosyasından geçiş ve kapanmış ayların özetleri (okuma uçları yazmaz)
+  ensure_ledger()
+  # Stok sayımı koleksiyonları (istek başına kontrol edilmez)
+  ensure_count_collections()
+  yield
+  # Kayıt op günlüklerini JSON dosyalarına katla: md.data kapanışta güncel kalır
+  compact_journals()
+
 
 app = FastAPI(
     title="MD Service",
     description="Modüler FastAPI backend; veri kaynağı md.data klasörü.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -37,8 +71,65 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[TOTAL_COUNT_HEADER, NEXT_CURSOR_HEADER, "ETag"],
 )
 
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+@app.middleware("http")
+async def record_preconditions(request: Request, call_next):
+  """If-Match başlığını veri katmanına iletir; güncellenen kaydın ETag'ini yanıta ekler."""
+  if request.method not in WRITE_METHODS:
+    return await call_next(request)
+  state, token = bind_request(request.headers.get("if-match"), request.url.path)
+  try:
+    response = await call_next(request)
+  finally:
+    unbind_request(token)
+  if state.etag and response.status_code < 300:
+    response.headers["ETag"] = state.etag
+  return response
+
+
+# Sık yoklanan GET yolları -> yanıtın bağlı olduğu koleksiyonlar.
+# ETag koleksiyon sürümünden türetilir; If-None-Match tutarsa router çalışmadan 304 döner.
+VERSIONED_GETS = {
+    "/jobs/": ("jobs.json",),
+    "/stock/items": ("stockItems.json",),
+    "/production/alerts": ("productionOrders.json",),
+    "/assembly/tasks/today": ("assemblyTasks.json",),
+}
+
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+  """Koleksiyon sürümü tabanlı ETag / If-None-Match (304)."""
+  filenames = VERSIONED_GETS.get(request.url.path) if request.method == "GET" else None
+  if filenames is None:
+    return await call_next(request)
+
+  version = await run_in_threadpool(collection_version, *filenames)
+  # Aynı koleksiyon sürümü farklı sorgu/format/gün için farklı yanıt üretir (gecikme, "bugün")
+  variant = "|".join((request.url.query, request.headers.get("accept", ""), date.today().isoformat()))
+  etag = f'"{version}-{zlib.crc32(variant.encode("utf-8")):08x}"'
+  headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+  if_none_match = request.headers.get("if-none-match")
+  if if_none_match and (etag in (tags := parse_etags(if_none_match)) or "*" in tags):
+    return Response(status_code=304, headers=headers)
+
+  response = await call_next(request)
+  if response.status_code == 200:
+    response.headers.update(headers)
+  return response
+
+
+@app.exception_handler(ConflictError)
+async def conflict_handler(request: Request, exc: ConflictError):
+  return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+
 app.include_router(auth.router)
 app.include_router(dashboard.router)
 app.include_router(jobs.router)
@@ -60,9 +151,10 @@ app.include_router(documents.router)
 app.include_router(folders.router)
 app.include_router(production.router)
 app.include_router(assembly.router)
+app.include_router(events.router)
 
 
 @app.get("/health", tags=["meta"])
 def health():
-  return {"status": "ok"}
+  return {"status": "ok", "cache": cache_stats()}
 
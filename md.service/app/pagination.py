@@ -0,0 +1,276 @@
+"""
+Liste endpoint'leri için ortak sayfalama ve alan seçimi.
+?limit=50 -> ilk 50 kayıt, yanıt başlığında X-Next-Cursor
+?cursor=<X-Next-Cursor>&limit=50 -> sonraki sayfa
+?fields=id,title,status -> sadece istenen üst seviye alanlar
+Parametre verilmezse liste eskisi gibi tam döner. Toplam kayıt sayısı her zaman X-Total-Count başlığındadır.
+
+Akış (streaming) modu: `Accept: application/x-ndjson` ile satır başına bir kayıt (NDJSON),
+`?stream=true` ile parça parça gönderilen bir JSON dizisi döner. Kayıtlar üretildikçe
+gönderilir (sabit bellek); toplam sayı önceden bilinmediği için sayfa başlıkları eklenmez.
+
+Cursor, sayfanın son kaydının [sıralama değeri, id] çiftidir (base64 JSON):
+- Endpoint `key` verirse sayfalama keyset'tir: kayıtlar (key, id) sırasındadır (`descending` ile
+  tersi), devam noktası ikili aramayla bulunur. Cursor kaydı bu arada silinmişse sıralamada ondan
+  sonra gelen kayıttan devam edilir. Kayıtlar data_loader.sorted_records() ile verilirse sadece
+  aramada dokunulan kayıtlar ve sayfanın kendisi kopyalanır (ör. /jobs/, /documents/).
+- `key` yoksa liste depo sırasındadır ve sayfalama offset'tir: sıralama değeri kaydın listedeki
+  konumudur. Kayıt hâlâ o konumdaysa doğrudan devam edilir; liste değişmişse kayıt id'sinden
+  yeniden bulunur (doğrusal arama), silinmişse onun yerine geçen (sonraki) kayıttan devam edilir.
+  Liste her sayfada tam olarak okunur; büyüyen koleksiyonlar için `key` verilmelidir.
+"""
+import base64
+import binascii
+import json
+from itertools import chain, islice
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence
+from fastapi import HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+MAX_LIMIT = 500
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH = 200  # yazma başına gönderilen kayıt sayısı
+TOTAL_COUNT_HEADER = "X-Total-Count"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+SortKey = Callable[[dict], Any]
+
+
+def _invalid_cursor() -> HTTPException:
+  return HTTPException(status_code=400, detail="Geçersiz cursor")
+
+
+def _plain(value: Any) -> Any:
+  """Sıralama değerinin JSON'dan dönen hali (tuple -> list): cursor'daki değerle karşılaştırılabilir"""
+  return json.loads(json.dumps(value, ensure_ascii=False))
+
+
+def encode_cursor(value: Any, record_id: str) -> str:
+  payload = json.dumps([value, record_id], ensure_ascii=False, separators=(",", ":"))
+  return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[Any, str]:
+  """(sıralama değeri, id)"""
+  try:
+    value, record_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+  except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+    raise _invalid_cursor()
+  if not isinstance(record_id, str):
+    raise _invalid_cursor()
+  return value, record_id
+
+
+def _bisect_after(records: Sequence, anchor: tuple[Any, str], key: SortKey, descending: bool = False) -> int:
+  """(key, id) sıralı (`descending`: ters sıralı) `records` içinde `anchor`dan sonraki ilk kaydın indeksi"""
+  target = list(anchor)
+  lo, hi = 0, len(records)
+  try:
+    while lo < hi:
+      mid = (lo + hi) // 2
+      record = records[mid]
+      current = [_plain(key(record)), record.get("id")]
+      if (current >= target) if descending else (current <= target):
+        lo = mid + 1
+      else:
+        hi = mid
+  except TypeError:  # başka bir sıralamanın cursor'u
+    raise _invalid_cursor()
+  return lo
+
+
+def _anchor_position(anchor: tuple[Any, str]) -> int:
+  """Depo sırasındaki listenin cursor'u: kaydın konumu"""
+  pos = anchor[0]
+  if not isinstance(pos, int) or isinstance(pos, bool) or pos < 0:
+    raise _invalid_cursor()
+  return pos
+
+
+def _position_after(records: Sequence, anchor: tuple[Any, str]) -> int:
+  """Depo sırasındaki `records` içinde cursor kaydından sonraki ilk kaydın indeksi"""
+  pos, record_id = _anchor_position(anchor), anchor[1]
+  if pos < len(records) and records[pos].get("id") == record_id:
+    return pos + 1
+  # önceki sayfadan beri liste değişti (ekleme / silme): kayıt yeniden bulunur
+  found = next((idx for idx, rec in enumerate(records) if rec.get("id") == record_id), None)
+  return found + 1 if found is not None else min(pos, len(records))
+
+
+def _skip_after(rows: Iterator[dict], anchor: tuple[Any, str], key: Optional[SortKey], descending: bool) -> Iterator[dict]:
+  """
+  Akışta cursor kaydından sonraki kayıtlar (akış bir kez okunur). `key` ile: akış `key` sırasında,
+  eşit değerler depo sırasındadır; sadece eklenen akışlar içindir (ör. hareket defteri).
+  """
+  value, record_id = anchor
+  if key is None:
+    rows = islice(rows, _anchor_position(anchor), None)
+    first = next(rows, None)
+    if first is not None and first.get("id") != record_id:
+      yield first  # cursor kaydı artık o konumda değil: yerine geçen kayıttan devam
+    yield from rows
+    return
+  resumed = False
+  for rec in rows:
+    if not resumed:
+      current = _plain(key(rec))
+      try:
+        before = current > value if descending else current < value
+      except TypeError:  # başka bir sıralamanın cursor'u
+        raise _invalid_cursor()
+      if before:
+        continue
+      if current == value:
+        # aynı değerdekiler cursor kaydına kadar önceki sayfadadır
+        resumed = rec.get("id") == record_id
+        continue
+      resumed = True
+    yield rec
+
+
+def project(record: dict, fields: list[str]) -> dict:
+  return {field: record[field] for field in fields if field in record}
+
+
+class Page:
+  """FastAPI dependency: cursor / limit / fields sorgu parametreleri"""
+  def __init__(
+    self,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Önceki sayfanın X-Next-Cursor değeri"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT, description="Sayfa boyutu"),
+    fields: Optional[str] = Query(None, description="Virgülle ayrılmış alan listesi (ör. id,title,status)"),
+    stream: bool = Query(False, description="JSON dizisini parça parça (chunked) gönder"),
+  ):
+    self.response = response
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+      self.stream_format: Optional[str] = "ndjson"
+    else:
+      self.stream_format = "json" if stream else None
+    self.cursor = cursor
+    self.after = decode_cursor(cursor) if cursor else None  # (sıralama değeri, id)
+    self.limit = limit
+    self.fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+  def slice(
+    self,
+    records: Sequence,
+    default_limit: Optional[int] = None,
+    key: Optional[SortKey] = None,
+    descending: bool = False,
+  ) -> tuple[int, int]:
+    """Sayfanın [start, end) aralığı; başlıkları ayarlar. `key`: listenin (key, id) sırası, yoksa depo sırası"""
+    start = 0
+    if self.after is not None:
+      start = _bisect_after(records, self.after, key, descending) if key else _position_after(records, self.after)
+    limit = self.limit or default_limit
+    end = len(records) if limit is None else min(start + limit, len(records))
+
+    self.response.headers[TOTAL_COUNT_HEADER] = str(len(records))
+    if end < len(records) and end > start:
+      last = records[end - 1]
+      self.response.headers[NEXT_CURSOR_HEADER] = encode_cursor(_plain(key(last)) if key else end - 1, last.get("id"))
+    return start, end
+
+  @property
+  def streaming(self) -> bool:
+    return self.stream_format is not None
+
+  def apply(
+    self,
+    records: Iterable[dict],
+    default_limit: Optional[int] = None,
+    total: Optional[int] = None,
+    key: Optional[SortKey] = None,
+    descending: bool = False,
+  ):
+    """
+    Filtrelenmiş kayıtlara sayfalama ve alan seçimi uygular.
+    `key`: kayıtların sıralama değeri; liste (key, id) sırasındadır (`descending`: tersi), cursor
+    bu değeri taşır. Verilmezse liste depo sırasındadır ve cursor kaydın konumunu taşır.
+    `records` bir liste ya da sorted_records() gibi erişimde kopyalayan bir dizi olabilir.
+    Akış modunda `records` bir generator olabilir; varsayılan limit uygulanmaz (dışa aktarım).
+    Generator ile birlikte `total` verilirse sayfa tembel okunur: sadece cursor'a kadar olan
+    kısım ve sayfanın kendisi üretilir (ör. hareket defteri, `key` tarih, `descending`).
+    """
+    if self.streaming:
+      return self.stream(records, key, descending)
+    if not isinstance(records, Sequence):
+      if total is not None:
+        return self.seek(records, total, default_limit, key, descending)
+      records = list(records)
+    start, end = self.slice(records, default_limit, key, descending)
+    page = records if isinstance(records, list) and (start, end) == (0, len(records)) else records[start:end]
+    if self.fields:
+      page = [project(rec, self.fields) for rec in page]
+    return page
+
+  def seek(
+    self,
+    records: Iterable[dict],
+    total: int,
+    default_limit: Optional[int] = None,
+    key: Optional[SortKey] = None,
+    descending: bool = False,
+  ) -> list[dict]:
+    rows = iter(records)
+    start = 0  # depo sırasında sayfanın ilk kaydının konumu
+    if self.after is not None:
+      if key is None:
+        start = _anchor_position(self.after) + 1
+      rows = _skip_after(rows, self.after, key, descending)
+    limit = self.limit or default_limit
+    page = list(rows) if limit is None else list(islice(rows, limit + 1))
+
+    self.response.headers[TOTAL_COUNT_HEADER] = str(total)
+    if limit is not None and len(page) > limit:
+      page = page[:limit]
+      last = page[-1]
+      value = _plain(key(last)) if key else start + limit - 1
+      self.response.headers[NEXT_CURSOR_HEADER] = encode_cursor(value, last.get("id"))
+    if self.fields:
+      page = [project(rec, self.fields) for rec in page]
+    return page
+
+  def stream(self, records: Iterable[dict], key: Optional[SortKey] = None, descending: bool = False) -> StreamingResponse:
+    rows = iter(records)
+    if self.after is not None:
+      if isinstance(records, Sequence):
+        start = _bisect_after(records, self.after, key, descending) if key else _position_after(records, self.after)
+        rows = (records[pos] for pos in range(start, len(records)))
+      else:
+        rows = _skip_after(rows, self.after, key, descending)
+      # geçersiz cursor yanıt başlamadan 400 döner
+      first = next(rows, None)
+      rows = chain((first,), rows) if first is not None else iter(())
+    if self.limit:
+      rows = islice(rows, self.limit)
+    if self.fields:
+      rows = (project(rec, self.fields) for rec in rows)
+    if self.stream_format == "ndjson":
+      return StreamingResponse(_ndjson_chunks(rows), media_type=NDJSON_MEDIA_TYPE)
+    return StreamingResponse(_json_array_chunks(rows), media_type="application/json")
+
+
+def _batches(rows: Iterator[dict]) -> Iterator[list[str]]:
+  while True:
+    batch = [json.dumps(rec, ensure_ascii=False) for rec in islice(rows, STREAM_BATCH)]
+    if not batch:
+      return
+    yield batch
+
+
+def _ndjson_chunks(rows: Iterator[dict]) -> Iterator[bytes]:
+  for batch in _batches(rows):
+    yield ("\n".join(batch) + "\n").encode("utf-8")
+
+
+def _json_array_chunks(rows: Iterator[dict]) -> Iterator[bytes]:
+  yield b"["
+  separator = ""
+  for batch in _batches(rows):
+    yield (separator + ",".join(batch)).encode("utf-8")
+    separator = ","
+  yield b"]"
@@ -7,11 +7,23 @@ Her iş için iş kollarına göre montaj aşamaları oluşturulur ve takip edil
 
 import uuid
 from datetime import datetime, date
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from pydantic import BaseModel
 from typing import Optional, List
 
-from ..data_loader import load_json, save_json
+from ..data_loader import (
+    find_by,
+    get_by_id,
+    insert_one,
+    load_json,
+    publish,
+    record_etag,
+    record_rev,
+    save_json,
+    transaction,
+    update_one,
+)
+from ..pagination import Page
 
 router = APIRouter(prefix="/assembly", tags=["assembly"])
 
@@ -103,17 +115,20 @@ def _today() -> str:
 
 def _find_task(task_id: str):
     """Görev bul"""
-    tasks = load_json("assemblyTasks.json")
-    for idx, task in enumerate(tasks):
-        if task.get("id") == task_id:
-            return tasks, idx, task
-    raise HTTPException(status_code=404, detail="Montaj görevi bulunamadı")
+    task = get_by_id("assemblyTasks.json", task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Montaj görevi bulunamadı")
+    return task
+
+
+def _save_task(task: dict) -> dict:
+    """Görev kaydını yaz (sadece değişen alanlar); yeni _rev ile yazılan kaydı döndürür"""
+    return update_one("assemblyTasks.json", task["id"], task, expected_rev=record_rev(task))
 
 
 def _get_job(job_id: str):
     """İş bilgilerini getir"""
-    jobs = load_json("jobs.json")
-    job = next((j for j in jobs if j.get("id") == job_id), None)
+    job = get_by_id("jobs.json", job_id)
     if not job:
         raise HTTPException(status_code=404, detail="İş bulunamadı")
     return job
@@ -152,13 +167,17 @@ def list_tasks(
     status: Optional[str] = None,
     dateFrom: Optional[str] = None,
     dateTo: Optional[str] = None,
-    overdue: Optional[bool] = None
+    overdue: Optional[bool] = None,
+    page: Page = Depends(),
 ):
     """Tüm montaj görevlerini listele"""
-    tasks = load_json("assemblyTasks.json")
-    
     if jobId:
-        tasks = [t for t in tasks if t.get("jobId") == jobId]
+        tasks = find_by("assemblyTasks.json", "jobId", jobId)
+    elif teamId:
+        tasks = find_by("assemblyTasks.json", "teamId", teamId)
+    else:
+        tasks = load_json("assemblyTasks.json")
+    
     if roleId:
         tasks = [t for t in tasks if t.get("roleId") == roleId]
     if teamId:
@@ -178,7 +197,7 @@ def list_tasks(
         task["daysUntilEstimated"] = _days_until(task.get("estimatedDate"))
         task["daysUntilPlanned"] = _days_until(task.get("plannedDate"))
     
-    return tasks
+    return page.apply(tasks)
 
 
 @router.get("/tasks/today")
@@ -221,8 +240,7 @@ def get_today_tasks(teamId: Optional[str] = None):
 @router.get("/tasks/by-job/{job_id}")
 def get_tasks_by_job(job_id: str):
     """Bir iş için tüm montaj görevleri"""
-    tasks = load_json("assemblyTasks.json")
-    job_tasks = [t for t in tasks if t.get("jobId") == job_id]
+    job_tasks = find_by("assemblyTasks.json", "jobId", job_id)
     
     # İş kolu bazlı grupla
     roles_map = {}
@@ -272,9 +290,10 @@ def get_tasks_by_job(job_id: str):
 
 
 @router.get("/tasks/{task_id}")
-def get_task(task_id: str):
+def get_task(task_id: str, response: Response):
     """Tek bir görev detayı"""
-    _, _, task = _find_task(task_id)
+    task = _find_task(task_id)
+    response.headers["ETag"] = record_etag(task)
     task["isOverdue"] = _is_overdue(task)
     return task
 
@@ -417,7 +436,7 @@ def create_tasks_for_job(job_id: str):
 @router.put("/tasks/{task_id}")
 def update_task(task_id: str, payload: UpdateAssemblyTask):
     """Görevi güncelle"""
-    tasks, idx, task = _find_task(task_id)
+    task = _find_task(task_id)
     
     if payload.plannedDate is not None:
         task["plannedDate"] = payload.plannedDate
@@ -436,8 +455,7 @@ def update_task(task_id: str, payload: UpdateAssemblyTask):
         task["note"] = payload.note
     
     task["updatedAt"] = _now()
-    tasks[idx] = task
-    save_json("assemblyTasks.json", tasks)
+    task = _save_task(task)
     
     return task
 
@@ -445,7 +463,7 @@ def update_task(task_id: str, payload: UpdateAssemblyTask):
 @router.post("/tasks/{task_id}/start")
 def start_task(task_id: str, payload: StartTask):
     """Görevi başlat"""
-    tasks, idx, task = _find_task(task_id)
+    task = _find_task(task_id)
     
     task["status"] = "in_progress"
     task["startedAt"] = payload.startTime or _now()
@@ -453,8 +471,7 @@ def start_task(task_id: str, payload: StartTask):
         task["note"] = payload.note
     task["updatedAt"] = _now()
     
-    tasks[idx] = task
-    save_json("assemblyTasks.json", tasks)
+    task = _save_task(task)
     
     return task
 
@@ -462,7 +479,7 @@ def start_task(task_id: str, payload: StartTask):
 @router.post("/tasks/{task_id}/complete")
 def complete_task(task_id: str, payload: CompleteTask):
     """Görevi tamamla"""
-    tasks, idx, task = _find_task(task_id)
+    task = _find_task(task_id)
     
     # Bekleyen sorun varsa tamamlanamaz
     pending_issues = [i for i in task.get("issues", []) if i.get("status") == "pending"]
@@ -485,8 +502,13 @@ def complete_task(task_id: str, payload: CompleteTask):
         task["customerSignature"] = payload.customerSignature
     
     task["updatedAt"] = _now()
-    tasks[idx] = task
-    save_json("assemblyTasks.json", tasks)
+    task = _save_task(task)
+    publish("assembly.task.completed", {
+        "taskId": task["id"],
+        "jobId": task.get("jobId"),
+        "teamId": task.get("teamId"),
+        "completedAt": task["completedAt"],
+    })
     
     return task
 
@@ -494,62 +516,68 @@ def complete_task(task_id: str, payload: CompleteTask):
 @router.post("/tasks/complete-all/{job_id}")
 def complete_all_tasks(job_id: str, payload: CompleteAllTasks):
     """Bir iş için tüm görevleri tek seferde tamamla (perakende için)"""
-    tasks = load_json("assemblyTasks.json")
-    job_tasks = [t for t in tasks if t.get("jobId") == job_id]
-    
-    if not job_tasks:
-        raise HTTPException(status_code=404, detail="Bu iş için montaj görevi bulunamadı")
-    
-    # Bekleyen sorun kontrolü
-    all_pending_issues = []
-    for task in job_tasks:
-        pending = [i for i in task.get("issues", []) if i.get("status") == "pending"]
-        all_pending_issues.extend(pending)
-    
-    if all_pending_issues:
-        raise HTTPException(
-            status_code=400,
-            detail=f"{len(all_pending_issues)} bekleyen sorun var. Önce sorunları çözün."
-        )
-    
-    completed_date = payload.completedDate or _now()
-    
-    for task in job_tasks:
-        task_idx = next(i for i, t in enumerate(tasks) if t.get("id") == task.get("id"))
+    # Görevler tek işlemde, kayıt bazında yazılır; her tamamlanan görev için olay yayınlanır
+    task_ids = [t["id"] for t in find_by("assemblyTasks.json", "jobId", job_id)]
+    with transaction("assemblyTasks.json") as tx:
+        job_tasks = [t for t in (tx.get_by_id("assemblyTasks.json", task_id) for task_id in task_ids) if t is not None]
         
-        task["status"] = "completed"
-        task["completedAt"] = completed_date
+        if not job_tasks:
+            raise HTTPException(status_code=404, detail="Bu iş için montaj görevi bulunamadı")
         
-        if payload.note:
-            task["note"] = payload.note
+        # Bekleyen sorun kontrolü
+        all_pending_issues = []
+        for task in job_tasks:
+            pending = [i for i in task.get("issues", []) if i.get("status") == "pending"]
+            all_pending_issues.extend(pending)
         
-        # İlk görev için before fotoğrafları
-        if task.get("stageOrder") == 1 and payload.photosBefore:
-            task["photos"]["before"].extend(payload.photosBefore)
+        if all_pending_issues:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{len(all_pending_issues)} bekleyen sorun var. Önce sorunları çözün."
+            )
         
-        # Son görev için after fotoğrafları ve imza
+        completed_date = payload.completedDate or _now()
         max_order = max(t.get("stageOrder", 0) for t in job_tasks)
-        if task.get("stageOrder") == max_order:
-            if payload.photosAfter:
-                task["photos"]["after"].extend(payload.photosAfter)
-            if payload.customerSignature:
-                task["customerSignature"] = payload.customerSignature
+        completed = []
         
-        task["updatedAt"] = _now()
-        tasks[task_idx] = task
-    
-    save_json("assemblyTasks.json", tasks)
+        for task in job_tasks:
+            changes = {"status": "completed", "completedAt": completed_date, "updatedAt": _now()}
+            
+            if payload.note:
+                changes["note"] = payload.note
+            
+            photos = {**task.get("photos", {})}
+            # İlk görev için before fotoğrafları
+            if task.get("stageOrder") == 1 and payload.photosBefore:
+                photos["before"] = [*photos.get("before", []), *payload.photosBefore]
+            
+            # Son görev için after fotoğrafları ve imza
+            if task.get("stageOrder") == max_order:
+                if payload.photosAfter:
+                    photos["after"] = [*photos.get("after", []), *payload.photosAfter]
+                if payload.customerSignature:
+                    changes["customerSignature"] = payload.customerSignature
+            if photos != task.get("photos", {}):
+                changes["photos"] = photos
+            
+            completed.append(tx.update("assemblyTasks.json", task["id"], changes))
+            tx.publish("assembly.task.completed", {
+                "taskId": task["id"],
+                "jobId": task.get("jobId"),
+                "teamId": task.get("teamId"),
+                "completedAt": completed_date,
+            })
     
     return {
-        "completed": len(job_tasks),
-        "tasks": job_tasks
+        "completed": len(completed),
+        "tasks": completed
     }
 
 
 @router.post("/tasks/{task_id}/issue")
 def report_issue(task_id: str, payload: ReportIssue):
     """Montaj sorunu bildir"""
-    tasks, idx, task = _find_task(task_id)
+    task = _find_task(task_id)
     
     issue = {
         "id": _gen_id("ISS"),
@@ -567,8 +595,6 @@ def report_issue(task_id: str, payload: ReportIssue):
     
     # Yedek sipariş oluştur
     if payload.createReplacement:
-        production_orders = load_json("productionOrders.json")
-        
         replacement_order = {
             "id": _gen_id("PROD"),
             "jobId": task.get("jobId"),
@@ -601,8 +627,7 @@ def report_issue(task_id: str, payload: ReportIssue):
             "updatedAt": _now()
         }
         
-        production_orders.insert(0, replacement_order)
-        save_json("productionOrders.json", production_orders)
+        insert_one("productionOrders.json", replacement_order)
         
         issue["replacementOrderId"] = replacement_order["id"]
     
@@ -611,8 +636,7 @@ def report_issue(task_id: str, payload: ReportIssue):
     task["status"] = "blocked"
     task["updatedAt"] = _now()
     
-    tasks[idx] = task
-    save_json("assemblyTasks.json", tasks)
+    task = _save_task(task)
     
     return {
         "issue": issue,
@@ -624,7 +648,7 @@ def report_issue(task_id: str, payload: ReportIssue):
 @router.post("/tasks/{task_id}/issues/{issue_id}/resolve")
 def resolve_issue(task_id: str, issue_id: str):
     """Sorunu çözüldü olarak işaretle"""
-    tasks, idx, task = _find_task(task_id)
+    task = _find_task(task_id)
     
     issue = next((i for i in task.get("issues", []) if i.get("id") == issue_id), None)
     if not issue:
@@ -639,8 +663,7 @@ def resolve_issue(task_id: str, issue_id: str):
         task["status"] = "in_progress" if task.get("startedAt") else "planned"
     
     task["updatedAt"] = _now()
-    tasks[idx] = task
-    save_json("assemblyTasks.json", tasks)
+    task = _save_task(task)
     
     return task
 
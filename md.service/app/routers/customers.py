@@ -1,8 +1,9 @@
 import uuid
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 
 from ..data_loader import load_json, save_json
+from ..pagination import Page
 
 router = APIRouter(prefix="/customers", tags=["customers"])
 
@@ -18,8 +19,8 @@ class CustomerIn(BaseModel):
 
 
 @router.get("/")
-def list_customers():
-  return load_json("customers.json")
+def list_customers(page: Page = Depends()):
+  return page.apply(load_json("customers.json"))
 
 
 @router.post("/", status_code=201)
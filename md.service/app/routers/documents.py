@@ -1,24 +1,49 @@
 import os
 import uuid
-import shutil
 from datetime import datetime
 from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
-from ..data_loader import load_json, save_json
+from ..blobs import BlobStore
+from ..data_loader import (
+    collection_lock,
+    delete_one,
+    find_by,
+    get_by_id,
+    insert_one,
+    load_json,
+    register_sorted_index,
+    sorted_records,
+)
+from ..pagination import Page
+from ..uploads import Upload, UploadError, UploadTooLarge, receive_upload
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
+
+def _by_uploaded(doc: dict) -> tuple:
+    # liste sırası: yüklenme zamanı (yoksa en eski sayılır), sonra id
+    return (doc.get("uploadedAt") or "",)
+
+
+register_sorted_index("documents.json", "uploaded", _by_uploaded)
+
 # Base paths
 BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
 DOCS_DIR = BASE_DIR / "md.docs" / "documents"
+# İçerik adresli belge deposu: md.docs/blobs (app/blobs.py)
+BLOBS = BlobStore(BASE_DIR / "md.docs")
+# Yüklenen dosyalar önce buraya yazılır (depoyla aynı dosya sistemi)
+UPLOAD_TMP_DIR = DOCS_DIR / ".tmp"
 
 # Ensure directories exist
 DOCS_DIR.mkdir(parents=True, exist_ok=True)
 for subdir in ["olcu", "teknik", "sozlesme", "teklif", "diger", "servis", "montaj", "irsaliye"]:
     (DOCS_DIR / subdir).mkdir(exist_ok=True)
+UPLOAD_TMP_DIR.mkdir(exist_ok=True)
 
 ALLOWED_TYPES = {
     # Görsel formatları
@@ -72,36 +97,31 @@ class DocumentMeta(BaseModel):
 
 
 @router.get("/")
-def list_documents(job_id: str | None = None, doc_type: str | None = None):
-    """List all documents, optionally filtered by jobId or type"""
-    docs = load_json("documents.json")
+def list_documents(job_id: str | None = None, doc_type: str | None = None, page: Page = Depends()):
+    """List all documents (newest first), optionally filtered by jobId or type"""
     if job_id:
-        docs = [d for d in docs if d.get("jobId") == job_id]
+        docs = sorted(find_by("documents.json", "jobId", job_id), key=lambda d: (_by_uploaded(d), d.get("id")), reverse=True)
+    else:
+        # (uploadedAt, id) sırası: cursor ikili aramayla bulunur, sadece sayfa kopyalanır
+        docs = sorted_records("documents.json", "uploaded", descending=True)
     if doc_type:
         docs = [d for d in docs if d.get("type") == doc_type]
-    return docs
+    return page.apply(docs, key=_by_uploaded, descending=True)
 
 
 @router.get("/{doc_id}")
 def get_document(doc_id: str):
     """Get document metadata by ID"""
-    docs = load_json("documents.json")
-    for doc in docs:
-        if doc.get("id") == doc_id:
-            return doc
-    raise HTTPException(status_code=404, detail="Döküman bulunamadı")
+    doc = get_by_id("documents.json", doc_id)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Döküman bulunamadı")
+    return doc
 
 
 @router.get("/{doc_id}/download")
 def download_document(doc_id: str):
     """Download a document file"""
-    docs = load_json("documents.json")
-    doc = None
-    for d in docs:
-        if d.get("id") == doc_id:
-            doc = d
-            break
-    
+    doc = get_by_id("documents.json", doc_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Döküman bulunamadı")
     
@@ -118,111 +138,131 @@ def download_document(doc_id: str):
 
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
 
-@router.post("/upload")
-async def upload_document(
-    file: UploadFile = File(...),
-    jobId: str = Form(None),  # Opsiyonel - şirket belgeleri için
-    docType: str = Form(...),
-    description: str = Form(None),
-    folderId: str = Form(None),  # Klasör ID (şirket belgeleri için)
-    supplierId: str = Form(None)  # Tedarikçi ID (tedarikçi belgeleri için)
-):
-    """
-    Upload a document file.
-    docType: olcu, teknik, sozlesme, teklif, diger, measure_*, technical_*, arac, makine, ofis, genel
-    Max file size: 100MB
-    jobId, folderId veya supplierId'den en az biri gerekli.
-    """
-    # Dosya boyutu kontrolü (100MB)
-    contents = await file.read()
-    file_size = len(contents)
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=413, 
-            detail=f"Dosya boyutu çok büyük. Maksimum: 100MB, Yüklenen: {file_size / (1024*1024):.1f}MB"
-        )
-    # Dosyayı başa sar (okuduktan sonra)
-    await file.seek(0)
-    
+VALID_DOC_TYPES = [
+    "olcu", "teknik", "sozlesme", "teklif", "diger", 
+    "servis_oncesi", "servis_sonrasi", "montaj", "irsaliye",
+    # Montaj fotoğrafları
+    "montaj_oncesi", "montaj_sonrasi", "musteri_imza", "montaj_sorun",
+    # Şirket belgeleri
+    "arac", "makine", "ofis", "genel",
+    # Tedarikçi belgeleri
+    "fiyat_listesi", "kalite", "tedarikci_sozlesme"
+]
+
+# Gövde akış olarak okunduğu için form şeması OpenAPI'ye elle yazılır; alan sırası önerilen gönderim sırasıdır
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "required": ["docType", "file"],
+                "properties": {
+                    "docType": {"type": "string", "description": "olcu, teknik, sozlesme, ..., measure_*, technical_*"},
+                    "jobId": {"type": "string", "description": "Opsiyonel - şirket belgeleri için"},
+                    "folderId": {"type": "string", "description": "Klasör ID (şirket belgeleri için)"},
+                    "supplierId": {"type": "string", "description": "Tedarikçi ID (tedarikçi belgeleri için)"},
+                    "description": {"type": "string"},
+                    "file": {"type": "string", "format": "binary", "description": "En fazla 100MB; form alanlarından sonra gönderilmeli"},
+                },
+            }
+        }
+    },
+}
+
+
+def _check_fields(fields: dict) -> None:
+    """Form alanlarını doğrula (docType ve en az bir referans)"""
+    docType = fields.get("docType")
+    if not docType:
+        raise HTTPException(status_code=400, detail="docType gerekli")
+
     # En az bir referans gerekli
-    if not jobId and not folderId and not supplierId:
+    if not fields.get("jobId") and not fields.get("folderId") and not fields.get("supplierId"):
         raise HTTPException(status_code=400, detail="jobId, folderId veya supplierId'den en az biri gerekli")
     
     # Validate type - ana tipler ve iş kolu bazlı tipler
-    valid_base_types = [
-        "olcu", "teknik", "sozlesme", "teklif", "diger", 
-        "servis_oncesi", "servis_sonrasi", "montaj", "irsaliye",
-        # Montaj fotoğrafları
-        "montaj_oncesi", "montaj_sonrasi", "musteri_imza", "montaj_sorun",
-        # Şirket belgeleri
-        "arac", "makine", "ofis", "genel",
-        # Tedarikçi belgeleri
-        "fiyat_listesi", "kalite", "tedarikci_sozlesme"
-    ]
     is_role_based = docType.startswith("measure_") or docType.startswith("technical_")
     
-    if docType not in valid_base_types and not is_role_based:
+    if docType not in VALID_DOC_TYPES and not is_role_based:
         raise HTTPException(status_code=400, detail="Geçersiz döküman tipi")
-    
+
+
+def _file_ext(filename: str | None, content_type: str | None) -> str:
+    """İzin verilen dosya tipinin uzantısı (yoksa 400)"""
     # Dosya uzantısını al
-    original_name = file.filename or "unnamed"
+    original_name = filename or "unnamed"
     file_ext = os.path.splitext(original_name)[1].lower()
     
     # content-type veya uzantıya göre kontrol
-    content_type = file.content_type or ""
+    content_type = content_type or ""
     
     # Önce content-type'a bak
     if content_type in ALLOWED_TYPES and ALLOWED_TYPES[content_type] is not None:
-        ext = ALLOWED_TYPES[content_type]
+        return ALLOWED_TYPES[content_type]
     # content-type bilinmiyorsa uzantıya bak
-    elif file_ext in ALLOWED_EXTENSIONS:
-        ext = file_ext
-    # application/octet-stream ise uzantıya güven
-    elif content_type == "application/octet-stream" and file_ext in ALLOWED_EXTENSIONS:
-        ext = file_ext
-    else:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Desteklenmeyen dosya tipi: {content_type or 'bilinmiyor'} ({file_ext}). "
-                   f"Desteklenen formatlar: JPG, PNG, PDF, DOC, DOCX, XLS, XLSX, DWG, DXF, ZIP, RAR vb."
-        )
+    if file_ext in ALLOWED_EXTENSIONS:
+        return file_ext
+    raise HTTPException(
+        status_code=400,
+        detail=f"Desteklenmeyen dosya tipi: {content_type or 'bilinmiyor'} ({file_ext}). "
+               f"Desteklenen formatlar: JPG, PNG, PDF, DOC, DOCX, XLS, XLSX, DWG, DXF, ZIP, RAR vb."
+    )
+
+
+def _check_before_file(upload: Upload) -> None:
+    """
+    Dosya parçası akmaya başlamadan çağrılır: dosya tipi her zaman, form alanları docType dosyadan
+    önce geldiyse (alanlar önce gönderilmiş demektir) burada doğrulanır; hatada gövde okunmaz.
+    Dosyayı önce gönderen istemcilerde alanlar gövde bitince doğrulanır.
+    """
+    _file_ext(upload.filename, upload.content_type)
+    if "docType" in upload.fields:
+        _check_fields(upload.fields)
+
+
+@router.post("/upload", openapi_extra={"requestBody": UPLOAD_REQUEST_BODY})
+async def upload_document(request: Request):
+    """
+    Upload a document file (multipart/form-data).
+    Form alanları: docType, jobId, description, folderId, supplierId, file (alanlar dosyadan önce).
+    docType: olcu, teknik, sozlesme, teklif, diger, measure_*, technical_*, arac, makine, ofis, genel
+    Max file size: 100MB
+    jobId, folderId veya supplierId'den en az biri gerekli.
+    Dosya gelirken geçici dosyaya yazılır, boyutu sayılır ve SHA-256 özeti çıkarılır (app/uploads.py);
+    sınır aşılırsa aktarım kesilir (413). Doğrulanan dosya içerik adresli depoya atomik olarak taşınır;
+    aynı içerik depoda zaten varsa geçici dosya silinir ve kayıt mevcut bloba bağlanır (app/blobs.py).
+    """
+    try:
+        upload = await receive_upload(request, UPLOAD_TMP_DIR, MAX_FILE_SIZE, on_file=_check_before_file)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Dosya boyutu çok büyük. Maksimum: 100MB")
+    except UploadError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    try:
+        # Kilit, blob taşıma ve kayıt yazma bloklayıcıdır: olay döngüsünü tutmasın
+        return await run_in_threadpool(_store_upload, upload)
+    finally:
+        upload.discard()
+
+
+def _store_upload(upload: Upload) -> dict:
+    fields = upload.fields
+    _check_fields(fields)
+    ext = _file_ext(upload.filename, upload.content_type)
+    jobId = fields.get("jobId") or None  # Opsiyonel - şirket belgeleri için
+    docType = fields["docType"]
+    description = fields.get("description") or None
+    folderId = fields.get("folderId") or None  # Klasör ID (şirket belgeleri için)
+    supplierId = fields.get("supplierId") or None  # Tedarikçi ID (tedarikçi belgeleri için)
+    content_type = upload.content_type or ""
     
     # Generate unique filename
     doc_id = f"DOC-{str(uuid.uuid4())[:8].upper()}"
     safe_name = f"{doc_id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}{ext}"
     
-    # Klasör belirleme - belge tipine göre
-    target_subdir = "diger"
-    if docType in ["olcu", "teknik", "sozlesme", "teklif", "diger", "montaj", "irsaliye"]:
-        target_subdir = docType
-    elif docType.startswith("measure_"):
-        target_subdir = "olcu"
-    elif docType.startswith("technical_"):
-        target_subdir = "teknik"
-    elif docType.startswith("servis"):
-        target_subdir = "servis"
-    # Şirket belgeleri
-    elif docType in ["arac", "makine", "ofis", "genel"]:
-        target_subdir = f"sirket/{docType}"
-    # Tedarikçi belgeleri
-    elif docType in ["fiyat_listesi", "kalite", "tedarikci_sozlesme"]:
-        target_subdir = "tedarikciler"
-    
-    # Save file
-    target_dir = DOCS_DIR / target_subdir
-    target_dir.mkdir(parents=True, exist_ok=True)
-    target_path = target_dir / safe_name
-    
-    try:
-        with open(target_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Dosya kaydedilemedi: {str(e)}")
-    
-    # Get file size
-    file_size = target_path.stat().st_size
-    
-    # Create metadata
+    # Create metadata: içerik depoda özetiyle saklanır (app/blobs.py)
     doc_meta = {
         "id": doc_id,
         "jobId": jobId,
@@ -230,19 +270,27 @@ async def upload_document(
         "supplierId": supplierId,
         "type": docType,
         "filename": safe_name,
-        "originalName": file.filename,
-        "path": f"documents/{target_subdir}/{safe_name}",
+        "originalName": upload.filename,
+        "path": BLOBS.relative(upload.sha256),
         "mimeType": content_type,
-        "size": file_size,
+        "size": upload.size,
+        "sha256": upload.sha256,
         "uploadedBy": "Kullanıcı",
         "uploadedAt": datetime.utcnow().isoformat() + "Z",
         "description": description
     }
     
-    # Save to database
-    docs = load_json("documents.json")
-    docs.insert(0, doc_meta)
-    save_json("documents.json", docs)
+    # Save file and record: aynı içerik zaten varsa dosya tekrar yazılmaz
+    with collection_lock("documents.json"):
+        try:
+            BLOBS.put(upload)
+        except OSError as e:
+            raise HTTPException(status_code=500, detail=f"Dosya kaydedilemedi: {str(e)}")
+        try:
+            insert_one("documents.json", doc_meta)
+        except Exception:
+            BLOBS.release(upload.sha256)
+            raise
     
     return doc_meta
 
@@ -250,30 +298,22 @@ async def upload_document(
 @router.delete("/{doc_id}")
 def delete_document(doc_id: str):
     """Delete a document and its file"""
-    docs = load_json("documents.json")
-    doc = None
-    doc_idx = -1
-    
-    for idx, d in enumerate(docs):
-        if d.get("id") == doc_id:
-            doc = d
-            doc_idx = idx
-            break
-    
+    doc = get_by_id("documents.json", doc_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Döküman bulunamadı")
     
-    # Delete file
-    file_path = BASE_DIR / "md.docs" / doc["path"]
-    if file_path.exists():
-        try:
-            file_path.unlink()
-        except Exception:
-            pass  # File deletion is best effort
-    
-    # Remove from database
-    docs.pop(doc_idx)
-    save_json("documents.json", docs)
+    # Remove from database; blob sadece son referansı silinince silinir
+    with collection_lock("documents.json"):
+        delete_one("documents.json", doc_id)
+        if doc.get("sha256") and doc["path"] == BLOBS.relative(doc["sha256"]):
+            BLOBS.release(doc["sha256"])
+        else:
+            # Depodan önceki belge: kendi dosyası
+            file_path = BASE_DIR / "md.docs" / doc["path"]
+            try:
+                file_path.unlink(missing_ok=True)
+            except Exception:
+                pass  # File deletion is best effort
     
     return {"success": True, "id": doc_id}
 
@@ -281,6 +321,5 @@ def delete_document(doc_id: str):
 @router.get("/job/{job_id}")
 def get_job_documents(job_id: str):
     """Get all documents for a specific job"""
-    docs = load_json("documents.json")
-    return [d for d in docs if d.get("jobId") == job_id]
+    return find_by("documents.json", "jobId", job_id)
 
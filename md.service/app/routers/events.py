@@ -0,0 +1,72 @@
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from ..data_loader import event_bounds, read_events
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+POLL_SECONDS = 0.5
+HEARTBEAT_SECONDS = 15
+RETRY_MS = 3000
+BATCH = 200
+
+
+def _sse(event: dict) -> str:
+  payload = {"seq": event["seq"], "type": event["type"], "at": event.get("at"), "data": event.get("data")}
+  return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@router.get("")
+async def stream_events(
+  request: Request,
+  since: Optional[int] = None,  # bu sıra numarasından sonraki olaylar (varsayılan: sadece yeni olaylar)
+  types: Optional[str] = None,  # virgülle ayrılmış tip önekleri, ör. "job.,stock.movement"
+  last_event_id: Optional[str] = Header(None),
+):
+  """
+  Değişiklik akışı (Server-Sent Events).
+  Her olay `id:` alanında sıra numarasını taşır; bağlantı koparsa tarayıcı Last-Event-ID ile
+  kaldığı yerden devam eder. İstenen olaylar artık saklanmıyorsa önce `reset` olayı gönderilir;
+  istemci listeleri bir kez yeniden çekmelidir.
+  """
+  prefixes = tuple(t.strip() for t in types.split(",") if t.strip()) if types else ()
+  oldest, latest = await run_in_threadpool(event_bounds)
+  after = latest
+  if last_event_id and last_event_id.isdigit():
+    after = int(last_event_id)
+  elif since is not None:
+    after = since
+
+  async def feed():
+    nonlocal after
+    yield f"retry: {RETRY_MS}\n\n"
+    if after > latest or (oldest and after < oldest - 1):
+      # Akış sıfırlanmış ya da olaylar silinmiş: kaçırılan değişiklikler bilinmiyor
+      yield f"event: reset\ndata: {json.dumps({'latest': latest})}\n\n"
+      after = latest
+    idle = 0.0
+    while not await request.is_disconnected():
+      events = await run_in_threadpool(read_events, after, BATCH)
+      for event in events:
+        after = event["seq"]
+        if not prefixes or event["type"].startswith(prefixes):
+          yield _sse(event)
+      if len(events) == BATCH:
+        continue
+      if events:
+        idle = 0.0
+      await asyncio.sleep(POLL_SECONDS)
+      idle += POLL_SECONDS
+      if idle >= HEARTBEAT_SECONDS:
+        yield ": keep-alive\n\n"
+        idle = 0.0
+
+  return StreamingResponse(
+    feed(),
+    media_type="text/event-stream",
+    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+  )
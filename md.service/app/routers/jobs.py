@@ -1,24 +1,47 @@
-from copy import deepcopy
 from datetime import datetime
 import uuid
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from pydantic import BaseModel, Field
 
-from ..data_loader import load_json, save_json
+from ..data_loader import (
+  get_by_id,
+  insert_one,
+  record_etag,
+  record_rev,
+  register_sorted_index,
+  sorted_records,
+  transaction,
+)
+from ..pagination import Page
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
 
-def _now_iso() -> str:
-  return datetime.utcnow().isoformat()
+def _by_created(job: dict) -> tuple:
+  # liste sırası: oluşturulma zamanı (yoksa en eski sayılır), sonra id
+  return (job.get("createdAt") or "",)
+
+
+register_sorted_index("jobs.json", "created", _by_created)
 
 
-def _jobs():
-  return load_json("jobs.json")
+def _now_iso() -> str:
+  return datetime.utcnow().isoformat()
 
 
-def _save_jobs(data):
-  save_json("jobs.json", data)
+def _save_job(job: dict) -> dict:
+  # Sadece bu işin değişen alanları yazılır (jobs.json tamamı yeniden yazılmaz);
+  # yazılan kayıt yeni _rev ile döner, yanıt onunla verilir.
+  # Tüm iş yazmaları buradan geçer: statü değiştiyse job.status.updated aynı işlemde yayınlanır
+  with transaction("jobs.json") as tx:
+    previous = tx.get_by_id("jobs.json", job["id"])
+    if previous is None:
+      raise HTTPException(status_code=404, detail="Job not found")
+    old_status = previous.get("status", "")
+    saved = tx.update("jobs.json", job["id"], job, expected_rev=record_rev(job))
+    if saved.get("status", "") != old_status:
+      tx.publish("job.status.updated", {"jobId": job["id"], "status": saved.get("status"), "previousStatus": old_status})
+  return saved
 
 
 class JobCreate(BaseModel):
@@ -107,11 +130,10 @@ class StatusUpdate(BaseModel):
 
 
 def _find_job(job_id: str):
-  data = _jobs()
-  for idx, job in enumerate(data):
-    if job.get("id") == job_id:
-      return data, idx, job
-  raise HTTPException(status_code=404, detail="Job not found")
+  job = get_by_id("jobs.json", job_id)
+  if job is None:
+    raise HTTPException(status_code=404, detail="Job not found")
+  return job
 
 
 def _log(job: dict, action: str, note: str | None = None):
@@ -121,21 +143,22 @@ def _log(job: dict, action: str, note: str | None = None):
 
 
 @router.get("/")
-def list_jobs():
-  return _jobs()
+def list_jobs(page: Page = Depends()):
+  # Yeniden eskiye (createdAt, id): cursor ikili aramayla bulunur, sadece sayfa kopyalanır
+  jobs = sorted_records("jobs.json", "created", descending=True)
+  return page.apply(jobs, key=_by_created, descending=True)
 
 
 @router.get("/{job_id}")
-def get_job(job_id: str):
-  for job in _jobs():
-    if job.get("id") == job_id:
-      return job
-  raise HTTPException(status_code=404, detail="Job not found")
+def get_job(job_id: str, response: Response):
+  job = _find_job(job_id)
+  # If-Match ile geri gönderilecek sürüm
+  response.headers["ETag"] = record_etag(job)
+  return job
 
 
 @router.post("/", status_code=201)
 def create_job(payload: JobCreate):
-  data = _jobs()
   new_id = f"JOB-{str(uuid.uuid4())[:8].upper()}"
   
   # Arşiv işi mi kontrol et
@@ -176,8 +199,7 @@ def create_job(payload: JobCreate):
         "createdAt": payload.archiveDate or _now_iso(),
     }
     _log(job, "archive_created", f"Arşiv kaydı oluşturuldu - Tutar: {payload.archiveTotalAmount}")
-    data.insert(0, job)
-    _save_jobs(data)
+    insert_one("jobs.json", job)
     return job
   
   # Normal iş akışı
@@ -216,15 +238,13 @@ def create_job(payload: JobCreate):
       "createdAt": _now_iso(),
   }
   _log(job, "created", f"startType={payload.startType}")
-  data.insert(0, job)
-  _save_jobs(data)
+  insert_one("jobs.json", job)
   return job
 
 
 @router.put("/{job_id}/measure")
 def update_measure(job_id: str, payload: MeasureUpdate):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = _find_job(job_id)
   
   # Mevcut measure bilgilerini koru ve güncelle
   existing_measure = job.get("measure", {})
@@ -249,27 +269,23 @@ def update_measure(job_id: str, payload: MeasureUpdate):
   else:
     _log(job, "measure.updated")
   
-  data[idx] = job
-  _save_jobs(data)
+  job = _save_job(job)
   return job
 
 
 @router.put("/{job_id}/offer")
 def update_offer(job_id: str, payload: OfferUpdate):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = _find_job(job_id)
   job["offer"] = payload.model_dump()
   job["status"] = payload.status or "TEKLIF_TASLAK"
   _log(job, "offer.updated")
-  data[idx] = job
-  _save_jobs(data)
+  job = _save_job(job)
   return job
 
 
 @router.post("/{job_id}/approval/start")
 def start_approval(job_id: str, payload: ApprovalStart):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = _find_job(job_id)
   approval_data = payload.model_dump()
   
   # estimatedAssembly ayrı saklanır (approval içinde değil, job kökünde)
@@ -281,8 +297,7 @@ def start_approval(job_id: str, payload: ApprovalStart):
   
   job["status"] = "ANLASMA_TAMAMLANDI"
   _log(job, "approval.started")
-  data[idx] = job
-  _save_jobs(data)
+  job = _save_job(job)
   return job
 
 
@@ -293,23 +308,20 @@ class PaymentUpdate(BaseModel):
 @router.put("/{job_id}/approval/payment")
 def update_payment(job_id: str, payload: PaymentUpdate):
   """Ödeme planını güncelle (tahsilat, çek detayı vs.)"""
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = _find_job(job_id)
   
   if "approval" not in job:
     job["approval"] = {}
   
   job["approval"]["paymentPlan"] = payload.paymentPlan
   _log(job, "payment.updated")
-  data[idx] = job
-  _save_jobs(data)
+  job = _save_job(job)
   return job
 
 
 @router.put("/{job_id}/stock")
 def update_stock(job_id: str, payload: StockStatus):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = _find_job(job_id)
   stock = job.get("stock", {})
   stock["ready"] = payload.ready
   stock["purchaseNotes"] = payload.purchaseNotes
@@ -329,23 +341,20 @@ def update_stock(job_id: str, payload: StockStatus):
     # ready=True -> Üretime Hazır, ready=False -> Sonra Üretilecek (rezerve edildi)
     job["status"] = "URETIME_HAZIR" if payload.ready else "SONRA_URETILECEK"
     _log(job, "stock.updated", f"ready={payload.ready}, items={len(payload.items or [])}, estimatedDate={payload.estimatedDate}")
-  data[idx] = job
-  _save_jobs(data)
+  job = _save_job(job)
   return job
 
 
 @router.put("/{job_id}/production")
 def production_status(job_id: str, payload: ProductionStatus):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = _find_job(job_id)
   prod_data = {"status": payload.status, "note": payload.note}
   if payload.agreementDate:
     prod_data["agreementDate"] = payload.agreementDate
   job["production"] = prod_data
   job["status"] = payload.status
   _log(job, "production.updated", payload.status)
-  data[idx] = job
-  _save_jobs(data)
+  job = _save_job(job)
   return job
 
 
@@ -357,8 +366,7 @@ class EstimatedAssemblyUpdate(BaseModel):
 @router.put("/{job_id}/estimated-assembly")
 def update_estimated_assembly(job_id: str, payload: EstimatedAssemblyUpdate):
   """Montaj terminini güncelle (müşteriye söylenilen tarih)"""
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = _find_job(job_id)
   
   # Önceki termini history'ye kaydet
   prev = job.get("estimatedAssembly", {})
@@ -377,28 +385,24 @@ def update_estimated_assembly(job_id: str, payload: EstimatedAssemblyUpdate):
     "setAt": _now_iso(),
   }
   _log(job, "estimatedAssembly.updated", payload.date)
-  data[idx] = job
-  _save_jobs(data)
+  job = _save_job(job)
   return job
 
 
 @router.put("/{job_id}/assembly/schedule")
 def assembly_schedule(job_id: str, payload: AssemblySchedule):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = _find_job(job_id)
   job["assembly"] = job.get("assembly", {})
   job["assembly"]["schedule"] = payload.model_dump()
   job["status"] = "MONTAJ_TERMIN"
   _log(job, "assembly.scheduled")
-  data[idx] = job
-  _save_jobs(data)
+  job = _save_job(job)
   return job
 
 
 @router.put("/{job_id}/assembly/complete")
 def assembly_complete(job_id: str, payload: AssemblyComplete):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = _find_job(job_id)
   job["assembly"] = job.get("assembly", {})
   job["assembly"]["schedule"] = job["assembly"].get("schedule", {})
   if payload.date:
@@ -410,16 +414,14 @@ def assembly_complete(job_id: str, payload: AssemblyComplete):
   job["assembly"]["complete"] = {"at": _now_iso(), "proof": payload.proof}
   job["status"] = "MUHASEBE_BEKLIYOR"
   _log(job, "assembly.complete", f"team={payload.team}")
-  data[idx] = job
-  _save_jobs(data)
+  job = _save_job(job)
   return job
 
 
 @router.put("/{job_id}/status")
 def update_status(job_id: str, payload: StatusUpdate):
   """Genel statü güncelleme - servis işleri ve diğer geçişler için"""
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = _find_job(job_id)
   
   old_status = job.get("status", "")
   job["status"] = payload.status
@@ -439,15 +441,13 @@ def update_status(job_id: str, payload: StatusUpdate):
     job["rejection"] = payload.rejection
   
   _log(job, "status.updated", f"{old_status} -> {payload.status}")
-  data[idx] = job
-  _save_jobs(data)
+  job = _save_job(job)
   return job
 
 
 @router.put("/{job_id}/finance/close")
 def finance_close(job_id: str, payload: FinanceClose):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = _find_job(job_id)
 
   offer_total = float(job.get("offer", {}).get("total", 0))
   approval_plan = job.get("approval", {}).get("paymentPlan", {})
@@ -491,7 +491,6 @@ def finance_close(job_id: str, payload: FinanceClose):
   }
   job["status"] = "KAPALI"
   _log(job, "finance.closed", f"balance={balance}")
-  data[idx] = job
-  _save_jobs(data)
+  job = _save_job(job)
   return job
 
@@ -8,11 +8,12 @@ teslimat durumlarını ve sorunları takip eder.
 
 import uuid
 from datetime import datetime, timedelta
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from pydantic import BaseModel
 from typing import Optional
 
-from ..data_loader import load_json, save_json
+from ..data_loader import delete_one, find_by, get_by_id, load_json, record_etag, record_rev, save_json, update_one
+from ..pagination import Page
 
 router = APIRouter(prefix="/production", tags=["production"])
 
@@ -83,11 +84,15 @@ def _now() -> str:
 
 def _find_order(order_id: str):
     """Sipariş bul"""
-    orders = load_json("productionOrders.json")
-    for idx, order in enumerate(orders):
-        if order.get("id") == order_id:
-            return orders, idx, order
-    raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
+    order = get_by_id("productionOrders.json", order_id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
+    return order
+
+
+def _save_order(order: dict) -> dict:
+    """Sipariş kaydını yaz (sadece değişen alanlar); yeni _rev ile yazılan kaydı döndürür"""
+    return update_one("productionOrders.json", order["id"], order, expected_rev=record_rev(order))
 
 
 def _calc_order_status(order: dict) -> str:
@@ -129,13 +134,17 @@ def list_orders(
     orderType: str | None = None,
     status: str | None = None,
     supplierId: str | None = None,
-    overdue: bool | None = None
+    overdue: bool | None = None,
+    page: Page = Depends(),
 ):
     """Tüm üretim/tedarik siparişlerini listele"""
-    orders = load_json("productionOrders.json")
-    
     if jobId:
-        orders = [o for o in orders if o.get("jobId") == jobId]
+        orders = find_by("productionOrders.json", "jobId", jobId)
+    elif supplierId:
+        orders = find_by("productionOrders.json", "supplierId", supplierId)
+    else:
+        orders = load_json("productionOrders.json")
+    
     if roleId:
         orders = [o for o in orders if o.get("roleId") == roleId]
     if orderType:
@@ -152,7 +161,7 @@ def list_orders(
         order["isOverdue"] = _is_overdue(order)
         order["calculatedStatus"] = _calc_order_status(order)
     
-    return orders
+    return page.apply(orders)
 
 
 @router.get("/summary")
@@ -197,8 +206,7 @@ def get_summary():
 @router.get("/by-job/{job_id}")
 def get_orders_by_job(job_id: str):
     """Bir iş için tüm siparişleri getir"""
-    orders = load_json("productionOrders.json")
-    job_orders = [o for o in orders if o.get("jobId") == job_id]
+    job_orders = find_by("productionOrders.json", "jobId", job_id)
     
     # Her sipariş için güncel durum
     for order in job_orders:
@@ -225,15 +233,6 @@ def get_orders_by_job(job_id: str):
     }
 
 
-@router.get("/{order_id}")
-def get_order(order_id: str):
-    """Tek bir sipariş detayı"""
-    _, _, order = _find_order(order_id)
-    order["isOverdue"] = _is_overdue(order)
-    order["calculatedStatus"] = _calc_order_status(order)
-    return order
-
-
 @router.post("/", status_code=201)
 def create_order(payload: CreateProductionOrder):
     """Yeni sipariş oluştur"""
@@ -300,7 +299,7 @@ class PlanUpdate(BaseModel):
 @router.patch("/{order_id}/plan")
 def update_plan(order_id: str, payload: PlanUpdate):
     """Üretim planını güncelle (sürükle-bırak takvim için)"""
-    orders, idx, order = _find_order(order_id)
+    order = _find_order(order_id)
     
     if payload.plannedDate is not None:
         order["plannedDate"] = payload.plannedDate
@@ -308,8 +307,7 @@ def update_plan(order_id: str, payload: PlanUpdate):
         order["estimatedDelivery"] = payload.estimatedDelivery
     
     order["updatedAt"] = _now()
-    orders[idx] = order
-    save_json("productionOrders.json", orders)
+    order = _save_order(order)
     
     return order
 
@@ -317,7 +315,7 @@ def update_plan(order_id: str, payload: PlanUpdate):
 @router.put("/{order_id}")
 def update_order(order_id: str, payload: CreateProductionOrder):
     """Siparişi güncelle"""
-    orders, idx, order = _find_order(order_id)
+    order = _find_order(order_id)
     
     # Sadece pending durumundayken güncelleme yapılabilir
     if order.get("status") not in ["pending", "partial"]:
@@ -351,8 +349,7 @@ def update_order(order_id: str, payload: CreateProductionOrder):
     order["notes"] = payload.notes
     order["updatedAt"] = _now()
     
-    orders[idx] = order
-    save_json("productionOrders.json", orders)
+    order = _save_order(order)
     
     return order
 
@@ -360,7 +357,7 @@ def update_order(order_id: str, payload: CreateProductionOrder):
 @router.post("/{order_id}/delivery")
 def record_delivery(order_id: str, payload: RecordDelivery):
     """Teslimat kaydet"""
-    orders, idx, order = _find_order(order_id)
+    order = _find_order(order_id)
     
     delivery_record = {
         "id": _gen_id("DEL"),
@@ -411,8 +408,7 @@ def record_delivery(order_id: str, payload: RecordDelivery):
     order["status"] = _calc_order_status(order)
     order["updatedAt"] = _now()
     
-    orders[idx] = order
-    save_json("productionOrders.json", orders)
+    order = _save_order(order)
     
     return order
 
@@ -420,7 +416,7 @@ def record_delivery(order_id: str, payload: RecordDelivery):
 @router.post("/{order_id}/issues/{issue_id}/resolve")
 def resolve_issue(order_id: str, issue_id: str, payload: ResolveIssue):
     """Sorunu çöz (zincirleme sorun desteği)"""
-    orders, idx, order = _find_order(order_id)
+    order = _find_order(order_id)
     
     # Sorunu bul
     issue = next((iss for iss in order.get("issues", []) if iss.get("id") == issue_id), None)
@@ -475,8 +471,7 @@ def resolve_issue(order_id: str, issue_id: str, payload: ResolveIssue):
     order["status"] = _calc_order_status(order)
     order["updatedAt"] = _now()
     
-    orders[idx] = order
-    save_json("productionOrders.json", orders)
+    order = _save_order(order)
     
     return order
 
@@ -484,13 +479,12 @@ def resolve_issue(order_id: str, issue_id: str, payload: ResolveIssue):
 @router.delete("/{order_id}")
 def delete_order(order_id: str):
     """Siparişi sil (sadece pending durumda)"""
-    orders, idx, order = _find_order(order_id)
+    order = _find_order(order_id)
     
     if order.get("status") != "pending":
         raise HTTPException(status_code=400, detail="Sadece bekleyen siparişler silinebilir")
     
-    orders.pop(idx)
-    save_json("productionOrders.json", orders)
+    delete_one("productionOrders.json", order_id)
     
     return {"success": True, "id": order_id}
 
@@ -582,3 +576,14 @@ def get_alerts():
     alerts.sort(key=lambda x: severity_order.get(x.get("severity"), 2))
     
     return alerts
+
+
+# /{order_id} en sonda: /combinations ve /alerts yollarını gölgelemesin
+@router.get("/{order_id}")
+def get_order(order_id: str, response: Response):
+    """Tek bir sipariş detayı"""
+    order = _find_order(order_id)
+    response.headers["ETag"] = record_etag(order)
+    order["isOverdue"] = _is_overdue(order)
+    order["calculatedStatus"] = _calc_order_status(order)
+    return order
@@ -1,9 +1,12 @@
 import uuid
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 
-from ..data_loader import load_json, save_json
+from ..data_loader import find_by, load_json, save_json, sorted_index, transaction
+from ..ledger import append_movement, ledger_files
+from ..pagination import Page
+from ..stock_levels import CRITICAL_INDEX, PENDING_STATUSES, item_code, pending_quantities
 
 router = APIRouter(prefix="/purchase", tags=["purchase"])
 
@@ -70,7 +73,8 @@ class SupplierUpdate(BaseModel):
 def list_orders(
     status: str | None = None,
     supplierId: str | None = None,
-    has_pending: bool = False
+    has_pending: bool = False,
+    page: Page = Depends(),
 ):
     """Satın alma siparişlerini listele"""
     orders = load_json("purchaseOrders.json")
@@ -81,9 +85,9 @@ def list_orders(
         orders = [o for o in orders if o.get("supplierId") == supplierId]
     if has_pending:
         # Teslim edilmemiş ürünü olan siparişler
-        orders = [o for o in orders if o.get("status") in ("draft", "sent", "partial")]
+        orders = [o for o in orders if o.get("status") in PENDING_STATUSES]
     
-    return orders
+    return page.apply(orders)
 
 
 @router.get("/orders/{order_id}")
@@ -214,49 +218,48 @@ def send_order(order_id: str, expectedDate: str | None = None):
 @router.post("/orders/{order_id}/receive")
 def receive_delivery(order_id: str, payload: PODelivery):
     """Kısmi veya tam teslimat kaydet"""
-    orders = load_json("purchaseOrders.json")
-    stock_items = load_json("stockItems.json")
-    stock_movements = load_json("stockMovements.json")
+    with transaction("purchaseOrders.json", "stockItems.json", *ledger_files()) as tx:
+        orders = tx.load("purchaseOrders.json")
     
-    for idx, order in enumerate(orders):
-        if order.get("id") == order_id:
-            if order.get("status") not in ("sent", "partial"):
-                raise HTTPException(status_code=400, detail="Bu sipariş teslim alınamaz")
+        for order in orders:
+            if order.get("id") == order_id:
+                if order.get("status") not in ("sent", "partial"):
+                    raise HTTPException(status_code=400, detail="Bu sipariş teslim alınamaz")
             
-            # Teslimat kaydı oluştur
-            delivery = {
-                "id": f"DEL-{str(uuid.uuid4())[:8].upper()}",
-                "date": _today(),
-                "items": payload.items,
-                "note": payload.note,
-                "receivedBy": payload.receivedBy or "Sistem"
-            }
+                # Teslimat kaydı oluştur
+                delivery = {
+                    "id": f"DEL-{str(uuid.uuid4())[:8].upper()}",
+                    "date": _today(),
+                    "items": payload.items,
+                    "note": payload.note,
+                    "receivedBy": payload.receivedBy or "Sistem"
+                }
             
-            all_complete = True
+                all_complete = True
             
-            for recv_item in payload.items:
-                prod_code = recv_item.get("productCode")
-                color_code = recv_item.get("colorCode")
-                qty = recv_item.get("quantity", 0)
+                for recv_item in payload.items:
+                    prod_code = recv_item.get("productCode")
+                    color_code = recv_item.get("colorCode")
+                    qty = recv_item.get("quantity", 0)
                 
-                # Sipariş kalemini bul ve güncelle
-                for poi in order.get("items", []):
-                    if poi.get("productCode") == prod_code and poi.get("colorCode") == color_code:
-                        poi["receivedQty"] = (poi.get("receivedQty") or 0) + qty
+                    # Sipariş kalemini bul ve güncelle
+                    for poi in order.get("items", []):
+                        if poi.get("productCode") == prod_code and poi.get("colorCode") == color_code:
+                            poi["receivedQty"] = (poi.get("receivedQty") or 0) + qty
                         
-                        if poi["receivedQty"] < poi["quantity"]:
-                            all_complete = False
-                        break
+                            if poi["receivedQty"] < poi["quantity"]:
+                                all_complete = False
+                            break
                 
-                # Stoku güncelle
-                for sidx, si in enumerate(stock_items):
-                    if si.get("productCode") == prod_code and si.get("colorCode") == color_code:
+                    # Stoku güncelle
+                    si = tx.get_by_key("stockItems.json", "code", prod_code, color_code)
+                    if si is not None:
                         si["onHand"] = (si.get("onHand") or 0) + qty
                         si["lastUpdated"] = _today()
-                        stock_items[sidx] = si
+                        tx.update("stockItems.json", si["id"], si)
                         
                         # Hareket kaydı
-                        stock_movements.insert(0, {
+                        movement = append_movement(tx, {
                             "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
                             "date": _today(),
                             "item": si.get("name"),
@@ -268,29 +271,26 @@ def receive_delivery(order_id: str, payload: PODelivery):
                             "reason": f"Sipariş teslimi - {order_id}",
                             "operator": payload.receivedBy or "Sistem",
                             "reference": order_id
-                        })
+                        }, si)
+                        tx.publish("stock.movement.created", {"movement": movement, "onHand": si.get("onHand"), "reserved": si.get("reserved")})
+            
+                # Tüm kalemler tamamlandı mı kontrol et
+                for poi in order.get("items", []):
+                    if (poi.get("receivedQty") or 0) < poi.get("quantity", 0):
+                        all_complete = False
                         break
             
-            # Tüm kalemler tamamlandı mı kontrol et
-            for poi in order.get("items", []):
-                if (poi.get("receivedQty") or 0) < poi.get("quantity", 0):
-                    all_complete = False
-                    break
+                order["deliveries"].append(delivery)
             
-            order["deliveries"].append(delivery)
+                if all_complete:
+                    order["status"] = "delivered"
+                    order["completedAt"] = _now_iso()
+                else:
+                    order["status"] = "partial"
             
-            if all_complete:
-                order["status"] = "delivered"
-                order["completedAt"] = _now_iso()
-            else:
-                order["status"] = "partial"
+                tx.update("purchaseOrders.json", order["id"], order)
             
-            orders[idx] = order
-            save_json("purchaseOrders.json", orders)
-            save_json("stockItems.json", stock_items)
-            save_json("stockMovements.json", stock_movements)
-            
-            return order
+                return order
     
     raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
 
@@ -314,48 +314,35 @@ def delete_order(order_id: str):
 @router.get("/missing-items")
 def get_missing_items():
     """Eksik ürün listesi - sipariş edilmesi gerekenler"""
-    stock_items = load_json("stockItems.json")
-    orders = load_json("purchaseOrders.json")
-    
+    stock_items = sorted_index("stockItems.json", CRITICAL_INDEX)
     # Bekleyen siparişlerdeki ürünleri topla
-    pending_orders = {}
-    for order in orders:
-        if order.get("status") in ("draft", "sent", "partial"):
-            for item in order.get("items", []):
-                key = f"{item.get('productCode')}_{item.get('colorCode')}"
-                pending = item.get("quantity", 0) - (item.get("receivedQty") or 0)
-                if pending > 0:
-                    if key not in pending_orders:
-                        pending_orders[key] = 0
-                    pending_orders[key] += pending
+    pending_orders = pending_quantities(load_json("purchaseOrders.json"))
     
     missing = []
     
+    # Sadece kritik seviyedeki kalemler (sıralı indeks, en büyük eksik önce)
     for item in stock_items:
-        available = (item.get("onHand") or 0) - (item.get("reserved") or 0)
+        available = item["available"]
         critical = item.get("critical") or 0
+        shortage = critical - available + 10  # Kritik seviyenin 10 üstünü öner
+        pending = pending_orders.get(item_code(item), 0)
         
-        if available <= critical:
-            shortage = critical - available + 10  # Kritik seviyenin 10 üstünü öner
-            key = f"{item.get('productCode')}_{item.get('colorCode')}"
-            pending = pending_orders.get(key, 0)
-            
-            missing.append({
-                "itemId": item.get("id"),
-                "productCode": item.get("productCode"),
-                "colorCode": item.get("colorCode"),
-                "name": item.get("name"),
-                "colorName": item.get("colorName"),
-                "unit": item.get("unit"),
-                "supplierId": item.get("supplierId"),
-                "supplierName": item.get("supplierName"),
-                "onHand": item.get("onHand"),
-                "reserved": item.get("reserved"),
-                "available": available,
-                "critical": critical,
-                "suggestedQty": shortage,
-                "pendingInOrders": pending
-            })
+        missing.append({
+            "itemId": item.get("id"),
+            "productCode": item.get("productCode"),
+            "colorCode": item.get("colorCode"),
+            "name": item.get("name"),
+            "colorName": item.get("colorName"),
+            "unit": item.get("unit"),
+            "supplierId": item.get("supplierId"),
+            "supplierName": item.get("supplierName"),
+            "onHand": item.get("onHand"),
+            "reserved": item.get("reserved"),
+            "available": available,
+            "critical": critical,
+            "suggestedQty": shortage,
+            "pendingInOrders": pending
+        })
     
     return missing
 
@@ -471,10 +458,8 @@ class SupplierTransactionIn(BaseModel):
 @router.get("/suppliers/{supplier_id}/transactions")
 def get_supplier_transactions(supplier_id: str):
     """Tedarikçi/bayi ürün hareketlerini getir"""
-    transactions = load_json("supplierTransactions.json")
-    
-    # Bu tedarikçiye ait hareketleri filtrele
-    supplier_txs = [t for t in transactions if t.get("supplierId") == supplier_id]
+    # Bu tedarikçiye ait hareketler
+    supplier_txs = find_by("supplierTransactions.json", "supplierId", supplier_id)
     
     # Ürün bazlı bakiye hesapla
     product_balances = {}
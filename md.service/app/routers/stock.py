@@ -1,12 +1,83 @@
 import uuid
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 
-from ..data_loader import load_json, save_json
+from ..data_loader import (
+    DuplicateKeyError,
+    count_records,
+    find_by,
+    get_by_id,
+    get_by_ids,
+    get_by_key,
+    insert_one,
+    iter_records,
+    load_json,
+    save_json,
+    search_records,
+    sorted_index,
+    transaction,
+    update_one,
+)
+from ..allocation import Allocator, impact_report
+from ..ledger import append_movement, balance_at, count_movements, ledger_files, movements as ledger_movements
+from ..pagination import Page
+from ..search import fold
+from ..spreadsheet import SpreadsheetError, csv_chunks, read_rows, xlsx_chunks
+from ..stock_analytics import (
+    DEFAULT_HOLDING_RATE,
+    DEFAULT_ORDER_COST,
+    DEFAULT_SERVICE_LEVEL,
+    DEFAULT_WINDOW_DAYS,
+    reorder_suggestions,
+)
+from ..stock_counts import (
+    CANCELLED as COUNT_CANCELLED,
+    COUNT_LINES,
+    COUNTS,
+    OPEN as COUNT_OPEN,
+    POSTED as COUNT_POSTED,
+    merge_count,
+    now,
+    variance,
+)
+from ..stock_history import GROUPS, monthly_totals, period_totals, valuation
+from ..stock_levels import CRITICAL_INDEX, by_shortage, item_code, pending_quantities
 
 router = APIRouter(prefix="/stock", tags=["stock"])
 
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
+
+
+# Toplu içe / dışa aktarım sütunları; dışa aktarılan dosya olduğu gibi geri yüklenebilir
+ITEM_COLUMNS = [
+    "productCode", "colorCode", "name", "colorName", "unit", "supplierId", "supplierName",
+    "onHand", "reserved", "critical", "unitCost", "notes",
+]
+EXPORT_COLUMNS = ["id", *ITEM_COLUMNS, "available", "isCritical", "lastUpdated"]
+NUMERIC_COLUMNS = ("onHand", "reserved", "critical", "unitCost")
+# Başlıklar (alan adı ya da Türkçe karşılığı, katlanmış) -> alan
+IMPORT_HEADERS = {
+    fold(header): column
+    for header, column in {
+        **{column: column for column in ITEM_COLUMNS},
+        "Ürün Kodu": "productCode",
+        "Renk Kodu": "colorCode",
+        "Ürün Adı": "name",
+        "Renk Adı": "colorName",
+        "Birim": "unit",
+        "Tedarikçi Kodu": "supplierId",
+        "Tedarikçi": "supplierName",
+        "Eldeki": "onHand",
+        "Rezerve": "reserved",
+        "Kritik": "critical",
+        "Birim Maliyet": "unitCost",
+        "Notlar": "notes",
+    }.items()
+}
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
 
 class StockItemIn(BaseModel):
     productCode: str
@@ -41,18 +112,61 @@ class StockItemUpdate(BaseModel):
 class MovementIn(BaseModel):
     itemId: str
     qty: float
-    type: str  # stockIn, stockOut, reserve, release
+    type: str  # stockIn, stockOut, reserve, release, consume
     reason: str | None = None
     operator: str | None = None
     reference: str | None = None
     jobId: str | None = None
 
 
+class MovementBatch(BaseModel):
+    movements: list[MovementIn]
+    mode: str = Field("atomic", pattern="^(atomic|bestEffort)$")  # atomic: hepsi ya da hiçbiri
+
+
+class CountSessionIn(BaseModel):
+    name: str | None = None
+    supplierId: str | None = None  # sadece bu tedarikçinin kalemleri
+    itemIds: list[str] | None = None  # ya da sadece bu kalemler (verilmezse tüm stok)
+    operator: str | None = None
+
+
+class CountLine(BaseModel):
+    itemId: str | None = None
+    productCode: str | None = None  # itemId yerine barkoddan okunan kodlar
+    colorCode: str | None = None
+    qty: float = Field(..., ge=0)
+    mode: str = Field("set", pattern="^(set|add)$")  # set: sayılan miktar, add: okutma başına artış
+    countedAt: str | None = None  # çevrimdışı sayımda cihazdaki sayım zamanı (ISO); yoksa alındığı an
+
+
+class CountBatch(BaseModel):
+    batchId: str | None = None  # aynı parti tekrar gönderilirse bir kez işlenir
+    lines: list[CountLine]
+
+
+class CountPost(BaseModel):
+    zeroUncounted: bool = False  # sayılmayan kalemler 0 kabul edilir
+    operator: str | None = None
+
+
+class AvailabilityLine(BaseModel):
+    itemId: str
+    qty: float
+
+
+class AvailabilityCheck(BaseModel):
+    items: list[AvailabilityLine]
+    jobId: str | None = None  # verilirse işin kendi bekleyen rezervasyonları kullanılabilir sayılır
+
+
 class BulkReservation(BaseModel):
     jobId: str
     items: list  # [{itemId, qty}]
     reserveType: str = "reserve"  # reserve | consume (stoktan düş)
     note: str | None = None
+    priority: int = 0  # rezervasyon önceliği: yüksek olan, başka işin tüketiminden en son etkilenir
+    dryRun: bool = False  # sadece önizleme: hiçbir şey yazılmaz
 
 
 @router.get("/items")
@@ -60,87 +174,196 @@ def list_items(
     productCode: str | None = None,
     colorCode: str | None = None,
     supplierId: str | None = None,
-    critical_only: bool = False
+    critical_only: bool = False,
+    page: Page = Depends(),
 ):
     """Stok kalemlerini listele, opsiyonel filtrelerle"""
-    items = load_json("stockItems.json")
+    key = None  # sayfalama sırası: verilmezse depo / arama sırası
+    if productCode or colorCode:
+        # Kod önekleri arama indeksinden (sonuç kod sırasıyla)
+        items = search_records("stockItems.json", "items", product_code=productCode, color_code=colorCode)
+    elif supplierId:
+        items = find_by("stockItems.json", "supplierId", supplierId)
+    elif critical_only:
+        items = sorted_index("stockItems.json", CRITICAL_INDEX)
+        key = by_shortage
+    else:
+        items = load_json("stockItems.json")
     
-    if productCode:
-        items = [i for i in items if i.get("productCode", "").startswith(productCode)]
-    if colorCode:
-        items = [i for i in items if i.get("colorCode", "").startswith(colorCode)]
     if supplierId:
         items = [i for i in items if i.get("supplierId") == supplierId]
     if critical_only:
-        items = [i for i in items if (i.get("onHand", 0) - i.get("reserved", 0)) <= i.get("critical", 0)]
+        items = [i for i in items if i.get("isCritical")]
     
-    return items
+    return page.apply(items, key=key)
 
 
 @router.get("/items/search")
 def search_items(
     q: str = Query(None, description="Ürün kodu veya adı ile arama"),
     productCode: str = Query(None, description="Ürün kodu ile filtrele"),
-    colorCode: str = Query(None, description="Renk kodu ile filtrele")
+    colorCode: str = Query(None, description="Renk kodu ile filtrele"),
+    limit: int = Query(50, ge=1, le=500, description="En fazla sonuç sayısı"),
 ):
-    """Ürün arama - klavye odaklı stok girişi için"""
-    items = load_json("stockItems.json")
-    
-    if q:
-        q_lower = q.lower()
-        items = [i for i in items if 
-                 q_lower in i.get("productCode", "").lower() or
-                 q_lower in i.get("name", "").lower() or
-                 q_lower in i.get("colorName", "").lower()]
-    
-    if productCode:
-        items = [i for i in items if i.get("productCode", "").startswith(productCode)]
-    
-    if colorCode:
-        items = [i for i in items if i.get("colorCode", "").startswith(colorCode)]
-    
-    # Her ürün için kullanılabilir stok hesapla
-    for item in items:
-        item["available"] = (item.get("onHand", 0) or 0) - (item.get("reserved", 0) or 0)
-        item["isCritical"] = item["available"] <= (item.get("critical", 0) or 0)
-    
-    return items
+    """
+    Ürün arama - klavye odaklı stok girişi için.
+    Sıralama: ürün kodu tam / önek eşleşmesi, isim kelimesi öneki, alt dizge (3+ karakter).
+    Büyük/küçük harf Türkçe kurallarıyla katlanır (app/search.py).
+    """
+    # available / isCritical kayıtlarda hazır tutulur (app/stock_levels.py)
+    return search_records(
+        "stockItems.json", "items",
+        q=q, product_code=productCode, color_code=colorCode, limit=limit,
+    )
+
+
+@router.get("/items/export")
+def export_items(format: str = Query("csv", pattern="^(csv|xlsx)$")):
+    """Tüm stok kalemleri CSV ya da XLSX olarak, parça parça gönderilir (içe aktarımla aynı sütunlar)"""
+    rows = ([item.get(column) for column in EXPORT_COLUMNS] for item in iter_records("stockItems.json"))
+    if format == "xlsx":
+        chunks, media_type = xlsx_chunks(EXPORT_COLUMNS, rows, sheet_name="Stok"), XLSX_MEDIA_TYPE
+    else:
+        chunks, media_type = csv_chunks(EXPORT_COLUMNS, rows), "text/csv; charset=utf-8"
+    filename = f"stok-{datetime.utcnow().isoformat()[:10]}.{format}"
+    return StreamingResponse(chunks, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@router.post("/items/import")
+def import_items(file: UploadFile = File(...), dryRun: bool = False):
+    """
+    Toplu stok kalemi içe aktarımı (CSV ya da XLSX, satır satır okunur).
+    (productCode, colorCode) mevcutsa kalem güncellenir (boş hücreler değiştirilmez), yoksa eklenir.
+    Geçerli satırlar tek işlemde yazılır; hatalı satırlar `errors` içinde satır numarasıyla döner.
+    dryRun=true sadece doğrular ve sayar.
+    """
+    try:
+        staged, errors, ignored = _stage_import(read_rows(file.filename, file.file))
+    except SpreadsheetError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    total = len(staged) + len(errors)
+    today = datetime.utcnow().isoformat()[:10]
+    created = updated = unchanged = 0
+    with transaction("stockItems.json") as tx:
+        for row_no, values in staged:
+            existing = tx.get_by_key("stockItems.json", "code", values["productCode"], values["colorCode"])
+            if existing is None:
+                try:
+                    record = StockItemIn(**values).model_dump()
+                except ValidationError as exc:
+                    errors.append(_import_error(row_no, values, exc))
+                    continue
+                tx.insert("stockItems.json", {
+                    "id": f"STK-{str(uuid.uuid4())[:8].upper()}",
+                    **record,
+                    "lastUpdated": today,
+                })
+                created += 1
+                continue
+            changes = {k: v for k, v in values.items() if existing.get(k) != v}
+            if not changes:
+                unchanged += 1
+                continue
+            changes["lastUpdated"] = today
+            existing.update(changes)
+            tx.update("stockItems.json", existing["id"], changes)
+            updated += 1
+        if dryRun:
+            tx.rollback()
+
+    errors.sort(key=lambda error: error["row"])
+    return {
+        "rows": total,
+        "created": created,
+        "updated": updated,
+        "unchanged": unchanged,
+        "failed": len(errors),
+        "errors": errors,
+        "ignoredColumns": sorted(ignored),
+        "dryRun": dryRun,
+    }
+
+
+def _stage_import(rows) -> tuple[list[tuple[int, dict]], list[dict], set[str]]:
+    """Satırları alanlara çevirir ve tür doğrulaması yapar (kilit almadan); tekrar eden kodlar hatadır"""
+    staged = []
+    errors = []
+    ignored: set[str] = set()
+    seen: dict[tuple, int] = {}
+    for row_no, row in rows:
+        values = {}
+        for header, cell in row.items():
+            column = IMPORT_HEADERS.get(fold(header).strip())
+            if column is None:
+                ignored.add(header)
+                continue
+            cell = cell.strip()
+            if cell == "":
+                continue
+            if column in NUMERIC_COLUMNS and "," in cell and "." not in cell:
+                cell = cell.replace(",", ".")  # 12,5
+            values[column] = cell
+        key = (values.get("productCode"), values.get("colorCode"))
+        if not key[0] or not key[1]:
+            errors.append(_import_error(row_no, values, "productCode ve colorCode zorunlu"))
+            continue
+        if key in seen:
+            errors.append(_import_error(row_no, values, f"Aynı ürün kodu ve renk kodu {seen[key]}. satırda da var"))
+            continue
+        try:
+            values = StockItemUpdate(**values).model_dump(exclude_none=True)
+        except ValidationError as exc:
+            errors.append(_import_error(row_no, values, exc))
+            continue
+        seen[key] = row_no
+        staged.append((row_no, values))
+    return staged, errors, ignored - set(EXPORT_COLUMNS)
+
+
+def _import_error(row_no: int, values: dict, error) -> dict:
+    if isinstance(error, ValidationError):
+        messages = [f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()]
+    else:
+        messages = [error]
+    return {
+        "row": row_no,
+        "productCode": values.get("productCode"),
+        "colorCode": values.get("colorCode"),
+        "errors": messages,
+    }
 
 
 @router.get("/items/{item_id}")
 def get_item(item_id: str):
     """Tek bir stok kalemini getir"""
-    items = load_json("stockItems.json")
-    for item in items:
-        if item.get("id") == item_id:
-            item["available"] = (item.get("onHand", 0) or 0) - (item.get("reserved", 0) or 0)
-            item["isCritical"] = item["available"] <= (item.get("critical", 0) or 0)
-            return item
-    raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+    item = get_by_id("stockItems.json", item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+    return item
+
+
+@router.get("/items/{item_id}/balance")
+def get_item_balance(item_id: str, date: str = Query(..., pattern=DATE_PATTERN, description="YYYY-MM-DD")):
+    """Kalemin verilen gün sonundaki eldeki / rezerve miktarı (hareket defteri snapshot + kuyruk)"""
+    balance = balance_at(item_id, date)
+    if balance is None:
+        raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+    return {"itemId": item_id, "date": date, **balance, "available": balance["onHand"] - balance["reserved"]}
 
 
 @router.get("/items/by-code/{product_code}/{color_code}")
 def get_item_by_code(product_code: str, color_code: str):
     """Ürün kodu ve renk kodu ile stok kalemini getir"""
-    items = load_json("stockItems.json")
-    for item in items:
-        if item.get("productCode") == product_code and item.get("colorCode") == color_code:
-            item["available"] = (item.get("onHand", 0) or 0) - (item.get("reserved", 0) or 0)
-            item["isCritical"] = item["available"] <= (item.get("critical", 0) or 0)
-            return item
-    raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+    item = get_by_key("stockItems.json", "code", product_code, color_code)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+    return item
 
 
 @router.post("/items", status_code=201)
 def create_item(payload: StockItemIn):
     """Yeni stok kalemi oluştur"""
-    items = load_json("stockItems.json")
-    
-    # Aynı ürün kodu + renk kodu kontrolü
-    for item in items:
-        if item.get("productCode") == payload.productCode and item.get("colorCode") == payload.colorCode:
-            raise HTTPException(status_code=400, detail="Bu ürün kodu ve renk kodu kombinasyonu zaten mevcut")
-    
     new_id = f"STK-{str(uuid.uuid4())[:8].upper()}"
     new_item = {
         "id": new_id,
@@ -148,24 +371,23 @@ def create_item(payload: StockItemIn):
         "lastUpdated": datetime.utcnow().isoformat()[:10]
     }
     
-    items.insert(0, new_item)
-    save_json("stockItems.json", items)
+    # Aynı ürün kodu + renk kodu: benzersiz indeks (data_loader.UNIQUE_INDEXES) reddeder
+    try:
+        insert_one("stockItems.json", new_item)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Bu ürün kodu ve renk kodu kombinasyonu zaten mevcut")
     return new_item
 
 
 @router.put("/items/{item_id}")
 def update_item(item_id: str, payload: StockItemUpdate):
     """Stok kalemini güncelle"""
-    items = load_json("stockItems.json")
-    for idx, item in enumerate(items):
-        if item.get("id") == item_id:
-            update_data = {k: v for k, v in payload.model_dump().items() if v is not None}
-            updated = {**item, **update_data}
-            updated["lastUpdated"] = datetime.utcnow().isoformat()[:10]
-            items[idx] = updated
-            save_json("stockItems.json", items)
-            return updated
-    raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+    update_data = {k: v for k, v in payload.model_dump().items() if v is not None}
+    update_data["lastUpdated"] = datetime.utcnow().isoformat()[:10]
+    updated = update_one("stockItems.json", item_id, update_data)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+    return updated
 
 
 @router.delete("/items/{item_id}")
@@ -177,43 +399,76 @@ def delete_item(item_id: str):
     return {"success": True, "id": item_id}
 
 
+def _movement_date(movement: dict) -> str:
+    return movement.get("date") or ""
+
+
 @router.get("/movements")
 def list_movements(
     itemId: str | None = None,
     jobId: str | None = None,
-    limit: int = 100
+    since: str | None = Query(None, pattern=DATE_PATTERN, description="Bu tarihten (YYYY-MM-DD) itibaren"),
+    until: str | None = Query(None, pattern=DATE_PATTERN, description="Bu tarihe (YYYY-MM-DD) kadar"),
+    page: Page = Depends(),
 ):
-    """Stok hareketlerini listele"""
-    movements = load_json("stockMovements.json")
-    
-    if itemId:
-        movements = [m for m in movements if m.get("itemId") == itemId]
-    if jobId:
-        movements = [m for m in movements if m.get("jobId") == jobId]
-    
-    return movements[:limit]
+    """Stok hareketlerini listele (yeniden eskiye, aylık defter segmentlerinden)"""
+    # Cursor son kaydın tarihini taşır: daha yeni segmentler hiç okunmaz
+    read_until = until
+    if page.after is not None and isinstance(page.after[0], str) and (until is None or page.after[0] < until):
+        read_until = page.after[0]
+    movements = ledger_movements(item_id=itemId, job_id=jobId, since=since, until=read_until)
+    if page.streaming:
+        return page.apply(movements, key=_movement_date, descending=True)
+    # Sayfa tembel okunur: cursor'un segmentinden başlar, sayfa dolunca durur
+    total = count_movements(item_id=itemId, job_id=jobId, since=since, until=until)
+    return page.apply(movements, default_limit=100, total=total, key=_movement_date, descending=True)
 
 
-@router.post("/movements", status_code=201)
-def create_movement(payload: MovementIn):
-    """Stok hareketi oluştur"""
-    items = load_json("stockItems.json")
-    movements = load_json("stockMovements.json")
-    
-    # Find item
-    target = None
-    target_idx = -1
-    for idx, item in enumerate(items):
-        if item.get("id") == payload.itemId:
-            target = item
-            target_idx = idx
-            break
-    
+@router.get("/valuation")
+def get_valuation(date: str | None = Query(None, pattern=DATE_PATTERN, description="YYYY-MM-DD (varsayılan bugün)")):
+    """
+    Verilen gün sonundaki stok değeri (onHand × unitCost): kalem satırları, tedarikçi toplamları.
+    Ay sonları hareket defterinin aylık özetlerinden okunur. Birim maliyet kalemin bugünkü değeridir.
+    """
+    return valuation(date)
+
+
+@router.get("/history/totals")
+def get_history_totals(
+    since: str | None = Query(None, pattern=DATE_PATTERN, description="Bu tarihten (YYYY-MM-DD) itibaren"),
+    until: str | None = Query(None, pattern=DATE_PATTERN, description="Bu tarihe (YYYY-MM-DD) kadar"),
+    groupBy: str = "item",
+    monthly: bool = False,
+):
+    """Dönem içindeki giriş / çıkış / rezerv / serbest bırakma / tüketim miktarları; kalem, tedarikçi ya da iş bazında"""
+    if groupBy not in GROUPS:
+        raise HTTPException(status_code=400, detail=f"groupBy şunlardan biri olmalı: {', '.join(GROUPS)}")
+    if monthly:
+        if since is None:
+            raise HTTPException(status_code=400, detail="Aylık kırılım için since gerekli")
+        return {"since": since, "until": until, "groupBy": groupBy, "periods": monthly_totals(since, until, groupBy)}
+    return {"since": since, "until": until, "groupBy": groupBy, "rows": period_totals(since, until, groupBy)}
+
+
+MOVEMENT_TYPES = ("stockIn", "stockOut", "reserve", "release", "consume")
+
+
+def _apply_movement(tx, payload: MovementIn) -> tuple[dict, dict]:
+    """
+    Hareketi işlemdeki kalemin çalışma kopyasına uygular ve deftere ekler; (kalem, hareket) döner.
+    Doğrulama kalem değişmeden önce yapılır (404 / 400): hata durumunda kalem olduğu gibi kalır.
+    Kalemin kendisi çağıran tarafından tx.update ile yazılır.
+    """
+    if payload.type not in MOVEMENT_TYPES:
+        raise HTTPException(status_code=400, detail=f"Geçersiz hareket tipi: {payload.type}")
+    if payload.qty <= 0:
+        raise HTTPException(status_code=400, detail="Miktar sıfırdan büyük olmalı")
+    target = tx.get_by_id("stockItems.json", payload.itemId)
     if not target:
         raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
-    
+
     qty = payload.qty
-    
+
     # Apply movement
     if payload.type == "stockIn":
         target["onHand"] = (target.get("onHand") or 0) + qty
@@ -233,17 +488,16 @@ def create_movement(payload: MovementIn):
         # Rezervasyonu kaldır ve stoktan düş (üretime alındığında)
         target["reserved"] = max(0, (target.get("reserved") or 0) - qty)
         target["onHand"] = max(0, (target.get("onHand") or 0) - qty)
-    
+
     target["lastUpdated"] = datetime.utcnow().isoformat()[:10]
-    items[target_idx] = target
-    
+
     # Create movement record
     change = qty if payload.type in ("stockIn",) else -qty
     if payload.type == "reserve":
         change = qty  # Rezervasyon pozitif gösterilir
     elif payload.type == "release":
         change = -qty
-    
+
     movement = {
         "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
         "date": datetime.utcnow().isoformat()[:10],
@@ -258,44 +512,102 @@ def create_movement(payload: MovementIn):
         "reference": payload.reference,
         "jobId": payload.jobId,
     }
-    
-    movements.insert(0, movement)
-    
-    save_json("stockItems.json", items)
-    save_json("stockMovements.json", movements)
-    
+
+    append_movement(tx, movement, target)
+    tx.publish("stock.movement.created", {"movement": movement, "onHand": target.get("onHand"), "reserved": target.get("reserved")})
+    return target, movement
+
+
+@router.post("/movements", status_code=201)
+def create_movement(payload: MovementIn):
+    """Stok hareketi oluştur"""
+    with transaction("stockItems.json", *ledger_files()) as tx:
+        target, movement = _apply_movement(tx, payload)
+        tx.update("stockItems.json", target["id"], target)
+
     return {"item": target, "movement": movement}
 
 
+@router.post("/movements/batch", status_code=201)
+def create_movements(payload: MovementBatch, response: Response):
+    """
+    Sıralı hareket listesini tek işlemde uygular (sayım, mal kabul oturumları).
+    Satırlar sırayla ve her biri öncekilerin sonucunu görerek doğrulanır; kalemler ve defter bir kez yazılır.
+    - atomic: bir satır bile geçersizse hiçbir şey yazılmaz (400, satır hatalarıyla).
+    - bestEffort: geçersiz satırlar atlanır, geçerliler yazılır.
+    Her satır için sonuç: {line, status: ok | error, movement, onHand, reserved} ya da {line, status, itemId, error}.
+    """
+    results = []
+    touched: dict[str, dict] = {}
+    with transaction("stockItems.json", *ledger_files()) as tx:
+        for line, movement_in in enumerate(payload.movements, start=1):
+            try:
+                target, movement = _apply_movement(tx, movement_in)
+            except HTTPException as exc:
+                results.append({"line": line, "status": "error", "itemId": movement_in.itemId, "error": exc.detail})
+                continue
+            touched[target["id"]] = target
+            results.append({
+                "line": line,
+                "status": "ok",
+                "movement": movement,
+                "onHand": target.get("onHand"),
+                "reserved": target.get("reserved"),
+            })
+
+        errors = [result for result in results if result["status"] == "error"]
+        if errors and payload.mode == "atomic":
+            tx.rollback()
+        else:
+            for item_id, target in touched.items():
+                tx.update("stockItems.json", item_id, target)
+
+    if tx.rolled_back:
+        raise HTTPException(status_code=400, detail={
+            "message": "Geçersiz satırlar var, hiçbir hareket yazılmadı",
+            "errors": errors,
+        })
+
+    applied = len(results) - len(errors)
+    if not applied:
+        response.status_code = 200
+    return {"mode": payload.mode, "applied": applied, "failed": len(errors), "results": results}
+
+
 @router.post("/bulk-reserve", status_code=201)
-def bulk_reserve(payload: BulkReservation):
-    """Toplu rezervasyon veya stoktan düşme (iş için)"""
-    items = load_json("stockItems.json")
-    movements = load_json("stockMovements.json")
-    reservations = load_json("reservations.json")
-    
+def bulk_reserve(payload: BulkReservation, response: Response):
+    """
+    Toplu rezervasyon veya stoktan düşme (iş için).
+    consume: serbest stok yetmezse eksik kısım diğer işlerin bekleyen rezervasyonlarından düşülür
+    (app/allocation.py: düşük öncelikli ve en yeni rezervasyon önce). dryRun=true aynı hesabı
+    kilitler altında yapar, hiçbir şey yazmadan sonucu ve etki raporunu döndürür.
+    """
+    with transaction("stockItems.json", "reservations.json", *ledger_files()) as tx:
+        result = _bulk_reserve(tx, payload)
+        if payload.dryRun:
+            tx.rollback()
+            response.status_code = 200
+    return result
+
+
+def _bulk_reserve(tx, payload: BulkReservation) -> dict:
+    allocator = Allocator(lambda item_id: search_records("reservations.json", "pending", item_id=item_id))
+
     results = []
     errors = []
-    
+
     for line in payload.items:
         item_id = line.get("itemId")
         qty = line.get("qty", 0)
-        
-        # Find item
-        target = None
-        target_idx = -1
-        for idx, item in enumerate(items):
-            if item.get("id") == item_id:
-                target = item
-                target_idx = idx
-                break
-        
+
+        # İşlemin çalışma kopyası: aynı kalemin sonraki satırları önceki satırların değişikliğini görür
+        target = tx.get_by_id("stockItems.json", item_id)
         if not target:
             errors.append({"itemId": item_id, "error": "Stok kalemi bulunamadı"})
             continue
-        
+
         available = (target.get("onHand") or 0) - (target.get("reserved") or 0)
-        
+
         if payload.reserveType == "consume":
             # Direkt stoktan düş (üretime al)
             if qty > (target.get("onHand") or 0):
@@ -305,12 +617,12 @@ def bulk_reserve(payload: BulkReservation):
                     "error": f"Yetersiz stok. Mevcut: {target.get('onHand')}, İstenen: {qty}"
                 })
                 continue
-            
+
             # Stoktan düş
             old_on_hand = target.get("onHand") or 0
             old_reserved = target.get("reserved") or 0
             target["onHand"] = max(0, old_on_hand - qty)
-            
+
             # Eğer düşülen miktar, başka işlerin rezervasyonunu etkiliyor ise
             # reserved değerini de ayarla (available negatif olamaz)
             new_available = target["onHand"] - old_reserved
@@ -319,26 +631,10 @@ def bulk_reserve(payload: BulkReservation):
                 # Başka işlerin rezervasyonları etkilendi
                 affected_amount = abs(new_available)
                 target["reserved"] = max(0, old_reserved - affected_amount)
-                
-                # Etkilenen rezervasyonları bul ve güncelle
-                for rsv in reservations:
-                    if rsv.get("itemId") == item_id and rsv.get("status") == "Beklemede" and rsv.get("jobId") != payload.jobId:
-                        if affected_amount <= 0:
-                            break
-                        rsv_qty = rsv.get("qty", 0)
-                        reduce_by = min(rsv_qty, affected_amount)
-                        rsv["qty"] = rsv_qty - reduce_by
-                        rsv["affectedBy"] = payload.jobId
-                        rsv["note"] = f"Stok başka iş için kullanıldı (-{reduce_by})"
-                        affected_amount -= reduce_by
-                        if rsv["qty"] <= 0:
-                            rsv["status"] = "İptal"
-                        affected_reservations.append({
-                            "reservationId": rsv.get("id"),
-                            "jobId": rsv.get("jobId"),
-                            "reducedBy": reduce_by
-                        })
-            
+                affected_reservations = allocator.steal(item_id, affected_amount, payload.jobId)
+                for impact in affected_reservations:
+                    tx.update("reservations.json", impact["reservationId"], allocator.changed[impact["reservationId"]])
+
             movement_type = "stockOut"
             reason = f"Üretime alındı - {payload.jobId}"
             if affected_reservations:
@@ -354,13 +650,13 @@ def bulk_reserve(payload: BulkReservation):
                     "shortage": qty - available
                 })
                 continue
-            
+
             target["reserved"] = (target.get("reserved") or 0) + qty
             movement_type = "reserve"
             reason = f"Rezerve edildi - {payload.jobId}"
-            
+
             # Rezervasyon kaydı
-            reservations.insert(0, {
+            tx.insert("reservations.json", {
                 "id": f"RSV-{str(uuid.uuid4())[:8].upper()}",
                 "jobId": payload.jobId,
                 "itemId": item_id,
@@ -369,15 +665,16 @@ def bulk_reserve(payload: BulkReservation):
                 "item": target.get("name"),
                 "qty": qty,
                 "unit": target.get("unit"),
+                "priority": payload.priority,
                 "createdAt": datetime.utcnow().isoformat(),
                 "status": "Beklemede"
             })
-        
+
         target["lastUpdated"] = datetime.utcnow().isoformat()[:10]
-        items[target_idx] = target
-        
+        tx.update("stockItems.json", target["id"], target)
+
         # Movement record
-        movements.insert(0, {
+        movement = append_movement(tx, {
             "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
             "date": datetime.utcnow().isoformat()[:10],
             "item": target.get("name"),
@@ -389,8 +686,9 @@ def bulk_reserve(payload: BulkReservation):
             "reason": reason,
             "operator": "Sistem",
             "jobId": payload.jobId,
-        })
-        
+        }, target)
+        tx.publish("stock.movement.created", {"movement": movement, "onHand": target.get("onHand"), "reserved": target.get("reserved")})
+
         result_item = {
             "itemId": item_id,
             "name": target.get("name"),
@@ -402,59 +700,48 @@ def bulk_reserve(payload: BulkReservation):
         if payload.reserveType == "consume" and affected_reservations:
             result_item["affectedReservations"] = affected_reservations
         results.append(result_item)
-    
-    save_json("stockItems.json", items)
-    save_json("stockMovements.json", movements)
-    save_json("reservations.json", reservations)
-    
+
     return {
         "success": len(errors) == 0,
         "results": results,
         "errors": errors,
-        "jobId": payload.jobId
+        "jobId": payload.jobId,
+        "impact": impact_report(results),
+        "dryRun": payload.dryRun,
     }
 
 
 @router.get("/reservations")
-def list_reservations(jobId: str | None = None, status: str | None = None):
+def list_reservations(jobId: str | None = None, status: str | None = None, page: Page = Depends()):
     """Rezervasyonları listele"""
-    reservations = load_json("reservations.json")
-    
     if jobId:
-        reservations = [r for r in reservations if r.get("jobId") == jobId]
+        reservations = find_by("reservations.json", "jobId", jobId)
+    else:
+        reservations = load_json("reservations.json")
+    
     if status:
         reservations = [r for r in reservations if r.get("status") == status]
     
-    return reservations
+    return page.apply(reservations)
 
 
 @router.put("/reservations/{reservation_id}/release")
 def release_reservation(reservation_id: str):
     """Rezervasyonu serbest bırak"""
-    reservations = load_json("reservations.json")
-    items = load_json("stockItems.json")
-    movements = load_json("stockMovements.json")
-    
-    target_res = None
-    target_idx = -1
-    for idx, res in enumerate(reservations):
-        if res.get("id") == reservation_id:
-            target_res = res
-            target_idx = idx
-            break
+    with transaction("stockItems.json", "reservations.json", *ledger_files()) as tx:
+        target_res = tx.get_by_id("reservations.json", reservation_id)
+        if not target_res:
+            raise HTTPException(status_code=404, detail="Rezervasyon bulunamadı")
     
-    if not target_res:
-        raise HTTPException(status_code=404, detail="Rezervasyon bulunamadı")
-    
-    # Find item and release
-    for idx, item in enumerate(items):
-        if item.get("id") == target_res.get("itemId"):
+        # Find item and release
+        item = tx.get_by_id("stockItems.json", target_res.get("itemId"))
+        if item:
             item["reserved"] = max(0, (item.get("reserved") or 0) - target_res.get("qty", 0))
             item["lastUpdated"] = datetime.utcnow().isoformat()[:10]
-            items[idx] = item
+            tx.update("stockItems.json", item["id"], item)
             
             # Movement record
-            movements.insert(0, {
+            movement = append_movement(tx, {
                 "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
                 "date": datetime.utcnow().isoformat()[:10],
                 "item": item.get("name"),
@@ -466,59 +753,74 @@ def release_reservation(reservation_id: str):
                 "reason": f"Rezervasyon iptal - {target_res.get('jobId')}",
                 "operator": "Sistem",
                 "jobId": target_res.get("jobId"),
-            })
-            break
+            }, item)
+            tx.publish("stock.movement.created", {"movement": movement, "onHand": item.get("onHand"), "reserved": item.get("reserved")})
     
-    # Update reservation status
-    target_res["status"] = "İptal"
-    target_res["releasedAt"] = datetime.utcnow().isoformat()
-    reservations[target_idx] = target_res
-    
-    save_json("stockItems.json", items)
-    save_json("stockMovements.json", movements)
-    save_json("reservations.json", reservations)
+        # Update reservation status
+        target_res["status"] = "İptal"
+        target_res["releasedAt"] = datetime.utcnow().isoformat()
+        target_res = tx.update("reservations.json", target_res["id"], target_res)
     
     return {"success": True, "reservation": target_res}
 
 
+@router.get("/analytics/reorder")
+def get_reorder_analytics(
+    windowDays: int = Query(DEFAULT_WINDOW_DAYS, ge=7, le=730, description="Tüketim hızı için geriye dönük gün sayısı"),
+    orderCost: float = Query(DEFAULT_ORDER_COST, ge=0, description="Sipariş başına sabit maliyet"),
+    holdingRate: float = Query(DEFAULT_HOLDING_RATE, gt=0, le=5, description="Yıllık elde tutma maliyeti / birim maliyet"),
+    serviceLevel: float = Query(DEFAULT_SERVICE_LEVEL, gt=0.5, lt=1, description="Stoksuz kalmama olasılığı hedefi"),
+    onlyNeeded: bool = False,
+    page: Page = Depends(),
+):
+    """
+    Tüm kalemler için tüketim hızı, stokla karşılanan gün, yeniden sipariş noktası, EOQ ve önerilen
+    sipariş miktarı; en acil kalem önce. `onlyNeeded` ile sadece sipariş gerekenler.
+    """
+    rows = reorder_suggestions(windowDays, orderCost, holdingRate, serviceLevel)
+    if onlyNeeded:
+        rows = [row for row in rows if row["needsOrder"]]
+    return page.apply(rows)
+
+
 @router.get("/critical")
 def get_critical_items():
-    """Kritik seviyedeki stok kalemlerini getir"""
-    items = load_json("stockItems.json")
-    critical = []
-    
-    for item in items:
-        available = (item.get("onHand") or 0) - (item.get("reserved") or 0)
-        if available <= (item.get("critical") or 0):
-            item["available"] = available
-            item["shortage"] = (item.get("critical") or 0) - available
-            critical.append(item)
-    
+    """Kritik seviyedeki stok kalemlerini getir (en büyük eksik önce)"""
+    critical = sorted_index("stockItems.json", CRITICAL_INDEX)
+    for item in critical:
+        item["shortage"] = (item.get("critical") or 0) - item["available"]
     return critical
 
 
-@router.get("/availability-check")
-def check_availability(items: str):
-    """Birden fazla ürün için stok yeterliliği kontrolü
-    items format: itemId:qty,itemId:qty,...
+def _check_lines(lines: list[tuple[str, float]], job_id: str | None = None) -> dict:
     """
-    stock_items = load_json("stockItems.json")
-    
+    Stok yeterliliği: aynı kalem birden fazla satırda geçiyorsa miktarlar toplanır.
+    Kullanılabilir stok = eldeki - rezerve (bekleyen rezervasyonlar `reserved` içinde);
+    jobId verilirse işin kendi bekleyen rezervasyonları ona ayrılmış sayılır.
+    """
+    requested: dict[str, float] = {}
+    line_counts: dict[str, int] = {}
+    for item_id, qty in lines:
+        requested[item_id] = requested.get(item_id, 0) + qty
+        line_counts[item_id] = line_counts.get(item_id, 0) + 1
+
+    stock_items = get_by_ids("stockItems.json", requested)
+
+    held: dict[str, float] = {}
+    if job_id:
+        for rsv in find_by("reservations.json", "jobId", job_id):
+            if rsv.get("status") == "Beklemede" and rsv.get("itemId") in requested:
+                held[rsv["itemId"]] = held.get(rsv["itemId"], 0) + (rsv.get("qty") or 0)
+
+    # Açık siparişlerde teslim alınmamış miktarlar (eksik ürün listesiyle aynı hesap)
+    pending = pending_quantities(load_json("purchaseOrders.json"))
+    incoming = {item_id: pending.get(item_code(si), 0) for item_id, si in stock_items.items()}
+
     results = []
     total_shortage = False
-    
-    for item_str in items.split(","):
-        if ":" not in item_str:
-            continue
-        item_id, qty_str = item_str.split(":")
-        qty = float(qty_str)
-        
-        target = None
-        for si in stock_items:
-            if si.get("id") == item_id:
-                target = si
-                break
-        
+
+    for item_id, qty in requested.items():
+        target = stock_items.get(item_id)
         if not target:
             results.append({
                 "itemId": item_id,
@@ -527,25 +829,269 @@ def check_availability(items: str):
             })
             total_shortage = True
             continue
-        
-        available = (target.get("onHand") or 0) - (target.get("reserved") or 0)
+
+        available = target["available"] + held.get(item_id, 0)
         is_enough = available >= qty
-        
+        shortage = max(0, qty - available) if not is_enough else 0
+        pending_purchase = incoming.get(item_id, 0)
+
         if not is_enough:
             total_shortage = True
-        
-        results.append({
+
+        result = {
             "itemId": item_id,
             "name": target.get("name"),
             "productCode": target.get("productCode"),
             "colorCode": target.get("colorCode"),
+            "unit": target.get("unit"),
             "requested": qty,
+            "lines": line_counts[item_id],
             "available": available,
             "isEnough": is_enough,
-            "shortage": max(0, qty - available) if not is_enough else 0
-        })
-    
+            "shortage": shortage,
+            "pendingPurchase": pending_purchase,
+            "coveredByPurchase": shortage <= pending_purchase,
+        }
+        if job_id:
+            result["reservedForJob"] = held.get(item_id, 0)
+        results.append(result)
+
     return {
         "allAvailable": not total_shortage,
         "items": results
     }
+
+
+@router.get("/availability-check")
+def check_availability(items: str):
+    """Birden fazla ürün için stok yeterliliği kontrolü
+    items format: itemId:qty,itemId:qty,...
+    """
+    lines = []
+    for item_str in items.split(","):
+        if ":" not in item_str:
+            continue
+        item_id, qty_str = item_str.split(":")
+        lines.append((item_id, float(qty_str)))
+    return _check_lines(lines)
+
+
+@router.post("/availability-check")
+def check_availability_batch(payload: AvailabilityCheck):
+    """
+    Stok yeterliliği kontrolü (JSON gövde) - bir işin tüm malzeme listesi tek istekte.
+    Aynı kalem tekrar ederse miktarlar toplanır; açık siparişlerde bekleyen miktarlar da döner.
+    """
+    return _check_lines([(line.itemId, line.qty) for line in payload.items], payload.jobId)
+
+
+# ---------- Sayım oturumları (app/stock_counts.py) ----------
+
+def _count_summary(session: dict) -> dict:
+    # Beklenen bakiyeler (snapshot) büyük olabilir: listede ve özette dönmez
+    summary = {k: v for k, v in session.items() if k != "expected"}
+    summary["countedItems"] = count_records(COUNT_LINES, "sessionId", session["id"])
+    return summary
+
+
+def _open_count(tx, session_id: str) -> dict:
+    session = tx.get_by_id(COUNTS, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Sayım oturumu bulunamadı")
+    if session.get("status") != COUNT_OPEN:
+        raise HTTPException(status_code=400, detail="Sayım oturumu açık değil")
+    return session
+
+
+def _counted_at(value: str | None, session: dict, received: str) -> str:
+    if not value:
+        return received
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Geçersiz sayım zamanı: {value}")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    counted_at = moment.isoformat()
+    if counted_at < session["snapshotAt"]:
+        raise ValueError("Sayım zamanı oturum açılışından önce")
+    return min(counted_at, received)  # cihaz saati ileride olabilir
+
+
+@router.get("/counts")
+def list_counts(status: str | None = None, page: Page = Depends()):
+    """Sayım oturumları, yeniden eskiye"""
+    sessions = load_json(COUNTS)
+    if status:
+        sessions = [s for s in sessions if s.get("status") == status]
+    return page.apply([_count_summary(s) for s in sessions])
+
+
+@router.post("/counts", status_code=201)
+def create_count(payload: CountSessionIn):
+    """
+    Sayım oturumu aç: kapsamdaki kalemlerin onHand değerleri snapshot olarak saklanır.
+    Stok kilidi sadece snapshot alınırken tutulur; sayım boyunca hareketler yazılmaya devam eder.
+    """
+    with transaction(COUNTS, "stockItems.json") as tx:
+        if payload.itemIds is not None:
+            items = list(get_by_ids("stockItems.json", payload.itemIds).values())
+        elif payload.supplierId:
+            items = find_by("stockItems.json", "supplierId", payload.supplierId)
+        else:
+            items = load_json("stockItems.json")
+        if not items:
+            raise HTTPException(status_code=400, detail="Sayılacak kalem yok")
+        session = tx.insert(COUNTS, {
+            "id": f"CNT-{str(uuid.uuid4())[:8].upper()}",
+            "name": payload.name or f"Sayım {datetime.utcnow().isoformat()[:10]}",
+            "status": COUNT_OPEN,
+            "supplierId": payload.supplierId,
+            "snapshotAt": now(),
+            "createdBy": payload.operator or "Sistem",
+            "itemCount": len(items),
+            "expected": {item["id"]: item.get("onHand") or 0 for item in items},
+            "batches": [],
+        })
+        tx.publish("stock.count.created", {"id": session["id"], "itemCount": len(items)})
+    return _count_summary(session)
+
+
+@router.get("/counts/{session_id}")
+def get_count(session_id: str):
+    """Sayım oturumu özeti"""
+    session = get_by_id(COUNTS, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Sayım oturumu bulunamadı")
+    return _count_summary(session)
+
+
+@router.post("/counts/{session_id}/scans")
+def add_count_scans(session_id: str, payload: CountBatch):
+    """
+    Sayım partisi (okutmalar ya da çevrimdışı toplanmış sayımlar). Sadece sayım koleksiyonları
+    kilitlenir; geçerli satırlar tek işlemde yazılır, hatalı satırlar satır numarasıyla döner.
+    Aynı batchId ile tekrar gönderilen parti yeniden işlenmez.
+    """
+    received = now()
+    errors = []
+    applied = 0
+    with transaction(COUNTS, COUNT_LINES) as tx:
+        session = _open_count(tx, session_id)
+        if payload.batchId and payload.batchId in session.get("batches", []):
+            return {"sessionId": session_id, "batchId": payload.batchId, "duplicate": True, "applied": 0, "errors": []}
+
+        expected = session.get("expected") or {}
+        for line_no, line in enumerate(payload.lines, start=1):
+            item_id = line.itemId
+            if not item_id and line.productCode and line.colorCode:
+                item = get_by_key("stockItems.json", "code", line.productCode, line.colorCode)
+                item_id = item["id"] if item else None
+            if item_id not in expected:
+                errors.append({"line": line_no, "itemId": item_id, "error": "Kalem bu sayımın kapsamında değil"})
+                continue
+            try:
+                counted_at = _counted_at(line.countedAt, session, received)
+            except ValueError as exc:
+                errors.append({"line": line_no, "itemId": item_id, "error": str(exc)})
+                continue
+
+            # bu partide eklenen satırlar da bulunur: aynı kalemin sonraki okutmaları onu günceller
+            existing = tx.get_by_key(COUNT_LINES, "item", session_id, item_id)
+            changes = merge_count(existing, line.qty, line.mode, counted_at)
+            if changes is None:
+                errors.append({"line": line_no, "itemId": item_id, "error": "Daha yeni bir sayım kayıtlı"})
+                continue
+            if existing is None:
+                tx.insert(COUNT_LINES, {
+                    "id": f"CNL-{str(uuid.uuid4())[:8].upper()}",
+                    "sessionId": session_id,
+                    "itemId": item_id,
+                    **changes,
+                }, at="end")
+            else:
+                existing.update(changes)
+                tx.update(COUNT_LINES, existing["id"], changes)
+            applied += 1
+
+        if payload.batchId:
+            session["batches"] = [*session.get("batches", []), payload.batchId]
+            tx.update(COUNTS, session_id, {"batches": session["batches"]})
+
+    return {"sessionId": session_id, "batchId": payload.batchId, "duplicate": False, "applied": applied, "errors": errors}
+
+
+@router.get("/counts/{session_id}/variance")
+def count_variance(session_id: str, zeroUncounted: bool = False):
+    """Sayım farkları (önizleme, yazmaz): sayılan - sayım anındaki defter değeri, en büyük fark önce"""
+    session = get_by_id(COUNTS, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Sayım oturumu bulunamadı")
+    return {"session": _count_summary(session), **variance(session, zeroUncounted)}
+
+
+@router.post("/counts/{session_id}/post")
+def post_count(session_id: str, payload: CountPost):
+    """
+    Sayımı kapat: farklar toplu hesaplanır ve tüm düzeltme hareketleri (stockIn / stockOut,
+    reason "Sayım farkı") kalemlerle birlikte tek işlemde deftere yazılır. Düzeltme bugünkü
+    onHand'e eklenir; sayımdan sonraki hareketler korunur.
+    """
+    operator = payload.operator or "Sistem"
+    today = datetime.utcnow().isoformat()[:10]
+    adjustments = []
+    with transaction(COUNTS, COUNT_LINES, "stockItems.json", *ledger_files()) as tx:
+        session = _open_count(tx, session_id)
+        report = variance(session, payload.zeroUncounted)
+
+        for row in report["lines"]:
+            if not row["delta"]:
+                continue
+            target = tx.get_by_id("stockItems.json", row["itemId"])
+            if not target:
+                continue  # kalem sayım sırasında silinmiş
+            on_hand = target.get("onHand") or 0
+            change = max(0, on_hand + row["delta"]) - on_hand
+            if not change:
+                continue
+            target["onHand"] = on_hand + change
+            target["lastUpdated"] = today
+            tx.update("stockItems.json", target["id"], target)
+            movement = append_movement(tx, {
+                "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
+                "date": today,
+                "item": target.get("name"),
+                "itemId": target["id"],
+                "productCode": target.get("productCode"),
+                "colorCode": target.get("colorCode"),
+                "change": change,
+                "type": "stockIn" if change > 0 else "stockOut",
+                "reason": "Sayım farkı",
+                "operator": operator,
+                "reference": session_id,
+                "jobId": None,
+            }, target)
+            tx.publish("stock.movement.created", {"movement": movement, "onHand": target.get("onHand"), "reserved": target.get("reserved")})
+            adjustments.append({"itemId": target["id"], "delta": row["delta"], "change": change, "movementId": movement["id"]})
+
+        changes = {
+            "status": COUNT_POSTED,
+            "postedAt": now(),
+            "postedBy": operator,
+            "summary": {**report["summary"], "adjusted": len(adjustments)},
+        }
+        session.update(changes)
+        tx.update(COUNTS, session_id, changes)
+        tx.publish("stock.count.posted", {"id": session_id, "adjusted": len(adjustments)})
+
+    return {"session": _count_summary(session), "adjustments": adjustments}
+
+
+@router.post("/counts/{session_id}/cancel")
+def cancel_count(session_id: str):
+    """Sayımı iptal et (stok değişmez)"""
+    with transaction(COUNTS) as tx:
+        session = _open_count(tx, session_id)
+        session["status"] = COUNT_CANCELLED
+        tx.update(COUNTS, session_id, {"status": COUNT_CANCELLED, "cancelledAt": now()})
+    return _count_summary(session)
@@ -1,9 +1,10 @@
 import uuid
 from datetime import datetime
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
-from ..data_loader import load_json, save_json
+from ..data_loader import find_by, get_by_id, load_json, save_json
+from ..pagination import Page
 
 router = APIRouter(prefix="/suppliers", tags=["suppliers"])
 
@@ -47,7 +48,7 @@ class ProductTransaction(BaseModel):
 
 
 @router.get("/")
-def list_suppliers(type: str | None = None, category: str | None = None):
+def list_suppliers(type: str | None = None, category: str | None = None, page: Page = Depends()):
     """Tedarikçileri listele"""
     suppliers = load_json("suppliers.json")
     
@@ -56,7 +57,7 @@ def list_suppliers(type: str | None = None, category: str | None = None):
     if category:
         suppliers = [s for s in suppliers if category.lower() in (s.get("category") or "").lower()]
     
-    return suppliers
+    return page.apply(suppliers)
 
 
 @router.get("/{supplier_id}")
@@ -141,9 +142,7 @@ def get_supplier_transactions(
     productCode: str | None = None
 ):
     """Tedarikçi ile ürün bazlı hareketleri getir"""
-    transactions = load_json("supplierTransactions.json")
-    
-    result = [t for t in transactions if t.get("supplierId") == supplier_id]
+    result = find_by("supplierTransactions.json", "supplierId", supplier_id)
     
     if type:
         result = [t for t in result if t.get("type") == type]
@@ -198,15 +197,12 @@ def delete_transaction(supplier_id: str, transaction_id: str):
 @router.get("/{supplier_id}/balance")
 def get_supplier_balance(supplier_id: str):
     """Tedarikçi ile ürün bazlı bakiye özeti"""
-    suppliers = load_json("suppliers.json")
-    transactions = load_json("supplierTransactions.json")
-    
     # Tedarikçi kontrolü
-    supplier = next((s for s in suppliers if s.get("id") == supplier_id), None)
+    supplier = get_by_id("suppliers.json", supplier_id)
     if not supplier:
         raise HTTPException(status_code=404, detail="Tedarikçi bulunamadı")
     
-    supplier_trans = [t for t in transactions if t.get("supplierId") == supplier_id]
+    supplier_trans = find_by("supplierTransactions.json", "supplierId", supplier_id)
     
     # Ürün bazlı gruplama
     balance_map = {}
@@ -265,15 +261,13 @@ def get_supplier_balance(supplier_id: str):
 @router.get("/{supplier_id}/products")
 def get_supplier_products(supplier_id: str):
     """Bu tedarikçiden alınan ürünleri listele"""
-    stock_items = load_json("stockItems.json")
-    return [item for item in stock_items if item.get("supplierId") == supplier_id]
+    return find_by("stockItems.json", "supplierId", supplier_id)
 
 
 @router.get("/{supplier_id}/orders")
 def get_supplier_orders(supplier_id: str, status: str | None = None):
     """Bu tedarikçiye verilen siparişleri listele"""
-    orders = load_json("purchaseOrders.json")
-    result = [o for o in orders if o.get("supplierId") == supplier_id]
+    result = find_by("purchaseOrders.json", "supplierId", supplier_id)
     
     if status:
         result = [o for o in result if o.get("status") == status]
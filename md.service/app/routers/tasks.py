@@ -1,10 +1,12 @@
 import uuid
+from bisect import bisect_left, insort
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 from typing import Optional, List, Literal
 
-from ..data_loader import load_json, save_json
+from ..data_loader import cached_view, find_by, get_by_id, insert_one, load_json, save_json, transaction
+from ..pagination import Page
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
@@ -18,128 +20,170 @@ class TaskIn(BaseModel):
   bitisTarihi: Optional[str] = Field(None, description="Bitiş tarihi (ISO format)")
 
 
+def _display_names(personnel: list, teams: list) -> dict:
+  """(assigneeType, assigneeId) -> görünen ad (silinmemiş personel ve ekipler)"""
+  names = {("personnel", p.get("id")): f"{p.get('ad')} {p.get('soyad')}" for p in personnel if not p.get("deleted")}
+  names.update({("team", t.get("id")): f"👥 {t.get('ad')}" for t in teams if not t.get("deleted")})
+  return names
+
+
+def _assignee_names(assignments: list, names: dict) -> list:
+  keys = ((ca.get("assigneeType"), ca.get("assigneeId")) for ca in assignments)
+  return [names[key] for key in keys if key in names]
+
+
+def _is_active(assignment: dict) -> bool:
+  return not assignment.get("deleted") and assignment.get("active", True)
+
+
+def _refresh_row(view: dict, task_id: str) -> None:
+  """Görev satırının atama alanlarını ve byAssignee'deki yerini güncel atamalardan hesaplar"""
+  pos = view["rowOf"].get(task_id)
+  if pos is None:
+    return  # silinmiş ya da bilinmeyen görev
+  row = view["tasks"][pos]
+  assignments = view["assignments"]
+  current_assignments = [assignments[ta_id] for ta_id in view["byTask"].get(task_id, []) if _is_active(assignments[ta_id])]
+
+  old_keys = {(ca.get("assigneeType"), ca.get("assigneeId")) for ca in row.get("currentAssignments") or []}
+  new_keys = {(ca.get("assigneeType"), ca.get("assigneeId")) for ca in current_assignments}
+  for key in old_keys - new_keys:
+    positions = view["byAssignee"][key]
+    del positions[bisect_left(positions, pos)]
+    if not positions:
+      del view["byAssignee"][key]
+  for key in new_keys - old_keys:
+    insort(view["byAssignee"].setdefault(key, []), pos)
+
+  assigneeNames = _assignee_names(current_assignments, view["names"])
+  row.update({
+    "currentAssignment": current_assignments[0] if current_assignments else None,
+    "currentAssignments": current_assignments,
+    # Backward compatibility: assigneeName (virgülle ayrılmış)
+    "assigneeName": ", ".join(assigneeNames) if assigneeNames else None,
+    "assigneeType": current_assignments[0].get("assigneeType") if current_assignments else None,
+  })
+
+
+def _build_task_view(tasks: list, task_assignments: list, personnel: list, teams: list) -> dict:
+  """
+  Görev + aktif atamalar görünümü (tek doğrusal geçiş).
+  byAssignee: (assigneeType, assigneeId) -> görev sıraları (atama filtresi için ters indeks)
+  Atama yazmaları görünümü yeniden kurmaz, sadece ilgili görev satırını günceller
+  (_apply_assignment_ops); bunun için atamalar, görev başına atama sırası (byTask),
+  satır sıraları (rowOf) ve görünen adlar da görünümde tutulur.
+  """
+  view = {
+    "tasks": [],
+    "byAssignee": {},
+    "rowOf": {},
+    "assignments": {ta.get("id"): ta for ta in task_assignments},
+    "byTask": {},
+    "names": _display_names(personnel, teams),
+  }
+  for ta in task_assignments:
+    view["byTask"].setdefault(ta.get("taskId"), []).append(ta.get("id"))
+  for task in tasks:
+    if task.get("deleted"):
+      continue
+    view["rowOf"][task.get("id")] = len(view["tasks"])
+    view["tasks"].append(task)
+    _refresh_row(view, task.get("id"))
+  return view
+
+
+def _apply_assignment_ops(view: dict, ops: list[dict]) -> bool:
+  """task_assignments.json kayıt op'larını görünüme uygular; False: yeniden kurulmalı"""
+  assignments, by_task = view["assignments"], view["byTask"]
+  for op in ops:
+    if op["op"] == "insert":
+      record = dict(op["record"])
+      old = assignments.get(record.get("id"))
+      if old is None:
+        ids = by_task.setdefault(record.get("taskId"), [])
+        if op.get("at") == "end":
+          ids.append(record.get("id"))
+        else:
+          ids.insert(0, record.get("id"))
+      elif old.get("taskId") != record.get("taskId"):
+        return False
+      assignments[record.get("id")] = record
+    elif op["op"] == "patch":
+      record = assignments.get(op["id"])
+      if record is None:
+        continue
+      if op["patch"].get("taskId", record.get("taskId")) != record.get("taskId"):
+        return False
+      record.update(op["patch"])
+    else:
+      record = assignments.pop(op["id"], None)
+      if record is None:
+        continue
+      by_task[record.get("taskId")].remove(op["id"])
+    _refresh_row(view, record.get("taskId"))
+  return True
+
+
+def _task_view() -> dict:
+  return cached_view(
+    "tasks.withAssignees",
+    ("tasks.json", "task_assignments.json", "personnel.json", "teams.json"),
+    _build_task_view,
+    updates={"task_assignments.json": _apply_assignment_ops},
+  )
+
+
 @router.get("/")
 def list_tasks(
   durum: Optional[str] = None,
   oncelik: Optional[str] = None,
   assigneeType: Optional[str] = None,  # "personnel" or "team"
   assigneeId: Optional[str] = None,
+  page: Page = Depends(),
 ):
-  tasks = load_json("tasks.json")
-  task_assignments = load_json("task_assignments.json")
-  personnel = load_json("personnel.json")
-  teams = load_json("teams.json")
+  view = _task_view()
+  rows = view["tasks"]
   
-  # Mapping'ler
-  personnel_map = {p.get("id"): p for p in personnel if not p.get("deleted")}
-  teams_map = {t.get("id"): t for t in teams if not t.get("deleted")}
+  # Atama filtresi (ters indeksten)
+  if assigneeType and assigneeId:
+    rows = [rows[pos] for pos in view["byAssignee"].get((assigneeType, assigneeId), [])]
   
   # Filtreleme
-  filtered = []
-  for task in tasks:
-    if task.get("deleted"):
-      continue
-    if durum and task.get("durum") != durum:
-      continue
-    if oncelik and task.get("oncelik") != oncelik:
-      continue
-    
-    # Tüm aktif atamaları bul (çoklu atama desteği)
-    current_assignments = []
-    for ta in task_assignments:
-      if (ta.get("taskId") == task.get("id") and 
-          not ta.get("deleted") and
-          ta.get("active", True)):
-        current_assignments.append(ta)
-    
-    # Atama filtresi
-    if assigneeType and assigneeId:
-      has_matching_assignment = any(
-        ta.get("assigneeType") == assigneeType and ta.get("assigneeId") == assigneeId
-        for ta in current_assignments
-      )
-      if not has_matching_assignment:
-        continue
-    
-    # Atama bilgilerini ekle (birden fazla atama için)
-    assigneeNames = []
-    for ca in current_assignments:
-      if ca.get("assigneeType") == "personnel":
-        person = personnel_map.get(ca.get("assigneeId"))
-        if person:
-          assigneeNames.append(f"{person.get('ad')} {person.get('soyad')}")
-      elif ca.get("assigneeType") == "team":
-        team = teams_map.get(ca.get("assigneeId"))
-        if team:
-          assigneeNames.append(f"👥 {team.get('ad')}")
-    
-    # Backward compatibility: assigneeName (virgülle ayrılmış)
-    assignee_name_str = ", ".join(assigneeNames) if assigneeNames else None
-    
-    task_with_assignment = {
-      **task,
-      "currentAssignment": current_assignments[0] if current_assignments else None,
-      "currentAssignments": current_assignments,
-      "assigneeName": assignee_name_str,
-      "assigneeType": current_assignments[0].get("assigneeType") if current_assignments else None,
-    }
-    
-    filtered.append(task_with_assignment)
-  
-  return filtered
+  return page.apply([
+    task for task in rows
+    if (not durum or task.get("durum") == durum) and (not oncelik or task.get("oncelik") == oncelik)
+  ])
 
 
 @router.get("/{task_id}")
 def get_task(task_id: str):
-  tasks = load_json("tasks.json")
-  task_assignments = load_json("task_assignments.json")
-  personnel = load_json("personnel.json")
-  teams = load_json("teams.json")
+  task = get_by_id("tasks.json", task_id)
+  if task is None or task.get("deleted"):
+    raise HTTPException(status_code=404, detail="Görev bulunamadı")
   
-  # Mapping'ler
-  personnel_map = {p.get("id"): p for p in personnel if not p.get("deleted")}
-  teams_map = {t.get("id"): t for t in teams if not t.get("deleted")}
+  task_assignments = find_by("task_assignments.json", "taskId", task_id)
+  names = _display_names(load_json("personnel.json"), load_json("teams.json"))
   
-  for task in tasks:
-    if task.get("id") == task_id and not task.get("deleted"):
-      # Tüm aktif atamaları bul (çoklu atama desteği)
-      current_assignments = []
-      for ta in task_assignments:
-        if (ta.get("taskId") == task_id and 
-            not ta.get("deleted") and
-            ta.get("active", True)):
-          current_assignments.append(ta)
-      
-      # Assignment history (tümü, active/passive)
-      history = [ta for ta in task_assignments 
-                 if ta.get("taskId") == task_id and not ta.get("deleted")]
-      history.sort(key=lambda x: x.get("createdAt", ""), reverse=True)
-      
-      # Backward compatibility: currentAssignment (ilk aktif atama)
-      current_assignment = current_assignments[0] if current_assignments else None
-      
-      # Assignee bilgilerini ekle
-      assigneeNames = []
-      for ca in current_assignments:
-        if ca.get("assigneeType") == "personnel":
-          person = personnel_map.get(ca.get("assigneeId"))
-          if person:
-            assigneeNames.append(f"{person.get('ad')} {person.get('soyad')}")
-        elif ca.get("assigneeType") == "team":
-          team = teams_map.get(ca.get("assigneeId"))
-          if team:
-            assigneeNames.append(f"👥 {team.get('ad')}")
-      
-      result = {
-        **task,
-        "currentAssignment": current_assignment,  # Backward compatibility
-        "currentAssignments": current_assignments,  # Tüm aktif atamalar
-        "assigneeNames": assigneeNames,  # Atanan kişi/ekip isimleri
-        "assignmentHistory": history
-      }
-      return result
+  # Tüm aktif atamaları bul (çoklu atama desteği)
+  current_assignments = [
+    ta for ta in task_assignments
+    if not ta.get("deleted") and ta.get("active", True)
+  ]
   
-  raise HTTPException(status_code=404, detail="Görev bulunamadı")
+  # Assignment history (tümü, active/passive)
+  history = [ta for ta in task_assignments if not ta.get("deleted")]
+  history.sort(key=lambda x: x.get("createdAt", ""), reverse=True)
+  
+  # Backward compatibility: currentAssignment (ilk aktif atama)
+  current_assignment = current_assignments[0] if current_assignments else None
+  
+  return {
+    **task,
+    "currentAssignment": current_assignment,  # Backward compatibility
+    "currentAssignments": current_assignments,  # Tüm aktif atamalar
+    "assigneeNames": _assignee_names(current_assignments, names),  # Atanan kişi/ekip isimleri
+    "assignmentHistory": history
+  }
 
 
 @router.post("/", status_code=201)
@@ -249,9 +293,8 @@ class TaskAssignmentIn(BaseModel):
 @router.post("/{task_id}/assign")
 def assign_task(task_id: str, payload: TaskAssignmentIn, assignedBy: Optional[str] = None):
   # Görev var mı kontrol et
-  tasks = load_json("tasks.json")
-  task_exists = any(t.get("id") == task_id for t in tasks if not t.get("deleted"))
-  if not task_exists:
+  task = get_by_id("tasks.json", task_id)
+  if task is None or task.get("deleted"):
     raise HTTPException(status_code=404, detail="Görev bulunamadı")
   
   # Assignee var mı kontrol et
@@ -266,12 +309,9 @@ def assign_task(task_id: str, payload: TaskAssignmentIn, assignedBy: Optional[st
     if not assignee_exists:
       raise HTTPException(status_code=404, detail="Ekip bulunamadı")
   
-  task_assignments = load_json("task_assignments.json")
-  
   # Duplicate kontrolü: Aynı atama zaten var mı?
-  for ta in task_assignments:
-    if (ta.get("taskId") == task_id and 
-        ta.get("assigneeType") == payload.assigneeType and
+  for ta in find_by("task_assignments.json", "taskId", task_id):
+    if (ta.get("assigneeType") == payload.assigneeType and
         ta.get("assigneeId") == payload.assigneeId and
         ta.get("active", True) and
         not ta.get("deleted")):
@@ -293,24 +333,21 @@ def assign_task(task_id: str, payload: TaskAssignmentIn, assignedBy: Optional[st
     "createdAt": now,
     "deleted": False,
   }
-  task_assignments.append(new_assignment)
-  save_json("task_assignments.json", task_assignments)
+  insert_one("task_assignments.json", new_assignment, at="end")
   return new_assignment
 
 
 @router.delete("/{task_id}/assign")
 def unassign_task(task_id: str):
-  task_assignments = load_json("task_assignments.json")
   found = False
-  for ta_idx, ta in enumerate(task_assignments):
-    if ta.get("taskId") == task_id and ta.get("active", True) and not ta.get("deleted"):
-      task_assignments[ta_idx] = {
-        **ta,
-        "active": False,
-        "endedAt": datetime.now().isoformat(),
-      }
-      found = True
+  with transaction("task_assignments.json") as tx:
+    for ta in find_by("task_assignments.json", "taskId", task_id):
+      if ta.get("active", True) and not ta.get("deleted"):
+        tx.update("task_assignments.json", ta["id"], {
+          "active": False,
+          "endedAt": datetime.now().isoformat(),
+        })
+        found = True
   if found:
-    save_json("task_assignments.json", task_assignments)
     return {"taskId": task_id, "unassigned": True}
   raise HTTPException(status_code=404, detail="Aktif atama bulunamadı")
\ No newline at end of file
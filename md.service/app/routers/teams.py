@@ -4,7 +4,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List
 
-from ..data_loader import load_json, save_json
+from ..data_loader import find_by, load_json, save_json
 
 router = APIRouter(prefix="/teams", tags=["teams"])
 
@@ -29,8 +29,7 @@ def get_team(team_id: str):
   for t in teams:
     if t.get("id") == team_id:
       # Üyeleri de ekle
-      team_members = load_json("team_members.json")
-      members = [tm for tm in team_members if tm.get("teamId") == team_id and not tm.get("deleted")]
+      members = [tm for tm in find_by("team_members.json", "teamId", team_id) if not tm.get("deleted")]
       result = {**t, "members": members}
       return result
   raise HTTPException(status_code=404, detail="Ekip bulunamadı")
@@ -100,8 +99,7 @@ def soft_delete_team(team_id: str):
 
 @router.get("/{team_id}/members")
 def list_team_members(team_id: str):
-  team_members = load_json("team_members.json")
-  members = [tm for tm in team_members if tm.get("teamId") == team_id and not tm.get("deleted")]
+  members = [tm for tm in find_by("team_members.json", "teamId", team_id) if not tm.get("deleted")]
   return members
 
 
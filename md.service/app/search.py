@@ -0,0 +1,167 @@
+"""
+Stok kalemleri için bellek içi arama indeksi (GET /stock/items/search ve /stock/items filtreleri).
+- Kodlar: productCode / colorCode değerleri sıralı dizilerde tutulur, önek araması bisect ile yapılır.
+- İsimler: name / colorName kelimeleri sıralı bir dizide (kelime öneki); 3+ karakterlik sorgular
+  için üçlü harf (trigram) indeksi alt dizge aramasını aday kümesine indirger.
+Tüm karşılaştırmalar katlanmış metinle yapılır: küçük harf ve Türkçe harfler ASCII karşılıkları
+(İ/I/ı -> i, Ş -> s, Ç -> c, Ğ -> g, Ö -> o, Ü -> u); "isik" "Işık"ı, "sise" "Şişe"yi bulur.
+Modül import edildiğinde stockItems.json'un "items" arama indeksi olarak kaydolur
+(data_loader.register_search_index); veri katmanı kayıt yazmalarında add/remove ile günceller.
+"""
+import re
+from bisect import bisect_left, insort
+from typing import Iterable, Iterator, Optional
+
+from .data_loader import register_search_index
+
+# str.lower 'İ'yi 'i̇' (i + birleşen nokta) yapar: büyük İ / I önce çevrilir
+_TR_UPPER = str.maketrans({"İ": "i", "I": "i"})
+_TR_ASCII = str.maketrans({"ı": "i", "ş": "s", "ç": "c", "ğ": "g", "ö": "o", "ü": "u"})
+_WORD = re.compile(r"\w+")
+# Alt dizge adayları kayıtların 1/DENSE_RATIO'sundan fazlaysa sıralamak yerine kod sırasında yürünür
+DENSE_RATIO = 32
+
+
+def fold(text) -> str:
+  """Aramada eşitlenen biçim: küçük harf, Türkçe harfler ASCII (hem indekslenen metin hem sorgu)"""
+  return str(text or "").translate(_TR_UPPER).lower().translate(_TR_ASCII)
+
+
+def _trigrams(text: str) -> set[str]:
+  return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _prefix(array: list[tuple], prefix: str) -> Iterator[tuple]:
+  idx = bisect_left(array, (prefix,))
+  while idx < len(array) and array[idx][0].startswith(prefix):
+    yield array[idx]
+    idx += 1
+
+
+class StockSearchIndex:
+  """productCode / colorCode önekleri, name / colorName kelime önekleri ve trigramlar"""
+
+  def __init__(self, records: Iterable[dict] = ()):
+    self._fields: dict[str, tuple[str, str, str, str]] = {}  # id -> katlanmış (productCode, colorCode, name, colorName)
+    self._codes: list[tuple[str, str, str]] = []  # (productCode, colorCode, id)
+    self._colors: list[tuple[str, str]] = []  # (colorCode, id)
+    self._words: list[tuple[str, str]] = []  # (kelime, id)
+    self._grams: dict[str, set[str]] = {}
+    for rec in records:
+      self._insert(rec, bulk=True)
+    self._codes.sort()
+    self._colors.sort()
+    self._words.sort()
+
+  @staticmethod
+  def _keys(rec_id: str, fields: tuple[str, str, str, str]):
+    code, color, name, color_name = fields
+    words = {w for text in (name, color_name) for w in _WORD.findall(text)}
+    grams = _trigrams(code) | _trigrams(name) | _trigrams(color_name)
+    return (code, color, rec_id), (color, rec_id), [(w, rec_id) for w in words], grams
+
+  def _insert(self, record: dict, bulk: bool = False) -> None:
+    rec_id = record.get("id")
+    if rec_id is None or rec_id in self._fields:
+      return
+    fields = tuple(fold(record.get(f)) for f in ("productCode", "colorCode", "name", "colorName"))
+    self._fields[rec_id] = fields
+    code, color, words, grams = self._keys(rec_id, fields)
+    if bulk:
+      self._codes.append(code)
+      self._colors.append(color)
+      self._words.extend(words)
+    else:
+      insort(self._codes, code)
+      insort(self._colors, color)
+      for word in words:
+        insort(self._words, word)
+    for gram in grams:
+      self._grams.setdefault(gram, set()).add(rec_id)
+
+  def add(self, record: dict) -> None:
+    self._insert(record)
+
+  def remove(self, rec_id: str) -> None:
+    fields = self._fields.pop(rec_id, None)
+    if fields is None:
+      return
+    code, color, words, grams = self._keys(rec_id, fields)
+    for array, key in [(self._codes, code), (self._colors, color), *((self._words, w) for w in words)]:
+      idx = bisect_left(array, key)
+      if idx < len(array) and array[idx] == key:
+        del array[idx]
+    for gram in grams:
+      ids = self._grams.get(gram)
+      if ids is not None:
+        ids.discard(rec_id)
+        if not ids:
+          del self._grams[gram]
+
+  def _ranked(self, query: str) -> Iterator[str]:
+    # 1) ürün kodu: tam eşleşme, sonra önek (sıralı dizide tam eşleşme zaten önce gelir)
+    for _, _, rec_id in _prefix(self._codes, query):
+      yield rec_id
+    # 2) isim / renk adı kelimesi öneki
+    for _, rec_id in _prefix(self._words, query):
+      yield rec_id
+    # 3) alt dizge: trigram kesişimi, en seyrek trigramdan başlayarak
+    if len(query) < 3:
+      return
+    grams = sorted(_trigrams(query), key=lambda g: len(self._grams.get(g, ())))
+    candidates = self._grams.get(grams[0], set())
+    if len(grams) > 1:
+      candidates = candidates.intersection(*(self._grams.get(gram, set()) for gram in grams[1:]))
+    if len(candidates) * DENSE_RATIO > len(self._fields):
+      # çok aday: kod sırasında yürüyüp ilk `limit` eşleşmede durmak sıralamaktan ucuz
+      ordered: Iterable[str] = (rec_id for _, _, rec_id in self._codes if rec_id in candidates)
+    else:
+      ordered = sorted(candidates, key=lambda rec_id: self._fields[rec_id][:2])
+    for rec_id in ordered:
+      code, _, name, color_name = self._fields[rec_id]
+      # tek trigramlık sorguda trigram üyeliği zaten alt dizge eşleşmesidir
+      if len(grams) == 1 or query in code or query in name or query in color_name:
+        yield rec_id
+
+  def search(
+    self,
+    q: Optional[str] = None,
+    product_code: Optional[str] = None,
+    color_code: Optional[str] = None,
+    limit: Optional[int] = None,
+  ) -> list[str]:
+    """
+    Eşleşen kayıt id'leri, sıralı. `q` varsa: ürün kodu (tam / önek), kelime öneki, alt dizge.
+    `product_code` / `color_code` önek filtreleridir; sadece onlar verilirse sonuç kod sırasıdır.
+    """
+    query = fold(q).strip() if q else ""
+    code_prefix = fold(product_code) if product_code else None
+    color_prefix = fold(color_code) if color_code else None
+
+    if query:
+      candidates: Iterable[str] = self._ranked(query)
+    elif code_prefix is not None:
+      candidates = (rec_id for _, _, rec_id in _prefix(self._codes, code_prefix))
+    elif color_prefix is not None:
+      candidates = (rec_id for _, rec_id in _prefix(self._colors, color_prefix))
+    else:
+      candidates = (rec_id for _, _, rec_id in self._codes)
+
+    result = []
+    seen = set()
+    for rec_id in candidates:
+      if rec_id in seen:
+        continue
+      seen.add(rec_id)
+      code, color, _, _ = self._fields[rec_id]
+      if code_prefix is not None and not code.startswith(code_prefix):
+        continue
+      if color_prefix is not None and not color.startswith(color_prefix):
+        continue
+      result.append(rec_id)
+      if limit is not None and len(result) >= limit:
+        break
+    return result
+
+
+register_search_index("stockItems.json", "items", StockSearchIndex)
@@ -0,0 +1,281 @@
+"""
+CSV / XLSX okuma ve yazma, satır satır (toplu içe / dışa aktarım için).
+- CSV: UTF-8 (BOM'lu ya da BOM'suz); UTF-8 olmayan satırlar Windows-1254 (Excel'in Türkçe kaydı)
+  kabul edilir. Ayraç başlık satırından seçilir: ";" , "," ya da sekme.
+- XLSX: harici kütüphane yok; zipfile + xml iterparse ile ilk çalışma sayfası satır satır okunur.
+  Yazarken hücreler satır içi metin (inlineStr) ya da sayıdır, zip akışı parça parça üretilir.
+Okuyucular (satır numarası, {başlık: hücre metni}) üretir; boş satırlar atlanır.
+"""
+import codecs
+import csv
+import io
+import re
+import zipfile
+from typing import IO, Any, Iterable, Iterator
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_CELL_REF = re.compile(r"([A-Z]+)")
+_XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+CHUNK_ROWS = 500
+
+
+class SpreadsheetError(ValueError):
+  """Dosya okunamadı (biçim bozuk ya da desteklenmiyor)"""
+
+
+def _row(header: list[str], cells: list[str]) -> dict[str, str]:
+  return {name: cells[idx] if idx < len(cells) else "" for idx, name in enumerate(header) if name}
+
+
+# ---------- CSV ----------
+
+def _decoded_lines(fileobj: IO[bytes]) -> Iterator[str]:
+  for number, raw in enumerate(fileobj):
+    if number == 0 and raw.startswith(codecs.BOM_UTF8):
+      raw = raw[len(codecs.BOM_UTF8):]
+    try:
+      yield raw.decode("utf-8")
+    except UnicodeDecodeError:
+      yield raw.decode("cp1254")
+
+
+def read_csv(fileobj: IO[bytes]) -> Iterator[tuple[int, dict[str, str]]]:
+  lines = _decoded_lines(fileobj)
+  first = next(lines, "")
+  delimiter = max((";", ",", "\t"), key=first.count)
+  header = [name.strip() for name in next(csv.reader([first], delimiter=delimiter), [])]
+  reader = csv.reader(lines, delimiter=delimiter)
+  try:
+    for cells in reader:
+      if any(cell.strip() for cell in cells):
+        yield reader.line_num + 1, _row(header, cells)
+  except csv.Error as exc:
+    raise SpreadsheetError(f"CSV {reader.line_num + 1}. satır okunamadı: {exc}")
+
+
+# ---------- XLSX ----------
+
+def _column(ref: str | None, default: int) -> int:
+  match = _CELL_REF.match(ref or "")
+  if not match:
+    return default
+  index = 0
+  for char in match.group(1):
+    index = index * 26 + ord(char) - 64
+  return index - 1
+
+
+def _text(element) -> str:
+  if element is None:
+    return ""
+  # zengin metin parçaları (r/t) birleştirilir, fonetik ipuçları (rPh) atlanır
+  if element.find(f"{_MAIN}t") is not None and element.find(f"{_MAIN}r") is None:
+    return element.findtext(f"{_MAIN}t") or ""
+  return "".join(run.findtext(f"{_MAIN}t") or "" for run in element.findall(f"{_MAIN}r"))
+
+
+def _shared_strings(archive: zipfile.ZipFile) -> list[str]:
+  try:
+    source = archive.open("xl/sharedStrings.xml")
+  except KeyError:
+    return []
+  strings = []
+  with source:
+    for _, element in ElementTree.iterparse(source):
+      if element.tag == f"{_MAIN}si":
+        strings.append(_text(element))
+        element.clear()
+  return strings
+
+
+def _first_sheet(archive: zipfile.ZipFile) -> str:
+  try:
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    sheet = workbook.find(f"{_MAIN}sheets/{_MAIN}sheet")
+    rel_id = sheet.get(f"{_REL}id")
+    target = next(rel.get("Target") for rel in rels.iter(f"{_PKG_REL}Relationship") if rel.get("Id") == rel_id)
+  except (KeyError, AttributeError, StopIteration, ElementTree.ParseError):
+    return "xl/worksheets/sheet1.xml"
+  return target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+
+
+def read_xlsx(fileobj: IO[bytes]) -> Iterator[tuple[int, dict[str, str]]]:
+  try:
+    archive = zipfile.ZipFile(fileobj)
+  except zipfile.BadZipFile:
+    raise SpreadsheetError("Geçerli bir XLSX dosyası değil")
+  with archive:
+    try:
+      shared = _shared_strings(archive)
+      source = archive.open(_first_sheet(archive))
+    except KeyError:
+      raise SpreadsheetError("XLSX dosyasında çalışma sayfası yok")
+    except ElementTree.ParseError as exc:
+      raise SpreadsheetError(f"XLSX paylaşılan metinleri okunamadı: {exc}")
+    with source:
+      try:
+        yield from _sheet_rows(ElementTree.iterparse(source), shared)
+      except ElementTree.ParseError as exc:
+        raise SpreadsheetError(f"XLSX çalışma sayfası okunamadı: {exc}")
+
+
+def _sheet_rows(events, shared: list[str]) -> Iterator[tuple[int, dict[str, str]]]:
+  header = None
+  for _, element in events:
+    if element.tag != f"{_MAIN}row":
+      continue
+    cells: list[str] = []
+    for position, cell in enumerate(element.iter(f"{_MAIN}c")):
+      kind = cell.get("t")
+      if kind == "s":
+        value = shared[int(cell.findtext(f"{_MAIN}v") or 0)]
+      elif kind == "inlineStr":
+        value = _text(cell.find(f"{_MAIN}is"))
+      else:
+        value = cell.findtext(f"{_MAIN}v") or ""
+      column = _column(cell.get("r"), position)
+      cells.extend([""] * (column + 1 - len(cells)))
+      cells[column] = value
+    number = int(element.get("r") or 0)
+    element.clear()
+    if header is None:
+      header = [name.strip() for name in cells]
+    elif any(cell.strip() for cell in cells):
+      yield number, _row(header, cells)
+
+
+def read_rows(filename: str | None, fileobj: IO[bytes]) -> Iterator[tuple[int, dict[str, str]]]:
+  """Dosya adının uzantısına göre CSV ya da XLSX okuyucusu"""
+  name = (filename or "").lower()
+  if name.endswith(".xlsx"):
+    return read_xlsx(fileobj)
+  if name.endswith((".csv", ".txt")):
+    return read_csv(fileobj)
+  raise SpreadsheetError("Desteklenmeyen dosya türü (CSV ya da XLSX olmalı)")
+
+
+# ---------- Yazma ----------
+
+def csv_chunks(header: list[str], rows: Iterable[list[Any]]) -> Iterator[bytes]:
+  """BOM'lu UTF-8 CSV (Excel Türkçe karakterleri doğru açar), CHUNK_ROWS satırlık parçalar"""
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  buffer.write("\ufeff")
+  writer.writerow(header)
+  for count, row in enumerate(rows, 1):
+    writer.writerow(["" if value is None else value for value in row])
+    if count % CHUNK_ROWS == 0:
+      yield buffer.getvalue().encode("utf-8")
+      buffer.seek(0)
+      buffer.truncate()
+  yield buffer.getvalue().encode("utf-8")
+
+
+class _Sink(io.RawIOBase):
+  """Konumlanamayan yazma hedefi: zipfile veri tanımlayıcılı (akış) kip kullanır"""
+
+  def __init__(self):
+    self._chunks: list[bytes] = []
+
+  def writable(self) -> bool:
+    return True
+
+  def write(self, data) -> int:
+    self._chunks.append(bytes(data))
+    return len(data)
+
+  def drain(self) -> bytes:
+    data = b"".join(self._chunks)
+    self._chunks.clear()
+    return data
+
+
+def _column_name(index: int) -> str:
+  name = ""
+  index += 1
+  while index:
+    index, rem = divmod(index - 1, 26)
+    name = chr(65 + rem) + name
+  return name
+
+
+def _cell(ref: str, value: Any) -> str:
+  if value is None or value == "":
+    return ""
+  if isinstance(value, (int, float)) and not isinstance(value, bool):
+    return f'<c r="{ref}"><v>{value}</v></c>'
+  text = escape(_XML_ILLEGAL.sub("", str(value)))
+  return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+_CONTENT_TYPES = (
+  '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+  '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+  '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+  '<Default Extension="xml" ContentType="application/xml"/>'
+  '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+  '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+  '</Types>'
+)
+_ROOT_RELS = (
+  '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+  '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+  '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+  '</Relationships>'
+)
+_WORKBOOK_RELS = (
+  '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+  '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+  '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+  '</Relationships>'
+)
+
+
+def _workbook(sheet_name: str) -> str:
+  return (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+  )
+
+
+def xlsx_chunks(header: list[str], rows: Iterable[list[Any]], sheet_name: str = "Sayfa1") -> Iterator[bytes]:
+  """Tek sayfalık XLSX; sayfa XML'i sıkıştırılarak CHUNK_ROWS satırda bir gönderilir"""
+  sink = _Sink()
+  with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+    archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+    archive.writestr("_rels/.rels", _ROOT_RELS)
+    archive.writestr("xl/workbook.xml", _workbook(sheet_name))
+    archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+    with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+      sheet.write(
+        b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+      )
+      columns = [_column_name(idx) for idx in range(len(header))]
+      number = 1
+      batch = [header]
+      for row in rows:
+        batch.append(row)
+        if len(batch) >= CHUNK_ROWS:
+          sheet.write(_rows_xml(batch, number, columns))
+          number += len(batch)
+          batch = []
+          yield sink.drain()
+      sheet.write(_rows_xml(batch, number, columns))
+      sheet.write(b"</sheetData></worksheet>")
+  yield sink.drain()
+
+
+def _rows_xml(rows: list[list[Any]], first: int, columns: list[str]) -> bytes:
+  parts = []
+  for number, row in enumerate(rows, first):
+    cells = "".join(_cell(f"{columns[idx]}{number}", value) for idx, value in enumerate(row[:len(columns)]))
+    parts.append(f'<row r="{number}">{cells}</row>')
+  return "".join(parts).encode("utf-8")
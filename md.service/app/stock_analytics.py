@@ -0,0 +1,110 @@
+"""
+Stok analitiği: tüketim hızı, stokla karşılanan gün, yeniden sipariş noktası ve ekonomik sipariş
+miktarı (EOQ) tüm kalemler için hesaplanır (GET /stock/analytics/reorder). Hareket penceresi bir kez
+okunur; kalem başına sadece talep olan günler tutulur.
+- Talep: penceredeki stockOut + consume miktarları, kalem başına gün -> miktar; talepsiz günler 0
+  sayılarak günlük ortalama ve standart sapma.
+- Tedarik süresi: tedarikçinin leadTimeDays değeri (yoksa DEFAULT_LEAD_DAYS).
+- Yeniden sipariş noktası = günlük talep × tedarik süresi + emniyet stoğu (z × σ × √tedarik süresi),
+  en az `critical`.
+- EOQ = √(2 × yıllık talep × sipariş maliyeti / (birim maliyet × yıllık elde tutma oranı));
+  birim maliyeti ya da talebi olmayan kalemde 0.
+- Stok pozisyonu = available + açık siparişlerde bekleyen miktar. Pozisyon yeniden sipariş noktasına
+  inmişse önerilen miktar max(EOQ, nokta - pozisyon) olur (yukarı yuvarlanır).
+"""
+import math
+from datetime import date, datetime, timedelta
+from statistics import NormalDist
+from typing import Optional
+
+from .data_loader import load_json
+from .ledger import movements
+from .stock_levels import ITEMS_FILE, item_code, pending_quantities
+
+DEMAND_TYPES = ("stockOut", "consume")
+DEFAULT_LEAD_DAYS = 7
+DEFAULT_WINDOW_DAYS = 90
+DEFAULT_ORDER_COST = 250.0  # sipariş başına sabit maliyet (TL)
+DEFAULT_HOLDING_RATE = 0.25  # yıllık elde tutma maliyeti, birim maliyetin oranı
+DEFAULT_SERVICE_LEVEL = 0.95
+
+
+def _demand(index: dict[str, int], window: int, today: date) -> list[dict[int, float]]:
+  """Kalem başına gün -> talep (son `window` gün, bugün dahil; gün 0 = pencerenin ilk günü)"""
+  start = today - timedelta(days=window - 1)
+  demand: list[dict[int, float]] = [{} for _ in index]
+  offsets: dict[str, int] = {}
+  for movement in movements(since=start.isoformat(), until=today.isoformat()):
+    row = index.get(movement.get("itemId"))
+    if row is None or movement.get("type") not in DEMAND_TYPES or not movement.get("date"):
+      continue
+    day = movement["date"][:10]
+    if day not in offsets:
+      offsets[day] = (date.fromisoformat(day) - start).days
+    quantity = max(0, -(movement.get("change") or 0))
+    demand[row][offsets[day]] = demand[row].get(offsets[day], 0) + quantity
+  return demand
+
+
+def _usage(days: dict[int, float], window: int) -> tuple[float, float]:
+  """Günlük ortalama talep ve (anakütle) standart sapması; talepsiz günler 0"""
+  daily = sum(days.values()) / window
+  spread = sum((quantity - daily) ** 2 for quantity in days.values()) + (window - len(days)) * daily ** 2
+  return daily, math.sqrt(spread / window)
+
+
+def reorder_suggestions(
+  window_days: int = DEFAULT_WINDOW_DAYS,
+  order_cost: float = DEFAULT_ORDER_COST,
+  holding_rate: float = DEFAULT_HOLDING_RATE,
+  service_level: float = DEFAULT_SERVICE_LEVEL,
+  today: Optional[date] = None,
+) -> list[dict]:
+  """Tüm kalemler için sipariş önerisi satırları; en acil (pozisyonu noktanın en altında) önce"""
+  items = load_json(ITEMS_FILE)  # available: stock_levels alanı
+  if not items:
+    return []
+  today = today or datetime.utcnow().date()
+  lead_by_supplier = {s.get("id"): s.get("leadTimeDays") for s in load_json("suppliers.json")}
+  pending_by_code = pending_quantities(load_json("purchaseOrders.json"))
+  demand = _demand({item["id"]: row for row, item in enumerate(items)}, window_days, today)
+  z = NormalDist().inv_cdf(service_level)
+
+  scored = []
+  for item, days in zip(items, demand):
+    available = item.get("available") or 0
+    pending = float(pending_by_code.get(item_code(item), 0))
+    lead = float(lead_by_supplier.get(item.get("supplierId")) or DEFAULT_LEAD_DAYS)
+    holding = (item.get("unitCost") or 0) * holding_rate
+
+    daily, sigma = _usage(days, window_days)
+    safety = z * sigma * math.sqrt(lead)
+    reorder_point = max(daily * lead + safety, item.get("critical") or 0)
+    position = available + pending
+    eoq = math.sqrt(2 * daily * 365 * order_cost / holding) if holding > 0 else 0.0
+    needs_order = position <= reorder_point
+    score = (reorder_point - position) / max(reorder_point, 1)
+    scored.append((score, {
+      "id": item["id"],
+      "productCode": item.get("productCode"),
+      "colorCode": item.get("colorCode"),
+      "name": item.get("name"),
+      "unit": item.get("unit"),
+      "supplierId": item.get("supplierId"),
+      "supplierName": item.get("supplierName"),
+      "available": item.get("available"),
+      "critical": item.get("critical"),
+      "unitCost": item.get("unitCost"),
+      "dailyUsage": round(daily, 3),
+      "daysOfCover": round(available / daily, 1) if daily > 0 else None,  # None: tüketimi yok
+      "leadTimeDays": lead,
+      "safetyStock": round(safety, 2),
+      "reorderPoint": round(reorder_point, 2),
+      "eoq": round(eoq, 2),
+      "pendingInOrders": pending,
+      "suggestedQty": float(math.ceil(max(eoq, reorder_point - position))) if needs_order else 0.0,
+      "score": round(score, 4),
+      "needsOrder": needs_order,
+    }))
+  scored.sort(key=lambda entry: -entry[0])  # kararlı: eşit skorda depo sırası
+  return [row for _, row in scored]
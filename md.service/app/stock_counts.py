@@ -0,0 +1,118 @@
+"""
+Stok sayımı (sayım oturumları) ve fark hesabı.
+- Oturum açılırken kapsamdaki kalemlerin onHand değerleri stockCounts.json kaydına snapshot olarak
+  alınır (`expected`, `snapshotAt`). Stok API'si kilitlenmez: sayım sürerken hareketler yazılmaya devam eder.
+- Sayımlar stockCountLines.json'da oturum + kalem başına tek satırdır (counted, countedAt). Çevrimdışı
+  toplanan sayımlar sonradan, kendi `countedAt` zamanlarıyla toplu gönderilebilir.
+- Fark: sayılan - sayım anındaki defter değeri. Defter değeri = snapshot + snapshot ile sayım anı
+  arasındaki son hareketin bakiyesi (hareketler `createdAt` taşır). Sayım anından sonraki hareketler
+  farka girmez; düzeltme bugünkü onHand'e eklenir.
+- Tüm satırlar için hareketler snapshot gününden itibaren defterden bir kez okunur.
+"""
+from bisect import bisect_right
+from datetime import datetime
+from typing import Optional
+
+from .data_loader import collection_lock, find_by, get_backend, get_by_ids, save_json
+from .ledger import movements
+
+COUNTS = "stockCounts.json"
+COUNT_LINES = "stockCountLines.json"
+OPEN = "open"
+POSTED = "posted"
+CANCELLED = "cancelled"
+
+
+def ensure_collections() -> None:
+  """Sayım koleksiyonları yoksa boş olarak oluşturulur (uygulama açılışında bir kez)"""
+  backend = get_backend()
+  for filename in (COUNTS, COUNT_LINES):
+    if backend.exists(filename):
+      continue
+    with collection_lock(filename):
+      if not backend.exists(filename):
+        save_json(filename, [])
+
+
+def _history(since: str) -> dict[str, tuple[list[str], list[float]]]:
+  """`since` anından sonraki hareketler kalem başına: (createdAt listesi, hareket sonrası onHand), eskiden yeniye"""
+  history: dict[str, tuple[list[str], list[float]]] = {}
+  for movement in reversed(list(movements(since=since[:10]))):
+    at = movement.get("createdAt") or movement.get("date") or ""
+    if at <= since or "balance" not in movement:
+      continue
+    times, levels = history.setdefault(movement.get("itemId"), ([], []))
+    times.append(at)
+    levels.append(movement["balance"].get("onHand") or 0)
+  return history
+
+
+def variance(session: dict, zero_uncounted: bool = False) -> dict:
+  """
+  Oturumun fark raporu: {"lines": [...], "uncounted": [itemId, ...], "summary": {...}}.
+  Satır: {itemId, productCode, colorCode, name, expected, bookQty, counted, countedAt, delta}.
+  zero_uncounted: sayılmamış kalemler 0 sayılmış kabul edilir (sayım anı = snapshot).
+  """
+  expected = session.get("expected") or {}
+  counted = {line["itemId"]: line for line in find_by(COUNT_LINES, "sessionId", session["id"])}
+  snapshot_at = session["snapshotAt"]
+  if zero_uncounted:
+    for item_id in expected:
+      counted.setdefault(item_id, {"itemId": item_id, "counted": 0, "countedAt": snapshot_at})
+
+  history = _history(snapshot_at)
+  items = get_by_ids("stockItems.json", counted)
+  rows = []
+  for item_id, line in counted.items():
+    book = expected.get(item_id, 0)
+    times, levels = history.get(item_id, ((), ()))
+    pos = bisect_right(times, line.get("countedAt") or snapshot_at)
+    if pos:
+      book = levels[pos - 1]
+    item = items.get(item_id, {})
+    rows.append({
+      "itemId": item_id,
+      "productCode": item.get("productCode"),
+      "colorCode": item.get("colorCode"),
+      "name": item.get("name"),
+      "expected": expected.get(item_id, 0),
+      "bookQty": book,
+      "counted": line.get("counted") or 0,
+      "countedAt": line.get("countedAt"),
+      "delta": (line.get("counted") or 0) - book,
+    })
+  rows.sort(key=lambda row: (-abs(row["delta"]), row["productCode"] or "", row["colorCode"] or ""))
+  return {
+    "lines": rows,
+    "uncounted": sorted(item_id for item_id in expected if item_id not in counted),
+    "summary": {
+      "expectedItems": len(expected),
+      "countedItems": len(rows),
+      "withDifference": sum(1 for row in rows if row["delta"]),
+      "totalSurplus": sum(row["delta"] for row in rows if row["delta"] > 0),
+      "totalShortage": -sum(row["delta"] for row in rows if row["delta"] < 0),
+    },
+  }
+
+
+def merge_count(line: Optional[dict], qty: float, mode: str, counted_at: str) -> Optional[dict]:
+  """
+  Sayım satırına yeni sayımı işler; değişiklik (patch) ya da değişmiyorsa None döner.
+  set: mutlak sayım, daha eski tarihli sayım yenisinin üzerine yazılmaz (geç gelen çevrimdışı parti).
+  add: okutma başına artış; sayım anı en son okutmadır.
+  """
+  if line is None:
+    return {"counted": qty, "countedAt": counted_at, "scans": 1}
+  if mode == "set":
+    if counted_at < (line.get("countedAt") or ""):
+      return None
+    return {"counted": qty, "countedAt": counted_at, "scans": (line.get("scans") or 0) + 1}
+  return {
+    "counted": (line.get("counted") or 0) + qty,
+    "countedAt": max(counted_at, line.get("countedAt") or ""),
+    "scans": (line.get("scans") or 0) + 1,
+  }
+
+
+def now() -> str:
+  return datetime.utcnow().isoformat()
@@ -0,0 +1,185 @@
+"""
+Stok geçmişi sorguları (hareket defteri üzerinde): belirli bir gündeki bakiyeler, değerleme ve
+dönem toplamları.
+- Ay sonu durumu ledger.month_rollup'tan gelir (kapanmış aylar stockSnapshots.json'da saklı);
+  ay içindeki bir gün için sadece o ayın segmenti okunur, defter baştan oynatılmaz.
+- Dönem toplamları: aralığın tamamen kapsadığı aylar özetlerden, kenar aylar segment taramasıyla.
+- Değer = onHand × kalemin bugünkü unitCost'u (maliyet geçmişi tutulmuyor). Tedarikçi gruplaması
+  da kalemin bugünkü supplierId'sine göredir.
+"""
+import calendar
+from datetime import datetime
+from typing import Optional
+
+from .data_loader import distinct_values, find_by, get_by_ids, iter_records, load_json
+from .ledger import add_totals, balance_before, month_rollup, segment_file, segment_months
+
+ITEMS = "stockItems.json"
+GROUPS = ("item", "supplier", "job")
+MOVEMENT_TYPES = ("stockIn", "stockOut", "reserve", "release", "consume")
+
+
+def _today() -> str:
+  return datetime.utcnow().isoformat()[:10]
+
+
+def _month_end(month: str) -> str:
+  year, mon = int(month[:4]), int(month[5:7])
+  return f"{month}-{calendar.monthrange(year, mon)[1]:02d}"
+
+
+def _levels(record: dict) -> dict:
+  return {"onHand": record.get("onHand") or 0, "reserved": record.get("reserved") or 0}
+
+
+# ---------- Belirli bir gün ----------
+
+def balances_at(day: str, items: Optional[list[dict]] = None) -> dict[str, dict]:
+  """
+  Bugün var olan tüm kalemlerin (ya da `items`in) `day` günü sonundaki {onHand, reserved} değerleri
+  (itemId -> bakiye). O güne kadar hareketi olmayan kalem için ilk sonraki hareketin öncesi,
+  hiç hareketi yoksa bugünkü değer.
+  """
+  items = load_json(ITEMS) if items is None else items
+  if day >= _today():
+    return {item["id"]: _levels(item) for item in items}
+
+  months = segment_months()
+  month = day[:7]
+  earlier = [m for m in months if m <= month and (m < month or day >= _month_end(month))]
+  # Ay sonu (ya da o ay hareket yoksa) doğrudan özetten; ay içi gün için önceki kapanış + segment kuyruğu
+  balances = month_rollup(earlier[-1])["items"] if earlier else {}
+  if month in months and day < _month_end(month):
+    for movement in iter_records(segment_file(month)):
+      if (movement.get("date") or "") <= day and "balance" in movement:
+        balances[movement.get("itemId")] = _levels(movement["balance"])
+
+  # O güne kadar hareketi olmayanlar: sonraki aylarda kalemin ilk hareketi (itemId indeksinden)
+  later = [m for m in months if m >= month]
+  moved_later = set().union(*(distinct_values(segment_file(m), "itemId") for m in later))
+  for item in items:
+    if item["id"] in balances or item["id"] not in moved_later:
+      continue
+    for m in later:
+      movement = next(
+        (mv for mv in find_by(segment_file(m), "itemId", item["id"]) if (mv.get("date") or "") > day and "balance" in mv),
+        None,
+      )
+      if movement is not None:
+        balances[item["id"]] = balance_before(movement)
+        break
+
+  return {item["id"]: balances.get(item["id"]) or _levels(item) for item in items}
+
+
+def valuation(day: Optional[str] = None) -> dict:
+  """`day` (varsayılan bugün) sonundaki stok değeri: kalem satırları, tedarikçi toplamları ve genel toplam"""
+  day = day or _today()
+  items = load_json(ITEMS)
+  balances = balances_at(day, items)
+  rows = []
+  suppliers: dict[str, dict] = {}
+  for item in items:
+    levels = balances[item["id"]]
+    unit_cost = item.get("unitCost") or 0
+    value = round(levels["onHand"] * unit_cost, 2)
+    rows.append({
+      "itemId": item["id"],
+      "productCode": item.get("productCode"),
+      "colorCode": item.get("colorCode"),
+      "name": item.get("name"),
+      "supplierId": item.get("supplierId"),
+      "onHand": levels["onHand"],
+      "reserved": levels["reserved"],
+      "unitCost": unit_cost,
+      "value": value,
+    })
+    supplier = suppliers.setdefault(item.get("supplierId") or "", {
+      "supplierId": item.get("supplierId"),
+      "supplierName": item.get("supplierName"),
+      "value": 0,
+    })
+    supplier["value"] = round(supplier["value"] + value, 2)
+  return {
+    "date": day,
+    "totalValue": round(sum(row["value"] for row in rows), 2),
+    "suppliers": sorted(suppliers.values(), key=lambda s: -s["value"]),
+    "items": rows,
+  }
+
+
+# ---------- Dönem toplamları ----------
+
+def _merge(target: dict, source: dict) -> None:
+  for key, kinds in source.items():
+    totals = target.setdefault(key, {})
+    for kind, qty in kinds.items():
+      totals[kind] = totals.get(kind, 0) + qty
+
+
+def _filled(kinds: dict) -> dict:
+  return {**{kind: 0 for kind in MOVEMENT_TYPES}, **kinds}
+
+
+def period_totals(since: Optional[str] = None, until: Optional[str] = None, group_by: str = "item") -> list[dict]:
+  """
+  [since, until] aralığında hareket tipi başına mutlak miktarlar; `group_by` item / supplier / job.
+  Satır: {"id", <tip>: miktar, ...}; item satırları kod ve adı, supplier satırları tedarikçi adını da taşır.
+  """
+  until = until or _today()
+  totals: dict[str, dict] = {}
+  for month in segment_months():
+    if (since is not None and month < since[:7]) or month > until[:7]:
+      continue
+    if (since is None or since <= f"{month}-01") and until >= _month_end(month):
+      rollup = month_rollup(month)
+      _merge(totals, rollup["jobs"] if group_by == "job" else rollup["totals"])
+      continue
+    for movement in iter_records(segment_file(month)):
+      day = movement.get("date") or ""
+      if (since is not None and day < since) or day > until:
+        continue
+      key = movement.get("jobId") if group_by == "job" else movement.get("itemId")
+      if key:
+        add_totals(totals, key, movement)
+
+  if group_by == "job":
+    return [{"id": key, **_filled(kinds)} for key, kinds in sorted(totals.items())]
+
+  items = get_by_ids(ITEMS, totals)
+  if group_by == "supplier":
+    by_supplier: dict[str, dict] = {}
+    names: dict[str, Optional[str]] = {}
+    for item_id, kinds in totals.items():
+      item = items.get(item_id, {})
+      supplier_id = item.get("supplierId") or ""
+      names.setdefault(supplier_id, item.get("supplierName"))
+      _merge(by_supplier, {supplier_id: kinds})
+    return [
+      {"id": key or None, "supplierName": names.get(key), **_filled(kinds)}
+      for key, kinds in sorted(by_supplier.items())
+    ]
+
+  return [
+    {
+      "id": key,
+      "productCode": items.get(key, {}).get("productCode"),
+      "colorCode": items.get(key, {}).get("colorCode"),
+      "name": items.get(key, {}).get("name"),
+      **_filled(kinds),
+    }
+    for key, kinds in sorted(totals.items())
+  ]
+
+
+def monthly_totals(since: str, until: Optional[str] = None, group_by: str = "item") -> list[dict]:
+  """period_totals'ın ay ay kırılımı: [{"month", "since", "until", "rows"}]"""
+  until = until or _today()
+  periods = []
+  year, mon = int(since[:4]), int(since[5:7])
+  while f"{year:04d}-{mon:02d}" <= until[:7]:
+    month = f"{year:04d}-{mon:02d}"
+    start, end = max(since, f"{month}-01"), min(until, _month_end(month))
+    periods.append({"month": month, "since": start, "until": end, "rows": period_totals(start, end, group_by)})
+    year, mon = (year + 1, 1) if mon == 12 else (year, mon + 1)
+  return periods
@@ -0,0 +1,51 @@
+"""
+Stok kalemi seviyeleri: stockItems.json kayıtlarında hazır tutulan türetilmiş alanlar ve
+kritik stok sıralı indeksi.
+- available = onHand - reserved; isCritical = available <= critical. Alanlar veri katmanından geçen
+  her yazmada yeniden hesaplanır (data_loader.COMPUTED), okuyanlar hesaplamaz.
+- "critical" sıralı indeksi sadece kritik kalemleri tutar, en büyük eksik önce (by_shortage).
+- Açık satın alma siparişlerinde beklenen miktarlar (pending_quantities) kaleme productCode_colorCode
+  anahtarıyla (item_code) eşlenir; satın alma, stok ve analitik aynı hesabı kullanır.
+Modül import edildiğinde data_loader'a kaydolur; stockItems.json okuyan modüller bunu import eder.
+"""
+from typing import Iterable, Optional
+
+from .data_loader import register_computed, register_sorted_index
+
+ITEMS_FILE = "stockItems.json"
+CRITICAL_INDEX = "critical"
+PENDING_STATUSES = ("draft", "sent", "partial")  # teslim alınmamış miktarı sayılan sipariş durumları
+
+
+def stock_levels(item: dict) -> dict:
+  available = (item.get("onHand") or 0) - (item.get("reserved") or 0)
+  return {"available": available, "isCritical": available <= (item.get("critical") or 0)}
+
+
+def by_shortage(item: dict) -> Optional[tuple]:
+  """Kritik stok indeksinin sıralama değeri; kritik seviyenin üstündeki kalemler indekste yoktur"""
+  if not item.get("isCritical"):
+    return None
+  return (item["available"] - (item.get("critical") or 0),)
+
+
+def item_code(record: dict) -> str:
+  """Sipariş satırını stok kalemiyle eşleyen anahtar (productCode_colorCode)"""
+  return f"{record.get('productCode')}_{record.get('colorCode')}"
+
+
+def pending_quantities(orders: Iterable[dict]) -> dict[str, float]:
+  """Açık siparişlerde henüz teslim alınmamış miktarlar ("productCode_colorCode" -> miktar)"""
+  pending: dict[str, float] = {}
+  for order in orders:
+    if order.get("status") not in PENDING_STATUSES:
+      continue
+    for line in order.get("items", []):
+      quantity = line.get("quantity", 0) - (line.get("receivedQty") or 0)
+      if quantity > 0:
+        pending[item_code(line)] = pending.get(item_code(line), 0) + quantity
+  return pending
+
+
+register_computed(ITEMS_FILE, stock_levels)
+register_sorted_index(ITEMS_FILE, CRITICAL_INDEX, by_shortage)
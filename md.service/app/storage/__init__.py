@@ -0,0 +1,27 @@
+"""
+Depolama katmanı (repository) arka uçları.
+DATA_BACKEND env ile seçilir: "json" (varsayılan, md.data dosyaları) veya "sqlite".
+Router'lar bu pakete doğrudan değil, data_loader üzerinden erişir.
+"""
+import os
+from pathlib import Path
+
+from .base import StorageBackend
+from .json_backend import JsonBackend
+from .sqlite_backend import SqliteBackend
+
+BACKENDS = {
+  "json": JsonBackend,
+  "sqlite": SqliteBackend,
+}
+
+
+def create_backend(data_dir: Path, name: str | None = None) -> StorageBackend:
+  name = (name or os.getenv("DATA_BACKEND", "json")).lower()
+  if name == "json":
+    return JsonBackend(data_dir)
+  if name == "sqlite":
+    env_path = os.getenv("SQLITE_PATH")
+    db_path = Path(env_path).resolve() if env_path else data_dir / "md.sqlite3"
+    return SqliteBackend(db_path)
+  raise ValueError(f"Unknown DATA_BACKEND: {name} (expected one of: {', '.join(BACKENDS)})")
@@ -0,0 +1,72 @@
+from typing import Any
+
+# Değişiklik akışında (GET /events) saklanan son olay sayısı
+EVENTS_KEEP = 5000
+
+
+class StorageBackend:
+  """
+  Koleksiyon bazlı depolama arayüzü.
+  Koleksiyon adı mevcut dosya adıdır ("jobs.json"); böylece router'lar değişmeden arka uç değiştirilebilir.
+  signature(): koleksiyon değiştiğinde değişen ucuz bir imza (önbellek geçersizleme için).
+  """
+  name = "base"
+
+  def signature(self, filename: str) -> tuple:
+    raise NotImplementedError
+
+  def read(self, filename: str) -> tuple[tuple, Any]:
+    """(signature, data) döndürür; koleksiyon yoksa FileNotFoundError."""
+    raise NotImplementedError
+
+  def write(self, filename: str, data: Any) -> tuple | None:
+    """Koleksiyonu yazar; yazılan içeriğin imzasını (bilinmiyorsa None) döndürür."""
+    raise NotImplementedError
+
+  def append_ops(self, filename: str, ops: list[dict]) -> tuple | None:
+    """Kayıt bazlı op'ları (storage.journal) kalıcı hale getirir; yeni imzayı döndürür."""
+    raise NotImplementedError
+
+  def journaled(self) -> list[str]:
+    """Taban dosyasına henüz katlanmamış op günlüğü olan koleksiyonlar."""
+    return []
+
+  def compaction_due(self, filename: str) -> bool:
+    """Biriken op günlüğü tam yeniden yazmayı (write) gerektiriyor mu?"""
+    return False
+
+  def commit(self, writes: dict[str, Any], ops: dict[str, list[dict]]) -> dict[str, tuple | None]:
+    """
+    Birden fazla koleksiyonu tek işlemde yazar: `writes` tam içerik, `ops` kayıt op'ları.
+    Varsayılan uygulama atomik değildir; arka uçlar kendi işlem mekanizmasını kullanır.
+    """
+    signatures = {filename: self.write(filename, data) for filename, data in writes.items()}
+    signatures.update({filename: self.append_ops(filename, file_ops) for filename, file_ops in ops.items()})
+    return signatures
+
+  def pending_transactions(self) -> list[tuple[str, list[str]]]:
+    """Yarım kalmış (commit edilmiş ama uygulanmamış) işlemler: [(işlem adı, koleksiyonlar)]."""
+    return []
+
+  def replay(self, name: str) -> bool:
+    """Yarım kalmış işlemi tamamlar; işlem bu arada tamamlandıysa False."""
+    return False
+
+  def append_event(self, event: dict) -> int:
+    """Değişiklik akışına olay ekler, sıra numarasını döndürür (çağıran olay kilidini tutar)."""
+    raise NotImplementedError
+
+  def read_events(self, after: int, limit: int) -> list[dict]:
+    """Sıra numarası `after`'dan büyük olaylar (artan sırada, en fazla `limit`)."""
+    raise NotImplementedError
+
+  def event_bounds(self) -> tuple[int, int]:
+    """(saklanan en eski, en son) sıra numarası; akış boşsa (0, 0)."""
+    raise NotImplementedError
+
+  def exists(self, filename: str) -> bool:
+    try:
+      self.signature(filename)
+      return True
+    except FileNotFoundError:
+      return False
@@ -0,0 +1,53 @@
+"""
+md.data/*.json dosyalarını seçili arka uca (ör. SQLite) tek seferde aktarır.
+
+  DATA_BACKEND=sqlite python -m app.storage.importer [--force]
+
+--force verilmezse hedefte zaten var olan koleksiyonlar atlanır.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from ..data_loader import get_data_dir
+from . import create_backend
+from .json_backend import JsonBackend
+
+
+def import_json_dir(source_dir: Path, target, force: bool = False) -> dict:
+  source = JsonBackend(source_dir)
+  imported, skipped = [], []
+  for path in sorted(source_dir.glob("*.json")):
+    filename = path.name
+    if not force and target.exists(filename):
+      skipped.append(filename)
+      continue
+    _, data = source.read(filename)
+    target.write(filename, data)
+    imported.append(filename)
+  return {"imported": imported, "skipped": skipped}
+
+
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(description="md.data JSON dosyalarını depolama arka ucuna aktar")
+  parser.add_argument("--source", type=Path, default=None, help="Kaynak klasör (varsayılan: DATA_DIR)")
+  parser.add_argument("--backend", default=None, help="Hedef arka uç (varsayılan: DATA_BACKEND)")
+  parser.add_argument("--force", action="store_true", help="Var olan koleksiyonların üzerine yaz")
+  args = parser.parse_args(argv)
+
+  source_dir = (args.source or get_data_dir()).resolve()
+  target = create_backend(get_data_dir(), args.backend)
+  if isinstance(target, JsonBackend) and target.data_dir == source_dir:
+    print("Kaynak ve hedef aynı JSON klasörü; DATA_BACKEND=sqlite veya --backend sqlite kullanın.", file=sys.stderr)
+    return 2
+
+  result = import_json_dir(source_dir, target, force=args.force)
+  for filename in result["imported"]:
+    print(f"+ {filename}")
+  for filename in result["skipped"]:
+    print(f"= {filename} (zaten var, --force ile üzerine yazılır)")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
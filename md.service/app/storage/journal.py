@@ -0,0 +1,69 @@
+"""
+Kayıt bazlı değişiklik (op) tanımları.
+Op'lar idempotenttir; aynı günlük iki kez uygulansa da sonuç değişmez:
+  {"op": "patch",  "id": ..., "patch": {...}}            üst seviye alanları birleştirir
+  {"op": "insert", "record": {...}, "at": "start"|"end"}  id varsa yerinde değiştirir
+  {"op": "delete", "id": ...}
+"""
+from typing import Any
+
+
+def patch_op(record_id: str, patch: dict) -> dict:
+  return {"op": "patch", "id": record_id, "patch": patch}
+
+
+def insert_op(record: dict, at: str = "start") -> dict:
+  return {"op": "insert", "record": record, "at": at}
+
+
+def delete_op(record_id: str) -> dict:
+  return {"op": "delete", "id": record_id}
+
+
+def _position(data: list, record_id: Any) -> int:
+  for idx, rec in enumerate(data):
+    if isinstance(rec, dict) and rec.get("id") == record_id:
+      return idx
+  return -1
+
+
+def _find(data: list, index: dict | None, record_id: Any) -> dict | None:
+  if index is not None:
+    return index.get(record_id)
+  idx = _position(data, record_id)
+  return data[idx] if idx >= 0 else None
+
+
+def apply_ops(data: list, ops: list[dict], index: dict | None = None) -> None:
+  """
+  Op'ları liste üzerine yerinde uygular. `index` (id -> kayıt) verilirse kayıtlar
+  onun üzerinden bulunur ve index de güncel tutulur.
+  """
+  for op in ops:
+    kind = op["op"]
+    if kind == "patch":
+      rec = _find(data, index, op["id"])
+      if rec is not None:
+        rec.update(op["patch"])
+    elif kind == "insert":
+      record = op["record"]
+      rec = _find(data, index, record.get("id"))
+      if rec is not None:
+        rec.clear()
+        rec.update(record)
+        continue
+      if op.get("at") == "end":
+        data.append(record)
+      else:
+        data.insert(0, record)
+      if index is not None:
+        index[record.get("id")] = record
+    elif kind == "delete":
+      rec = _find(data, index, op["id"])
+      if rec is not None:
+        # kimlik karşılaştırması: eşit içerikli başka bir kayıt silinmesin
+        data.pop(next(idx for idx, other in enumerate(data) if other is rec))
+        if index is not None:
+          del index[op["id"]]
+    else:
+      raise ValueError(f"Unknown journal op: {kind}")
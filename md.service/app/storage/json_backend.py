@@ -0,0 +1,281 @@
+import bisect
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+from .base import EVENTS_KEEP, StorageBackend
+from .journal import apply_ops
+
+# <file>.journal: append-only NDJSON op günlüğü. İlk satır günlüğün ait olduğu
+# taban dosyanın inode'unu taşır ({"base": ino}); taban dosya atomik olarak
+# yeniden yazıldığında inode değişir ve eski günlük geçersiz sayılır.
+JOURNAL_SUFFIX = ".journal"
+# Günlük taban dosya boyutuna (en az bu kadar) ulaşınca sıkıştırılır: amortize O(değişiklik)
+COMPACT_MIN_BYTES = 64 * 1024
+# Çok koleksiyonlu işlemler için write-ahead log: DATA_DIR/.wal/<işlem>.json
+# Dosya fsync + rename ile yazılır; var olması işlemin commit edildiği anlamına gelir.
+WAL_DIR_NAME = ".wal"
+STALE_WAL_SECONDS = 3600
+# Değişiklik akışı: DATA_DIR/.events.ndjson, satır başına {"seq": n, "type": ..., ...}.
+# EVENTS_KEEP'in iki katına ulaşınca son EVENTS_KEEP olay tutularak yeniden yazılır.
+EVENTS_FILE_NAME = ".events.ndjson"
+
+
+def _stat_signature(st: os.stat_result) -> tuple:
+  return (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+
+
+def _journal_signature(st: os.stat_result | None) -> tuple | None:
+  return (st.st_ino, st.st_size, st.st_mtime_ns) if st is not None else None
+
+
+class JsonBackend(StorageBackend):
+  """md.data altındaki düz JSON dosyaları (geliştirme için varsayılan)."""
+  name = "json"
+
+  def __init__(self, data_dir: Path):
+    self.data_dir = data_dir
+    self._events_cache: tuple[tuple | None, list[dict]] = (None, [])
+
+  def path(self, filename: str) -> Path:
+    return self.data_dir / filename
+
+  def journal_path(self, filename: str) -> Path:
+    return self.data_dir / (filename + JOURNAL_SUFFIX)
+
+  def signature(self, filename: str) -> tuple:
+    path = self.path(filename)
+    try:
+      base = path.stat()
+    except FileNotFoundError:
+      raise FileNotFoundError(f"Data file not found: {path}") from None
+    try:
+      journal = self.journal_path(filename).stat()
+    except FileNotFoundError:
+      journal = None
+    return _stat_signature(base) + (_journal_signature(journal),)
+
+  def read(self, filename: str) -> tuple[tuple, Any]:
+    path = self.path(filename)
+    if not path.exists():
+      raise FileNotFoundError(f"Data file not found: {path}")
+
+    # Try different encodings
+    for encoding in ["utf-8", "utf-8-sig", "utf-16", "latin-1"]:
+      try:
+        with path.open(encoding=encoding) as f:
+          # fstat on the open handle: the signature always matches the bytes we parse
+          base = os.fstat(f.fileno())
+          data = json.load(f)
+        break
+      except (UnicodeDecodeError, json.JSONDecodeError):
+        continue
+    else:
+      # If all encodings fail, raise error
+      raise ValueError(f"Cannot decode JSON file: {path}")
+
+    journal, ops = self._read_journal(filename, base.st_ino)
+    if ops:
+      apply_ops(data, ops)
+    return _stat_signature(base) + (_journal_signature(journal),), data
+
+  def _read_journal(self, filename: str, base_ino: int) -> tuple[os.stat_result | None, list[dict]]:
+    try:
+      f = self.journal_path(filename).open("rb")
+    except FileNotFoundError:
+      return None, []
+    with f:
+      st = os.fstat(f.fileno())
+      # Read exactly what the signature describes; later appends show up as a new signature
+      lines = f.read(st.st_size).splitlines()
+    if not lines or json.loads(lines[0]).get("base") != base_ino:
+      return st, []  # stale journal of a replaced base file
+    ops = []
+    for line in lines[1:]:
+      try:
+        ops.append(json.loads(line))
+      except json.JSONDecodeError:
+        break  # torn last line after a crash
+    return st, ops
+
+  def write(self, filename: str, data: Any) -> tuple | None:
+    self.data_dir.mkdir(parents=True, exist_ok=True)
+    path = self.path(filename)
+    # Atomic write: temp file + rename to prevent corruption
+    temp_path = path.with_suffix(path.suffix + '.tmp')
+    try:
+      with temp_path.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        written_ino = os.fstat(f.fileno()).st_ino
+      temp_path.replace(path)  # Atomic rename
+    except Exception:
+      if temp_path.exists():
+        temp_path.unlink()
+      raise
+
+    # The new base has a new inode, so the old journal is already void; drop it
+    self.journal_path(filename).unlink(missing_ok=True)
+
+    # If another process already replaced the file again, the signature is unknown
+    st = path.stat()
+    return _stat_signature(st) + (None,) if st.st_ino == written_ino else None
+
+  def append_ops(self, filename: str, ops: list[dict]) -> tuple | None:
+    base = self.path(filename).stat()
+    payload = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops).encode("utf-8")
+    with self.journal_path(filename).open("a+b") as f:
+      f.seek(0)
+      header = f.readline()
+      if not header or json.loads(header).get("base") != base.st_ino:
+        f.truncate(0)
+        payload = (json.dumps({"base": base.st_ino}) + "\n").encode("utf-8") + payload
+      f.write(payload)  # single O_APPEND write
+      f.flush()
+      os.fsync(f.fileno())  # yazma başına tek fsync: dönen op diske ulaşmıştır
+      journal = os.fstat(f.fileno())
+    return _stat_signature(base) + (_journal_signature(journal),)
+
+  def journaled(self) -> list[str]:
+    return sorted(path.name[:-len(JOURNAL_SUFFIX)] for path in self.data_dir.glob("*.json" + JOURNAL_SUFFIX))
+
+  def compaction_due(self, filename: str) -> bool:
+    try:
+      journal = self.journal_path(filename).stat()
+    except FileNotFoundError:
+      return False
+    base = self.path(filename).stat()
+    return journal.st_size >= max(base.st_size, COMPACT_MIN_BYTES)
+
+  # ---------- Transactions ----------
+
+  @property
+  def wal_dir(self) -> Path:
+    return self.data_dir / WAL_DIR_NAME
+
+  def commit(self, writes: dict[str, Any], ops: dict[str, list[dict]]) -> dict[str, tuple | None]:
+    if len(writes) + len(ops) <= 1:
+      return super().commit(writes, ops)  # tek dosya zaten atomik
+
+    # Her dosyanın işlem öncesi imzası: kurtarmada sadece henüz uygulanmamış kısımlar tekrarlanır
+    before = {}
+    for filename in {*writes, *ops}:
+      try:
+        before[filename] = list(self.signature(filename))
+      except FileNotFoundError:
+        before[filename] = None
+
+    self.wal_dir.mkdir(parents=True, exist_ok=True)
+    name = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}.json"
+    wal_path = self.wal_dir / name
+    temp_path = wal_path.with_suffix(".tmp")
+    with temp_path.open("w", encoding="utf-8") as f:
+      json.dump({"before": before, "writes": writes, "ops": ops}, f, ensure_ascii=False)
+      f.flush()
+      os.fsync(f.fileno())  # işlem başına tek fsync
+    temp_path.replace(wal_path)
+
+    signatures = super().commit(writes, ops)
+    wal_path.unlink()
+    return signatures
+
+  def _wal_record(self, name: str) -> dict | None:
+    try:
+      with (self.wal_dir / name).open(encoding="utf-8") as f:
+        return json.load(f)
+    except FileNotFoundError:
+      return None
+
+  def pending_transactions(self) -> list[tuple[str, list[str]]]:
+    if not self.wal_dir.exists():
+      return []
+    for temp_path in self.wal_dir.glob("*.tmp"):
+      # commit edilmemiş (yarıda kalmış) işlem; çalışan bir işlemin dosyasına dokunmamak için eskileri
+      if time.time() - temp_path.stat().st_mtime > STALE_WAL_SECONDS:
+        temp_path.unlink(missing_ok=True)
+    pending = []
+    for path in sorted(self.wal_dir.glob("*.json")):
+      record = self._wal_record(path.name)
+      if record is not None:
+        pending.append((path.name, sorted({*record["writes"], *record["ops"]})))
+    return pending
+
+  def replay(self, name: str) -> bool:
+    record = self._wal_record(name)
+    if record is None:
+      return False
+    # İmzası hâlâ işlem öncesiyle aynı olan dosyalar uygulanmamıştır; diğerleri zaten
+    # uygulanmış ya da sonradan başka bir yazmayla güncellenmiştir ve atlanır
+    pending = set()
+    for filename, before in record["before"].items():
+      try:
+        current = list(self.signature(filename))
+      except FileNotFoundError:
+        current = None
+      if current == before:
+        pending.add(filename)
+    super().commit(
+      {filename: data for filename, data in record["writes"].items() if filename in pending},
+      {filename: file_ops for filename, file_ops in record["ops"].items() if filename in pending},
+    )
+    (self.wal_dir / name).unlink()
+    return True
+
+  # ---------- Change feed ----------
+
+  @property
+  def events_path(self) -> Path:
+    return self.data_dir / EVENTS_FILE_NAME
+
+  def _events(self) -> list[dict]:
+    # Dosya değişmedikçe ayrıştırılmış olaylar yeniden kullanılır (akış istemcileri sık yoklar)
+    try:
+      f = self.events_path.open("rb")
+    except FileNotFoundError:
+      return []
+    with f:
+      st = os.fstat(f.fileno())
+      signature = _journal_signature(st)
+      cached_signature, events = self._events_cache
+      if cached_signature == signature:
+        return events
+      events = []
+      for line in f.read(st.st_size).splitlines():
+        try:
+          events.append(json.loads(line))
+        except json.JSONDecodeError:
+          break  # torn last line after a crash
+    self._events_cache = (signature, events)
+    return events
+
+  def append_event(self, event: dict) -> int:
+    events = self._events()
+    event = {"seq": events[-1]["seq"] + 1 if events else 1, **event}
+    line = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+    self.data_dir.mkdir(parents=True, exist_ok=True)
+    events = events + [event]
+    if len(events) >= 2 * EVENTS_KEEP:
+      events = events[-EVENTS_KEEP:]
+      temp_path = self.events_path.with_suffix(".tmp")
+      with temp_path.open("wb") as f:
+        f.write(b"".join((json.dumps(e, ensure_ascii=False) + "\n").encode("utf-8") for e in events))
+        st = os.fstat(f.fileno())
+      temp_path.replace(self.events_path)
+    else:
+      with self.events_path.open("ab") as f:
+        f.write(line)
+        f.flush()
+        st = os.fstat(f.fileno())
+    self._events_cache = (_journal_signature(st), events)
+    return event["seq"]
+
+  def read_events(self, after: int, limit: int) -> list[dict]:
+    events = self._events()
+    start = bisect.bisect_right(events, after, key=lambda e: e["seq"])
+    return events[start:start + limit]
+
+  def event_bounds(self) -> tuple[int, int]:
+    events = self._events()
+    return (events[0]["seq"], events[-1]["seq"]) if events else (0, 0)
@@ -0,0 +1,75 @@
+"""
+Koleksiyon bazlı yazma kilitleri.
+Süreç içinde thread'ler için RLock, süreçler (uvicorn worker'ları) arasında
+DATA_DIR/.locks/<koleksiyon>.lock üzerinde fcntl.flock kullanılır.
+Kilitler aynı thread içinde iç içe alınabilir; birden fazla koleksiyon her zaman
+isim sırasıyla kilitlenir (deadlock olmaması için).
+"""
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+  import fcntl
+except ImportError:  # Windows geliştirme ortamı: sadece süreç içi kilit
+  fcntl = None
+
+LOCK_DIR_NAME = ".locks"
+
+
+class CollectionLocks:
+  def __init__(self, data_dir: Path):
+    self.lock_dir = data_dir / LOCK_DIR_NAME
+    self._guard = threading.Lock()
+    self._locks: dict[str, threading.RLock] = {}
+    self._held = threading.local()  # filename -> (depth, lock file handle)
+
+  def _thread_lock(self, filename: str) -> threading.RLock:
+    with self._guard:
+      return self._locks.setdefault(filename, threading.RLock())
+
+  def _acquire(self, filename: str) -> None:
+    held = self._held.__dict__.setdefault("files", {})
+    if filename in held:
+      depth, handle = held[filename]
+      held[filename] = (depth + 1, handle)
+      return
+    lock = self._thread_lock(filename)
+    lock.acquire()
+    handle = None
+    try:
+      if fcntl is not None:
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        handle = (self.lock_dir / f"{filename}.lock").open("a")
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+    except BaseException:
+      if handle is not None:
+        handle.close()
+      lock.release()
+      raise
+    held[filename] = (1, handle)
+
+  def _release(self, filename: str) -> None:
+    held = self._held.files
+    depth, handle = held[filename]
+    if depth > 1:
+      held[filename] = (depth - 1, handle)
+      return
+    del held[filename]
+    if handle is not None:
+      fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+      handle.close()
+    self._thread_lock(filename).release()
+
+  @contextmanager
+  def hold(self, *filenames: str):
+    names = sorted(set(filenames))
+    acquired = []
+    try:
+      for name in names:
+        self._acquire(name)
+        acquired.append(name)
+      yield
+    finally:
+      for name in reversed(acquired):
+        self._release(name)
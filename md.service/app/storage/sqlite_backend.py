@@ -0,0 +1,244 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+from .base import EVENTS_KEEP, StorageBackend
+from .journal import apply_ops
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS collections (
+  name TEXT PRIMARY KEY,
+  kind TEXT NOT NULL,
+  version INTEGER NOT NULL DEFAULT 0,
+  document TEXT
+);
+CREATE TABLE IF NOT EXISTS records (
+  collection TEXT NOT NULL,
+  id TEXT NOT NULL,
+  seq INTEGER NOT NULL,
+  data TEXT NOT NULL,
+  PRIMARY KEY (collection, id)
+);
+CREATE INDEX IF NOT EXISTS records_order ON records (collection, seq);
+CREATE TABLE IF NOT EXISTS events (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  event TEXT NOT NULL
+);
+"""
+
+# collections.kind: id'li kayıt listeleri satır satır, diğer JSON (settings, dashboard) tek belge olarak saklanır
+KIND_RECORDS = "records"
+KIND_DOCUMENT = "document"
+
+
+def _dumps(value: Any) -> str:
+  return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _is_record_list(data: Any) -> bool:
+  if not isinstance(data, list):
+    return False
+  ids = set()
+  for rec in data:
+    if not isinstance(rec, dict) or not isinstance(rec.get("id"), str) or rec["id"] in ids:
+      return False
+    ids.add(rec["id"])
+  return True
+
+
+class SqliteBackend(StorageBackend):
+  """
+  Gömülü SQLite (WAL) arka ucu.
+  Her koleksiyon `records` tablosunda (collection, id) anahtarlı satırlar olarak tutulur;
+  yazma sadece değişen satırlara dokunur, `collections.version` her yazmada artar.
+  """
+  name = "sqlite"
+
+  def __init__(self, db_path: Path):
+    self.db_path = db_path
+    self._local = threading.local()
+
+  def connection(self) -> sqlite3.Connection:
+    # sqlite3 bağlantıları thread'ler arasında paylaşılmaz; worker thread başına bir bağlantı
+    conn = getattr(self._local, "conn", None)
+    if conn is None:
+      self.db_path.parent.mkdir(parents=True, exist_ok=True)
+      conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+      conn.execute("PRAGMA journal_mode=WAL")
+      conn.execute("PRAGMA synchronous=NORMAL")
+      conn.executescript(SCHEMA)
+      self._local.conn = conn
+    return conn
+
+  def signature(self, filename: str) -> tuple:
+    row = self.connection().execute(
+      "SELECT version FROM collections WHERE name = ?", (filename,)
+    ).fetchone()
+    if row is None:
+      raise FileNotFoundError(f"Collection not found: {filename} ({self.db_path})")
+    return (row[0],)
+
+  def read(self, filename: str) -> tuple[tuple, Any]:
+    conn = self.connection()
+    conn.execute("BEGIN")
+    try:
+      row = conn.execute(
+        "SELECT kind, version, document FROM collections WHERE name = ?", (filename,)
+      ).fetchone()
+      if row is None:
+        raise FileNotFoundError(f"Collection not found: {filename} ({self.db_path})")
+      kind, version, document = row
+      if kind == KIND_DOCUMENT:
+        data = json.loads(document)
+      else:
+        data = [
+          json.loads(rec)
+          for (rec,) in conn.execute(
+            "SELECT data FROM records WHERE collection = ? ORDER BY seq", (filename,)
+          )
+        ]
+    finally:
+      conn.execute("COMMIT")
+    return (version,), data
+
+  def write(self, filename: str, data: Any) -> tuple | None:
+    conn = self.connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+      version = self._write(conn, filename, data)
+      conn.execute("COMMIT")
+    except BaseException:
+      conn.execute("ROLLBACK")
+      raise
+    return (version,)
+
+  def append_ops(self, filename: str, ops: list[dict]) -> tuple | None:
+    return self.commit({}, {filename: ops})[filename]
+
+  def commit(self, writes: dict[str, Any], ops: dict[str, list[dict]]) -> dict[str, tuple | None]:
+    # Tek SQLite işlemi: ya hepsi ya hiçbiri
+    conn = self.connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+      signatures = {filename: (self._write(conn, filename, data),) for filename, data in writes.items()}
+      for filename, file_ops in ops.items():
+        if self._kind(conn, filename) == KIND_DOCUMENT:
+          self._apply_document_ops(conn, filename, file_ops)
+        else:
+          for op in file_ops:
+            self._apply_op(conn, filename, op)
+        conn.execute("UPDATE collections SET version = version + 1 WHERE name = ?", (filename,))
+        version = conn.execute("SELECT version FROM collections WHERE name = ?", (filename,)).fetchone()[0]
+        signatures[filename] = (version,)
+      conn.execute("COMMIT")
+    except BaseException:
+      conn.execute("ROLLBACK")
+      raise
+    return signatures
+
+  def _kind(self, conn: sqlite3.Connection, filename: str) -> str:
+    # Henüz hiç yazılmamış koleksiyona gelen op'lar: boş kayıt koleksiyonu olarak açılır
+    row = conn.execute("SELECT kind FROM collections WHERE name = ?", (filename,)).fetchone()
+    if row is None:
+      conn.execute("INSERT INTO collections (name, kind, version) VALUES (?, ?, 0)", (filename, KIND_RECORDS))
+      return KIND_RECORDS
+    return row[0]
+
+  def _apply_document_ops(self, conn: sqlite3.Connection, filename: str, ops: list[dict]) -> None:
+    # Tek belge olarak saklanan liste (id'si metin olmayan ya da tekrar eden kayıtlar): belge yeniden yazılır
+    (document,) = conn.execute("SELECT document FROM collections WHERE name = ?", (filename,)).fetchone()
+    data = json.loads(document)
+    if not isinstance(data, list):
+      raise ValueError(f"{filename} is not a record list; record ops cannot be applied")
+    apply_ops(data, ops)
+    conn.execute("UPDATE collections SET document = ? WHERE name = ?", (_dumps(data), filename))
+
+  def _apply_op(self, conn: sqlite3.Connection, filename: str, op: dict) -> None:
+    kind = op["op"]
+    if kind == "patch":
+      row = conn.execute(
+        "SELECT data FROM records WHERE collection = ? AND id = ?", (filename, op["id"])
+      ).fetchone()
+      if row is not None:
+        conn.execute(
+          "UPDATE records SET data = ? WHERE collection = ? AND id = ?",
+          (_dumps({**json.loads(row[0]), **op["patch"]}), filename, op["id"]),
+        )
+    elif kind == "insert":
+      record = op["record"]
+      updated = conn.execute(
+        "UPDATE records SET data = ? WHERE collection = ? AND id = ?",
+        (_dumps(record), filename, record["id"]),
+      ).rowcount
+      if not updated:
+        edge = "MAX(seq) + 1" if op.get("at") == "end" else "MIN(seq) - 1"
+        conn.execute(
+          f"INSERT INTO records (collection, id, seq, data) "
+          f"SELECT ?, ?, COALESCE({edge}, 0), ? FROM records WHERE collection = ?",
+          (filename, record["id"], _dumps(record), filename),
+        )
+    elif kind == "delete":
+      conn.execute("DELETE FROM records WHERE collection = ? AND id = ?", (filename, op["id"]))
+    else:
+      raise ValueError(f"Unknown journal op: {kind}")
+
+  def _write(self, conn: sqlite3.Connection, filename: str, data: Any) -> int:
+    if _is_record_list(data):
+      current = {
+        rec_id: (seq, text)
+        for rec_id, seq, text in conn.execute(
+          "SELECT id, seq, data FROM records WHERE collection = ?", (filename,)
+        )
+      }
+      upserts = []
+      for seq, rec in enumerate(data):
+        text = _dumps(rec)
+        if current.pop(rec["id"], None) != (seq, text):
+          upserts.append((filename, rec["id"], seq, text))
+      if current:
+        conn.executemany(
+          "DELETE FROM records WHERE collection = ? AND id = ?",
+          [(filename, rec_id) for rec_id in current],
+        )
+      conn.executemany(
+        "INSERT OR REPLACE INTO records (collection, id, seq, data) VALUES (?, ?, ?, ?)", upserts
+      )
+      kind, document = KIND_RECORDS, None
+    else:
+      conn.execute("DELETE FROM records WHERE collection = ?", (filename,))
+      kind, document = KIND_DOCUMENT, _dumps(data)
+
+    conn.execute(
+      """
+      INSERT INTO collections (name, kind, version, document) VALUES (?, ?, 1, ?)
+      ON CONFLICT (name) DO UPDATE SET kind = excluded.kind, version = version + 1, document = excluded.document
+      """,
+      (filename, kind, document),
+    )
+    return conn.execute("SELECT version FROM collections WHERE name = ?", (filename,)).fetchone()[0]
+
+  # ---------- Change feed ----------
+
+  def append_event(self, event: dict) -> int:
+    conn = self.connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+      seq = conn.execute("INSERT INTO events (event) VALUES (?)", (_dumps(event),)).lastrowid
+      conn.execute("DELETE FROM events WHERE seq <= ?", (seq - EVENTS_KEEP,))
+      conn.execute("COMMIT")
+    except BaseException:
+      conn.execute("ROLLBACK")
+      raise
+    return seq
+
+  def read_events(self, after: int, limit: int) -> list[dict]:
+    rows = self.connection().execute(
+      "SELECT seq, event FROM events WHERE seq > ? ORDER BY seq LIMIT ?", (after, limit)
+    )
+    return [{"seq": seq, **json.loads(event)} for seq, event in rows]
+
+  def event_bounds(self) -> tuple[int, int]:
+    oldest, latest = self.connection().execute("SELECT MIN(seq), MAX(seq) FROM events").fetchone()
+    return (oldest or 0, latest or 0)
@@ -0,0 +1,192 @@
+"""
+Akışlı (streaming) multipart dosya yükleme.
+- İstek gövdesi request.stream() ile parça parça okunur ve python-multipart ile çözülür; dosya parçası
+  geldikçe doğrudan hedef dizindeki geçici dosyaya yazılır (bellekte tutulmaz, ikinci kopya yok).
+- Baytlar geldikçe sayılır: sınır aşılınca aktarım yarıda kesilir (UploadTooLarge), geçici dosya silinir.
+- SHA-256 özeti yazarken hesaplanır.
+- Geçici dosya hedefle aynı dosya sisteminde açılır; Upload.move_to() os.replace ile atomik taşır.
+Bellek kullanımı dosya boyutundan bağımsızdır (okuma parçası + küçük form alanları).
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Optional
+
+import multipart
+from multipart.multipart import parse_options_header
+from starlette.requests import Request
+
+MAX_FIELD_SIZE = 64 * 1024  # dosya dışı form alanları
+
+
+class UploadError(ValueError):
+  """Çözülemeyen ya da eksik multipart gövde (HTTP 400)"""
+
+
+class UploadTooLarge(Exception):
+  """Dosya izin verilen boyutu aştı (HTTP 413)"""
+
+  def __init__(self, limit: int):
+    super().__init__(f"upload exceeds {limit} bytes")
+    self.limit = limit
+
+
+class Upload:
+  """Diske yazılmış yükleme: form alanları, dosya bilgisi ve geçici dosyanın yolu"""
+
+  def __init__(self):
+    self.fields: dict[str, str] = {}
+    self.filename: Optional[str] = None
+    self.content_type: Optional[str] = None
+    self.size = 0
+    self.sha256: Optional[str] = None
+    self.path: Optional[Path] = None
+
+  def move_to(self, target: Path) -> None:
+    """Geçici dosyayı hedefe atomik olarak taşır"""
+    os.chmod(self.path, 0o644)  # mkstemp 0600 açar; diğer dosyalarla aynı izinler
+    os.replace(self.path, target)
+    self.path = None
+
+  def discard(self) -> None:
+    """Taşınmamış geçici dosyayı siler (her durumda çağrılabilir)"""
+    if self.path is not None:
+      self.path.unlink(missing_ok=True)
+      self.path = None
+
+
+class _Receiver:
+  """python-multipart geri çağrıları: tek dosya parçası geçici dosyaya, diğer alanlar belleğe"""
+
+  def __init__(
+    self,
+    upload: Upload,
+    file_field: str,
+    temp_dir: Path,
+    max_size: int,
+    charset: str,
+    on_file: Optional[Callable[[Upload], None]],
+  ):
+    self.upload = upload
+    self.on_file = on_file
+    self.file_field = file_field
+    self.temp_dir = temp_dir
+    self.max_size = max_size
+    self.charset = charset
+    self.headers: dict[bytes, bytes] = {}
+    self.header_name = b""
+    self.header_value = b""
+    self.name = ""
+    self.data = bytearray()
+    self.file = None
+    self.hasher = None
+
+  def on_part_begin(self) -> None:
+    self.headers = {}
+    self.name = ""
+    self.data = bytearray()
+
+  def on_header_field(self, data: bytes, start: int, end: int) -> None:
+    self.header_name += data[start:end]
+
+  def on_header_value(self, data: bytes, start: int, end: int) -> None:
+    self.header_value += data[start:end]
+
+  def on_header_end(self) -> None:
+    self.headers[self.header_name.lower()] = self.header_value
+    self.header_name = self.header_value = b""
+
+  def on_headers_finished(self) -> None:
+    _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+    if b"name" not in options:
+      raise UploadError('Content-Disposition "name" eksik')
+    self.name = options[b"name"].decode(self.charset, errors="replace")
+    if b"filename" not in options:
+      return
+    if self.name != self.file_field or self.upload.path is not None:
+      raise UploadError("Tek dosya yüklenebilir")
+    self.upload.filename = options[b"filename"].decode(self.charset, errors="replace")
+    self.upload.content_type = self.headers.get(b"content-type", b"").decode("latin-1") or None
+    if self.on_file is not None:
+      self.on_file(self.upload)  # dosyadan önce gelen alanlar: hata varsa dosya hiç yazılmaz
+    handle, name = tempfile.mkstemp(dir=self.temp_dir, prefix="upload-")
+    self.upload.path = Path(name)
+    self.file = os.fdopen(handle, "wb")
+    self.hasher = hashlib.sha256()
+
+  def on_part_data(self, data: bytes, start: int, end: int) -> None:
+    chunk = data[start:end]
+    if self.file is None:
+      if len(self.data) + len(chunk) > MAX_FIELD_SIZE:
+        raise UploadError(f"Form alanı çok büyük: {self.name}")
+      self.data += chunk
+      return
+    self.upload.size += len(chunk)
+    if self.upload.size > self.max_size:
+      raise UploadTooLarge(self.max_size)
+    self.hasher.update(chunk)
+    self.file.write(chunk)
+
+  def on_part_end(self) -> None:
+    if self.file is not None:
+      self.file.close()
+      self.file = None
+      self.upload.sha256 = self.hasher.hexdigest()
+    elif self.name:
+      self.upload.fields[self.name] = self.data.decode(self.charset, errors="replace")
+
+  def close(self) -> None:
+    if self.file is not None:
+      self.file.close()
+      self.file = None
+
+
+async def receive_upload(
+  request: Request,
+  temp_dir: Path,
+  max_size: int,
+  file_field: str = "file",
+  on_file: Optional[Callable[[Upload], None]] = None,
+) -> Upload:
+  """
+  multipart/form-data isteğini okur; `file_field` dosyasını `temp_dir` içindeki geçici dosyaya yazar.
+  `on_file(upload)` dosya parçasının başlıkları okununca, içeriği yazılmadan çağrılır (o ana kadar gelen
+  form alanları ve dosya adı / tipi hazırdır); fırlattığı istisna aktarımı keser.
+  Hata durumunda (UploadError, UploadTooLarge, bağlantı kopması) geçici dosya silinir.
+  Dönen Upload için çağıran taraf move_to() ya da discard() çağırmalıdır.
+  """
+  content_type, params = parse_options_header(request.headers.get("content-type", ""))
+  if content_type != b"multipart/form-data" or b"boundary" not in params:
+    raise UploadError("multipart/form-data bekleniyor")
+  length = request.headers.get("content-length")
+  if length and length.isdigit() and int(length) > max_size + MAX_FIELD_SIZE:
+    raise UploadTooLarge(max_size)  # gövdeyi okumadan reddet
+
+  charset = params.get(b"charset", b"utf-8").decode("latin-1")
+  upload = Upload()
+  receiver = _Receiver(upload, file_field, temp_dir, max_size, charset, on_file)
+  parser = multipart.MultipartParser(params[b"boundary"], {
+    "on_part_begin": receiver.on_part_begin,
+    "on_part_data": receiver.on_part_data,
+    "on_part_end": receiver.on_part_end,
+    "on_header_field": receiver.on_header_field,
+    "on_header_value": receiver.on_header_value,
+    "on_header_end": receiver.on_header_end,
+    "on_headers_finished": receiver.on_headers_finished,
+  })
+  try:
+    async for chunk in request.stream():
+      parser.write(chunk)
+    parser.finalize()
+    if upload.sha256 is None:
+      raise UploadError("Dosya eksik")
+  except multipart.exceptions.MultipartParseError as exc:
+    receiver.close()
+    upload.discard()
+    raise UploadError(f"Geçersiz multipart gövde: {exc}")
+  except BaseException:
+    receiver.close()
+    upload.discard()
+    raise
+  return upload
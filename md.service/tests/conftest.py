@@ -0,0 +1,77 @@
+"""
+Testler md.data'nın geçici bir kopyası üzerinde çalışır (DATA_DIR); gerçek veri klasörüne yazılmaz.
+Çalıştırma: md.service altında `python -m pytest`.
+"""
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("AUTH_MODE", "dev")
+
+from app import data_loader  # noqa: E402
+
+SOURCE_DATA = Path(__file__).resolve().parent.parent.parent / "md.data"
+
+
+def _reset() -> None:
+  # Veri klasörü, arka uç ve kilitler ilk kullanımda DATA_DIR'den kurulup saklanır
+  data_loader.get_data_dir.cache_clear()
+  data_loader.get_backend.cache_clear()
+  data_loader.get_locks.cache_clear()
+  data_loader.clear_cache()
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+  target = tmp_path / "md.data"
+  shutil.copytree(
+    SOURCE_DATA,
+    target,
+    ignore=shutil.ignore_patterns(".locks", ".wal", ".events.*", "*.sqlite3*"),
+  )
+  monkeypatch.setenv("DATA_DIR", str(target))
+  monkeypatch.delenv("DATA_BACKEND", raising=False)
+  _reset()
+  yield target
+  _reset()
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request, data_dir, monkeypatch):
+  """Aynı testi iki arka uçta da çalıştırır; SQLite veritabanı kopyadan içe aktarılır"""
+  if request.param == "sqlite":
+    from app.storage.importer import import_json_dir
+
+    monkeypatch.setenv("DATA_BACKEND", "sqlite")
+    _reset()
+    import_json_dir(data_dir, data_loader.get_backend())
+  return data_loader.get_backend()
+
+
+@pytest.fixture
+def client(data_dir):
+  from fastapi.testclient import TestClient
+
+  from app.main import app
+
+  # lifespan da çalışır: recover, defter geçişi, sayım koleksiyonları
+  with TestClient(app) as test_client:
+    yield test_client
+
+
+@pytest.fixture
+def docs(client, tmp_path, monkeypatch):
+  """Belgeler gerçek md.docs yerine geçici klasöre yazılır; içerik adresli depo döner"""
+  from app.blobs import BlobStore
+  from app.routers import documents
+
+  root = tmp_path / "md.docs"
+  (root / "documents" / ".tmp").mkdir(parents=True)
+  monkeypatch.setattr(documents, "BASE_DIR", tmp_path)
+  monkeypatch.setattr(documents, "DOCS_DIR", root / "documents")
+  monkeypatch.setattr(documents, "UPLOAD_TMP_DIR", root / "documents" / ".tmp")
+  store = BlobStore(root)
+  monkeypatch.setattr(documents, "BLOBS", store)
+  return store
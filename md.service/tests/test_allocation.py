@@ -0,0 +1,129 @@
+"""Rezervasyon tahsisi: düşülme sırası ve bekleyen rezervasyon kuyrukları"""
+from app.allocation import CANCELLED, PENDING, Allocator, ReservationQueues, steal_key
+from app.data_loader import find_by, get_by_id, load_json
+
+
+def _reservation(rec_id: str, job_id: str, qty: float, priority: int = 0, created_at: str = "2026-01-01T10:00:00") -> dict:
+  return {
+    "id": rec_id,
+    "itemId": "STK-1",
+    "jobId": job_id,
+    "qty": qty,
+    "priority": priority,
+    "createdAt": created_at,
+    "status": PENDING,
+  }
+
+
+def _allocator(records: list[dict]) -> Allocator:
+  return Allocator(lambda item_id: sorted((rec for rec in records if rec["itemId"] == item_id), key=steal_key))
+
+
+def test_steal_takes_low_priority_then_newest_first():
+  records = [
+    _reservation("RSV-OLD", "JOB-A", 5, created_at="2026-01-01T09:00:00"),
+    _reservation("RSV-URGENT", "JOB-B", 5, priority=5, created_at="2026-01-03T09:00:00"),
+    _reservation("RSV-NEW", "JOB-C", 5, created_at="2026-01-02T09:00:00"),
+  ]
+  impacts = _allocator(records).steal("STK-1", 12, "JOB-D")
+  assert [impact["reservationId"] for impact in impacts] == ["RSV-NEW", "RSV-OLD", "RSV-URGENT"]
+  assert [impact["reducedBy"] for impact in impacts] == [5, 5, 2]
+  assert [impact["cancelled"] for impact in impacts] == [True, True, False]
+  assert records[1]["qty"] == 3 and records[1]["status"] == PENDING
+  assert records[2]["status"] == CANCELLED and records[2]["affectedBy"] == "JOB-D"
+
+
+def test_undated_reservation_counts_as_oldest():
+  records = [
+    _reservation("RSV-DATED", "JOB-A", 5),
+    {**_reservation("RSV-UNDATED", "JOB-B", 5), "createdAt": None},
+  ]
+  impacts = _allocator(records).steal("STK-1", 5, "JOB-D")
+  assert [impact["reservationId"] for impact in impacts] == ["RSV-DATED"]
+
+
+def test_steal_skips_own_job_and_keeps_it_queued():
+  records = [
+    _reservation("RSV-OWN", "JOB-D", 5, created_at="2026-01-05T09:00:00"),
+    _reservation("RSV-OTHER", "JOB-A", 5),
+  ]
+  allocator = _allocator(records)
+  assert [impact["reservationId"] for impact in allocator.steal("STK-1", 10, "JOB-D")] == ["RSV-OTHER"]
+  assert records[0]["qty"] == 5
+  # sonraki satır başka bir iş için: kendi rezervasyonu kuyrukta kalmış olmalı
+  assert [impact["reservationId"] for impact in allocator.steal("STK-1", 1, "JOB-E")] == ["RSV-OWN"]
+  assert set(allocator.changed) == {"RSV-OTHER", "RSV-OWN"}
+
+
+def test_partial_steal_is_continued_by_next_line():
+  records = [_reservation("RSV-1", "JOB-A", 10), _reservation("RSV-2", "JOB-B", 10, created_at="2026-01-02T09:00:00")]
+  allocator = _allocator(records)
+  first = allocator.steal("STK-1", 4, "JOB-D")
+  second = allocator.steal("STK-1", 8, "JOB-D")
+  assert [(i["reservationId"], i["remainingQty"]) for i in first] == [("RSV-2", 6)]
+  assert [(i["reservationId"], i["remainingQty"]) for i in second] == [("RSV-2", 0), ("RSV-1", 8)]
+
+
+def test_queues_follow_steal_order_through_add_and_remove():
+  records = [
+    _reservation("RSV-1", "JOB-A", 5, created_at="2026-01-01T09:00:00"),
+    _reservation("RSV-2", "JOB-B", 5, priority=3),
+    _reservation("RSV-3", "JOB-C", 5, created_at="2026-01-04T09:00:00"),
+    {**_reservation("RSV-DONE", "JOB-C", 5), "status": CANCELLED},
+    {**_reservation("RSV-OTHER-ITEM", "JOB-C", 5), "itemId": "STK-2"},
+  ]
+  queues = ReservationQueues(records)
+  assert queues.search("STK-1") == ["RSV-3", "RSV-1", "RSV-2"]
+
+  queues.add(_reservation("RSV-4", "JOB-D", 5, created_at="2026-01-02T09:00:00"))
+  queues.add(_reservation("RSV-4", "JOB-D", 5))  # aynı id tekrar eklenmez
+  queues.remove("RSV-1")
+  queues.remove("RSV-MISSING")
+  assert queues.search("STK-1") == ["RSV-3", "RSV-4", "RSV-2"]
+
+  queues.remove("RSV-OTHER-ITEM")
+  assert queues.search("STK-2") == []
+
+
+def test_bulk_reserve_repeated_item_accumulates(client):
+  item = load_json("stockItems.json")[0]
+  available = item["onHand"] - item["reserved"]
+  response = client.post("/stock/bulk-reserve", json={
+    "jobId": "JOB-T1",
+    "items": [{"itemId": item["id"], "qty": available - 1}, {"itemId": item["id"], "qty": 2}, {"itemId": "STK-YOK", "qty": 1}],
+  })
+  assert response.status_code == 201
+  body = response.json()
+  # ikinci satır ilk satırın rezervini görür: yetersiz kalır
+  assert [line["qty"] for line in body["results"]] == [available - 1]
+  assert [error["itemId"] for error in body["errors"]] == [item["id"], "STK-YOK"]
+  assert get_by_id("stockItems.json", item["id"])["reserved"] == item["reserved"] + available - 1
+  assert [r["qty"] for r in find_by("reservations.json", "jobId", "JOB-T1")] == [available - 1]
+
+
+def test_consume_steals_from_other_jobs_reservation(client):
+  item = load_json("stockItems.json")[0]
+  free = item["onHand"] - item["reserved"]
+  client.post("/stock/bulk-reserve", json={"jobId": "JOB-A", "items": [{"itemId": item["id"], "qty": free}]})
+  response = client.post("/stock/bulk-reserve", json={
+    "jobId": "JOB-B", "reserveType": "consume", "items": [{"itemId": item["id"], "qty": 4}],
+  })
+  assert response.status_code == 201
+  impacts = response.json()["results"][0]["affectedReservations"]
+  assert [(impact["reducedBy"], impact["remainingQty"]) for impact in impacts] == [(4, free - 4)]
+  stored = get_by_id("stockItems.json", item["id"])
+  assert (stored["onHand"], stored["reserved"]) == (item["onHand"] - 4, item["reserved"] + free - 4)
+
+
+def test_release_returns_reserved_quantity(client):
+  item = load_json("stockItems.json")[0]
+  client.post("/stock/bulk-reserve", json={"jobId": "JOB-R", "items": [{"itemId": item["id"], "qty": 5}]})
+  reservation = find_by("reservations.json", "jobId", "JOB-R")[0]
+
+  response = client.put(f"/stock/reservations/{reservation['id']}/release")
+  assert response.status_code == 200
+  released = response.json()["reservation"]
+  assert released["status"] == "İptal" and released["releasedAt"]
+  assert released == get_by_id("reservations.json", reservation["id"])
+  assert get_by_id("stockItems.json", item["id"])["reserved"] == item["reserved"]
+  assert client.put("/stock/reservations/RSV-YOK/release").status_code == 404
@@ -0,0 +1,64 @@
+"""İçerik adresli belge deposu: aynı içerik tek blob, blob son referansla silinir"""
+from app.blobs import migrate
+from app.data_loader import get_by_id, insert_one
+
+
+def _upload(client, content: bytes) -> dict:
+  response = client.post(
+    "/documents/upload",
+    data={"docType": "olcu", "jobId": "JOB-TEST"},
+    files={"file": ("olcu.pdf", content, "application/pdf")},
+  )
+  assert response.status_code == 200, response.text
+  return response.json()
+
+
+def test_same_content_shares_one_blob(client, docs):
+  first = _upload(client, b"%PDF-1.4 ayni")
+  second = _upload(client, b"%PDF-1.4 ayni")
+  assert first["id"] != second["id"]
+  assert first["path"] == second["path"] == docs.relative(first["sha256"])
+  assert docs.references(first["sha256"]) == 2
+  assert len([p for p in (docs.root / "blobs").rglob("*") if p.is_file()]) == 1
+
+
+def test_blob_is_removed_with_last_reference(client, docs):
+  first = _upload(client, b"%PDF-1.4 ayni")
+  second = _upload(client, b"%PDF-1.4 ayni")
+  blob = docs.path(first["sha256"])
+
+  assert client.delete(f"/documents/{first['id']}").status_code == 200
+  assert blob.exists()
+  assert docs.references(first["sha256"]) == 1
+  assert client.get(f"/documents/{second['id']}/download").status_code == 200
+
+  assert client.delete(f"/documents/{second['id']}").status_code == 200
+  assert not blob.exists()
+  assert docs.references(first["sha256"]) == 0
+
+
+def test_deleting_one_content_keeps_other_blobs(client, docs):
+  first = _upload(client, b"%PDF-1.4 bir")
+  other = _upload(client, b"%PDF-1.4 iki")
+  assert first["sha256"] != other["sha256"]
+
+  assert client.delete(f"/documents/{first['id']}").status_code == 200
+  assert not docs.path(first["sha256"]).exists()
+  assert docs.path(other["sha256"]).exists()
+
+
+def test_migrate_moves_legacy_files_into_the_store(client, docs):
+  folder = docs.root / "documents" / "olcu"
+  folder.mkdir()
+  for name in ("a.pdf", "b.pdf"):
+    (folder / name).write_bytes(b"%PDF-1.4 eski")
+    insert_one("documents.json", {"id": f"DOC-{name[0].upper()}", "path": f"documents/olcu/{name}"})
+  result = migrate(docs)
+  assert (result["moved"], result["deduplicated"]) == (1, 1)
+  # tekrar çalıştırılabilir; kayıtlı diğer belgelerin dosyası geçici klasörde yok
+  assert migrate(docs) == {"moved": 0, "deduplicated": 0, "missing": result["missing"]}
+  first, second = get_by_id("documents.json", "DOC-A"), get_by_id("documents.json", "DOC-B")
+  assert first["sha256"] == second["sha256"] and first["path"] == docs.relative(first["sha256"])
+  assert docs.references(first["sha256"]) == 2
+  assert list(folder.iterdir()) == []
+  assert docs.path(first["sha256"]).read_bytes() == b"%PDF-1.4 eski"
@@ -0,0 +1,50 @@
+"""Ayrıştırılmış belge önbelleği: dosya imzası değişmedikçe yeniden okunmaz, kopyalar bağımsızdır"""
+import json
+import os
+
+from app.data_loader import cache_stats, clear_cache, load_json, save_json
+
+
+def test_repeated_reads_are_served_from_cache(data_dir):
+  load_json("jobs.json")
+  before = cache_stats()
+  load_json("jobs.json")
+  after = cache_stats()
+  assert after["hits"] == before["hits"] + 1
+  assert after["misses"] == before["misses"]
+
+
+def test_callers_get_independent_copies(data_dir):
+  first = load_json("jobs.json")
+  first[0]["title"] = "değiştirildi"
+  first.append({"id": "EKSTRA"})
+  second = load_json("jobs.json")
+  assert second[0].get("title") != "değiştirildi"
+  assert all(rec.get("id") != "EKSTRA" for rec in second)
+
+
+def test_file_changed_on_disk_is_reread(data_dir):
+  load_json("jobs.json")
+  path = data_dir / "jobs.json"
+  data = json.loads(path.read_text(encoding="utf-8"))
+  data[0]["title"] = "diskte değişti"
+  path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+  st = path.stat()
+  os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+  misses = cache_stats()["misses"]
+  assert load_json("jobs.json")[0]["title"] == "diskte değişti"
+  assert cache_stats()["misses"] == misses + 1
+
+
+def test_save_keeps_cache_warm(data_dir):
+  data = load_json("jobs.json")
+  data[0]["title"] = "kaydedildi"
+  save_json("jobs.json", data)
+
+  misses = cache_stats()["misses"]
+  assert load_json("jobs.json")[0]["title"] == "kaydedildi"
+  assert cache_stats()["misses"] == misses
+
+  clear_cache()
+  assert load_json("jobs.json")[0]["title"] == "kaydedildi"
@@ -0,0 +1,29 @@
+"""Sık yoklanan GET'ler: koleksiyon sürümü tabanlı ETag ve If-None-Match (304)"""
+from app.data_loader import load_json
+
+
+def test_if_none_match_returns_304_until_collection_changes(client):
+  first = client.get("/stock/items")
+  etag = first.headers["ETag"]
+  cached = client.get("/stock/items", headers={"If-None-Match": etag})
+  assert cached.status_code == 304
+  assert cached.content == b""
+
+  item = load_json("stockItems.json")[0]
+  assert client.post("/stock/movements", json={"itemId": item["id"], "qty": 1, "type": "stockIn"}).status_code < 300
+  changed = client.get("/stock/items", headers={"If-None-Match": etag})
+  assert changed.status_code == 200
+  assert changed.headers["ETag"] != etag
+
+
+def test_other_query_is_another_variant(client):
+  etag = client.get("/jobs/").headers["ETag"]
+  response = client.get("/jobs/", params={"limit": 1}, headers={"If-None-Match": etag})
+  assert response.status_code == 200
+  assert response.headers["ETag"] != etag
+
+
+def test_unversioned_path_has_no_etag(client):
+  response = client.get("/customers/", headers={"If-None-Match": "*"})
+  assert response.status_code == 200
+  assert "ETag" not in response.headers
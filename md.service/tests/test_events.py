@@ -0,0 +1,114 @@
+"""Değişiklik akışı: iş statüsü ve montaj olayları, GET /events (SSE)"""
+import json
+
+import pytest
+from starlette.requests import Request
+
+from app.data_loader import event_bounds, load_json, read_events
+
+
+def _events(after: int, prefix: str = "") -> list[dict]:
+  return [event for event in read_events(after) if event["type"].startswith(prefix)]
+
+
+def _job(status: str) -> dict:
+  return next(job for job in load_json("jobs.json") if job.get("status") != status)
+
+
+@pytest.mark.parametrize("path, body, status", [
+  ("production", {"status": "URETIMDE"}, "URETIMDE"),
+  ("assembly/schedule", {"date": "2026-03-01"}, "MONTAJ_TERMIN"),
+  ("offer", {"lines": [], "total": 0}, "TEKLIF_TASLAK"),
+  ("status", {"status": "SERVIS_BEKLIYOR"}, "SERVIS_BEKLIYOR"),
+])
+def test_every_status_change_is_published(client, path, body, status):
+  job = _job(status)
+  after = event_bounds()[1]
+  response = client.put(f"/jobs/{job['id']}/{path}", json=body)
+  assert response.status_code == 200
+  assert response.json()["status"] == status
+  events = _events(after, "job.")
+  assert [event["data"] for event in events] == [{"jobId": job["id"], "status": status, "previousStatus": job.get("status", "")}]
+
+
+def test_write_without_status_change_publishes_nothing(client):
+  job = load_json("jobs.json")[0]
+  after = event_bounds()[1]
+  assert client.put(f"/jobs/{job['id']}/status", json={"status": job["status"], "rejection": {"reason": "yok"}}).status_code == 200
+  assert _events(after, "job.") == []
+
+
+def test_stale_job_write_conflicts_and_publishes_nothing(client):
+  job = _job("URETIMDE")
+  assert client.put(f"/jobs/{job['id']}/assembly/schedule", json={"date": "2026-03-01"}).status_code == 200
+  after = event_bounds()[1]
+  response = client.put(f"/jobs/{job['id']}/production", json={"status": "URETIMDE"}, headers={"If-Match": f'"{job.get("_rev", 0)}"'})
+  assert response.status_code == 409
+  assert _events(after) == []
+
+
+def test_complete_all_publishes_one_event_per_task(client):
+  job = load_json("jobs.json")[0]
+  created = [
+    client.post("/assembly/tasks", json={
+      "jobId": job["id"], "roleId": "R1", "roleName": "Rol", "stageId": f"S{order}", "stageName": f"Aşama {order}", "stageOrder": order,
+    }).json()
+    for order in (1, 2)
+  ]
+  after = event_bounds()[1]
+  response = client.post(f"/assembly/tasks/complete-all/{job['id']}", json={"photosAfter": ["son.jpg"], "customerSignature": "imza"})
+  assert response.status_code == 200
+  assert response.json()["completed"] == 2
+  assert {task["status"] for task in response.json()["tasks"]} == {"completed"}
+
+  events = _events(after, "assembly.")
+  assert sorted(event["data"]["taskId"] for event in events) == sorted(task["id"] for task in created)
+  stored = {task["id"]: task for task in load_json("assemblyTasks.json") if task.get("jobId") == job["id"]}
+  assert {task["status"] for task in stored.values()} == {"completed"}
+  assert stored[created[1]["id"]]["photos"]["after"] == ["son.jpg"]
+  assert stored[created[1]["id"]]["customerSignature"] == "imza"
+  assert stored[created[0]["id"]]["photos"]["after"] == []
+
+
+@pytest.fixture
+def one_poll(monkeypatch):
+  # akış sonsuzdur: ilk okumadan sonra istemci bağlantıyı kapatmış sayılır
+  polls = []
+
+  async def is_disconnected(self):
+    polls.append(1)
+    return len(polls) > 1
+
+  monkeypatch.setattr(Request, "is_disconnected", is_disconnected)
+  monkeypatch.setattr("app.routers.events.POLL_SECONDS", 0)
+
+
+def _frames(response) -> list[dict]:
+  frames = []
+  for block in response.text.split("\n\n"):
+    fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+    if "event" in fields:
+      frames.append({"id": fields.get("id"), "event": fields["event"], "data": json.loads(fields["data"])})
+  return frames
+
+
+def test_feed_sends_events_after_since(client, one_poll):
+  job = _job("URETIMDE")
+  after = event_bounds()[1]
+  client.put(f"/jobs/{job['id']}/production", json={"status": "URETIMDE"})
+  response = client.get("/events", params={"since": after, "types": "job."})
+  assert response.headers["content-type"].startswith("text/event-stream")
+  frames = _frames(response)
+  assert [frame["event"] for frame in frames] == ["job.status.updated"]
+  assert frames[0]["id"] == str(frames[0]["data"]["seq"]) and frames[0]["data"]["seq"] > after
+  assert frames[0]["data"]["data"]["jobId"] == job["id"]
+
+
+def test_last_event_id_resumes_and_unknown_position_resets(client, one_poll):
+  job = _job("URETIMDE")
+  client.put(f"/jobs/{job['id']}/production", json={"status": "URETIMDE"})
+  latest = event_bounds()[1]
+  assert _frames(client.get("/events", headers={"Last-Event-ID": str(latest)})) == []
+
+  frames = _frames(client.get("/events", params={"since": latest + 10}))
+  assert frames == [{"id": None, "event": "reset", "data": {"latest": latest}}]
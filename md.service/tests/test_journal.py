@@ -0,0 +1,84 @@
+"""JSON arka ucu: kayıt op günlüğü (<dosya>.json.journal), sıkıştırma ve kapanışta katlama"""
+import json
+
+from app.data_loader import clear_cache, compact_journals, get_by_id, load_json, save_json, update_one
+from app.storage import json_backend
+
+
+def _journal(data_dir, filename: str = "jobs.json"):
+  return data_dir / (filename + json_backend.JOURNAL_SUFFIX)
+
+
+def _on_disk(data_dir, filename: str = "jobs.json") -> list:
+  return json.loads((data_dir / filename).read_text(encoding="utf-8"))
+
+
+def test_update_appends_only_the_changed_fields(data_dir):
+  job = load_json("jobs.json")[0]
+  original = _on_disk(data_dir)
+  update_one("jobs.json", job["id"], {"title": "günlük"})
+
+  assert _on_disk(data_dir) == original
+  header, *ops = [json.loads(line) for line in _journal(data_dir).read_text(encoding="utf-8").splitlines()]
+  assert header == {"base": (data_dir / "jobs.json").stat().st_ino}
+  assert ops == [{"op": "patch", "id": job["id"], "patch": {"title": "günlük", "_rev": 1}}]
+
+  clear_cache()
+  assert get_by_id("jobs.json", job["id"])["title"] == "günlük"
+
+
+def test_torn_last_line_is_ignored(data_dir):
+  jobs = load_json("jobs.json")
+  update_one("jobs.json", jobs[0]["id"], {"title": "tam"})
+  with _journal(data_dir).open("ab") as f:
+    f.write(b'{"op": "patch", "id": "' + jobs[1]["id"].encode() + b'", "patch": {"tit')
+  clear_cache()
+  assert get_by_id("jobs.json", jobs[0]["id"])["title"] == "tam"
+  assert get_by_id("jobs.json", jobs[1]["id"]) == jobs[1]
+
+
+def test_whole_save_drops_the_journal(data_dir):
+  jobs = load_json("jobs.json")
+  update_one("jobs.json", jobs[0]["id"], {"title": "günlük"})
+  jobs = load_json("jobs.json")
+  jobs[1]["title"] = "tam kayıt"
+  save_json("jobs.json", jobs)
+
+  assert not _journal(data_dir).exists()
+  clear_cache()
+  assert [rec.get("title") for rec in load_json("jobs.json")[:2]] == ["günlük", "tam kayıt"]
+
+
+def test_journal_reaching_base_size_is_compacted(data_dir, monkeypatch):
+  monkeypatch.setattr(json_backend, "COMPACT_MIN_BYTES", 0)
+  save_json("kucuk.json", [{"id": "A", "n": 0}])
+  update_one("kucuk.json", "A", {"n": 1})
+  assert _journal(data_dir, "kucuk.json").exists()
+
+  # günlük artık taban dosyadan büyük: sonraki yazma dosyayı yeniden yazar
+  update_one("kucuk.json", "A", {"n": 2})
+  assert not _journal(data_dir, "kucuk.json").exists()
+  assert _on_disk(data_dir, "kucuk.json") == [{"id": "A", "n": 2, "_rev": 2}]
+
+
+def test_compact_journals_folds_every_journal(data_dir):
+  jobs = load_json("jobs.json")
+  update_one("jobs.json", jobs[0]["id"], {"title": "kapanış"})
+  assert _journal(data_dir).exists()
+  assert compact_journals() == ["jobs.json"]
+  assert not _journal(data_dir).exists()
+  assert _on_disk(data_dir)[0]["title"] == "kapanış"
+  assert load_json("jobs.json")[0]["title"] == "kapanış"
+
+
+def test_app_shutdown_compacts(data_dir):
+  from fastapi.testclient import TestClient
+
+  from app.main import app
+
+  job = load_json("jobs.json")[0]
+  with TestClient(app) as client:
+    assert client.put(f"/jobs/{job['id']}/production", json={"status": "URETIMDE"}).status_code == 200
+    assert _journal(data_dir).exists()
+  assert not _journal(data_dir).exists()
+  assert _on_disk(data_dir)[0]["status"] == "URETIMDE"
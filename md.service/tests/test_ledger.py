@@ -0,0 +1,132 @@
+"""Stok defteri: eski dosyadan aylık segmentlere geçiş, ay özetleri, geçmiş bakiyeler"""
+import json
+
+import pytest
+
+from app import ledger
+from app.data_loader import get_by_id, load_json, save_json
+from app.ledger import (
+  LEDGER,
+  LEGACY_MOVEMENTS,
+  balance_at,
+  close_months,
+  count_movements,
+  ensure_ledger,
+  month_rollup,
+  movements,
+  segment_file,
+  segment_months,
+)
+
+ITEM = "STK-DEFTER"
+# eski dosya yeniden eskiye sıralıdır; kalemin bugünkü değeri: onHand 13, reserved 3
+LEGACY = [
+  {"id": "M4", "date": "2026-01-10", "itemId": ITEM, "change": -2, "type": "stockOut", "jobId": "JOB-A"},
+  {"id": "M3", "date": "2025-12-20", "itemId": ITEM, "change": 5, "type": "stockIn"},
+  {"id": "M2", "date": "2025-12-05", "itemId": ITEM, "change": 3, "type": "reserve", "jobId": "JOB-A"},
+  {"id": "M1", "date": "2025-11-15", "itemId": ITEM, "change": 10, "type": "stockIn"},
+]
+
+
+@pytest.fixture
+def legacy(data_dir):
+  (data_dir / LEGACY_MOVEMENTS).write_text(json.dumps(LEGACY), encoding="utf-8")
+  items = load_json("stockItems.json")
+  save_json("stockItems.json", [*items, {"id": ITEM, "productCode": "D1", "colorCode": "1", "name": "Defter", "onHand": 13, "reserved": 3}])
+  return data_dir
+
+
+@pytest.fixture
+def in_january(legacy, monkeypatch):
+  # bugün 2026-01 içinde: ocak açık ay, önceki aylar kapanmış
+  monkeypatch.setattr(ledger, "_today", lambda: "2026-01-20")
+  return legacy
+
+
+def _ids(rows) -> list[str]:
+  return [row["id"] for row in rows]
+
+
+def test_migration_splits_legacy_into_month_segments(legacy):
+  assert segment_months() == []
+  ensure_ledger()
+  assert segment_months() == ["2025-11", "2025-12", "2026-01"]
+  assert _ids(load_json(segment_file("2025-12"))) == ["M2", "M3"]  # ay içinde eskiden yeniye
+  assert (legacy / LEGACY_MOVEMENTS).exists()
+  assert _ids(load_json(LEDGER)) == segment_months()
+
+  ensure_ledger()  # tekrar çalıştırılabilir
+  assert len(load_json(segment_file("2025-12"))) == 2
+
+
+def test_migration_derives_balances_back_from_current_values(legacy):
+  ensure_ledger()
+  balances = {m["id"]: m["balance"] for month in segment_months() for m in load_json(segment_file(month))}
+  assert balances == {
+    "M1": {"onHand": 10, "reserved": 0},
+    "M2": {"onHand": 10, "reserved": 3},
+    "M3": {"onHand": 15, "reserved": 3},
+    "M4": {"onHand": 13, "reserved": 3},
+  }
+
+
+def test_movements_read_newest_first_within_range(legacy):
+  ensure_ledger()
+  assert _ids(movements()) == ["M4", "M3", "M2", "M1"]
+  assert _ids(movements(since="2025-12-01", until="2025-12-31")) == ["M3", "M2"]
+  assert _ids(movements(job_id="JOB-A")) == ["M4", "M2"]
+  assert count_movements(since="2025-12-01", until="2025-12-31") == 2
+  assert count_movements(item_id=ITEM, job_id="JOB-A") == 2
+
+
+def test_close_months_writes_each_rollup_once(in_january):
+  assert ensure_ledger() == 2
+  assert close_months() == 0
+  assert close_months("2026-02") == 1
+  assert close_months("2026-02") == 0
+  december = get_by_id("stockSnapshots.json", "2025-12")
+  assert december["items"][ITEM] == {"onHand": 15, "reserved": 3}
+  assert december["totals"][ITEM] == {"reserve": 3, "stockIn": 5}
+  assert december["jobs"] == {"JOB-A": {"reserve": 3}}
+
+
+def test_rollup_of_open_month_is_computed_not_stored(in_january):
+  ensure_ledger()
+  assert get_by_id("stockSnapshots.json", "2026-01") is None
+  january = month_rollup("2026-01")
+  assert january["items"][ITEM] == {"onHand": 13, "reserved": 3}
+  assert january["totals"] == {ITEM: {"stockOut": 2}}
+  assert get_by_id("stockSnapshots.json", "2026-01") is None
+  # hareketsiz ay: önceki kapanış, toplamsız
+  assert month_rollup("2026-03") == {"id": "2026-03", "items": january["items"], "totals": {}, "jobs": {}}
+
+
+@pytest.mark.parametrize("day, expected", [
+  ("2025-10-01", {"onHand": 0, "reserved": 0}),  # ilk hareketten önce
+  ("2025-11-30", {"onHand": 10, "reserved": 0}),
+  ("2025-12-10", {"onHand": 10, "reserved": 3}),
+  ("2026-01-09", {"onHand": 15, "reserved": 3}),  # önceki ayın kapanışı
+  ("2026-03-01", {"onHand": 13, "reserved": 3}),
+])
+def test_balance_at_day(legacy, day, expected):
+  ensure_ledger()
+  close_months("2026-02")
+  assert balance_at(ITEM, day) == expected
+
+
+def test_unknown_item_has_no_balance(legacy):
+  ensure_ledger()
+  assert balance_at("STK-YOK", "2026-01-01") is None
+
+
+def test_new_movement_appends_to_current_month_only(legacy, client):
+  closed = {month: (legacy / segment_file(month)).read_bytes() for month in segment_months()}
+  response = client.post("/stock/movements", json={"itemId": ITEM, "qty": 1, "type": "stockIn"})
+  assert response.status_code == 201
+  movement = response.json()["movement"]
+
+  current = movement["date"][:7]
+  assert current in segment_months()
+  assert load_json(segment_file(current))[-1]["id"] == movement["id"]
+  assert movement["balance"] == {"onHand": 14, "reserved": 3}
+  assert {month: (legacy / segment_file(month)).read_bytes() for month in closed} == closed
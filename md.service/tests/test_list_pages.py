@@ -0,0 +1,68 @@
+"""/jobs/ ve /documents/: (tarih, id) keyset sayfalaması, sayfa başına koleksiyon kopyalanmaz"""
+import pytest
+
+from app import data_loader
+from app.data_loader import insert_one, load_json
+from app.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+
+
+def _walk(client, path: str, limit: int, between=None, **params) -> list[str]:
+  seen, cursor = [], None
+  while True:
+    response = client.get(path, params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})})
+    assert response.status_code == 200
+    seen += [rec["id"] for rec in response.json()]
+    cursor = response.headers.get(NEXT_CURSOR_HEADER)
+    if cursor is None:
+      return seen
+    if between:
+      between()
+      between = None
+
+
+@pytest.mark.parametrize("path, filename, field", [
+  ("/jobs/", "jobs.json", "createdAt"),
+  ("/documents/", "documents.json", "uploadedAt"),
+])
+def test_lists_are_newest_first(client, path, filename, field):
+  records = load_json(filename)
+  expected = [rec["id"] for rec in sorted(records, key=lambda rec: (rec.get(field) or "", rec["id"]), reverse=True)]
+  response = client.get(path)
+  assert [rec["id"] for rec in response.json()] == expected
+  assert response.headers[TOTAL_COUNT_HEADER] == str(len(records))
+  assert _walk(client, path, 5) == expected
+
+
+def test_job_created_between_pages_is_not_repeated(client):
+  expected = [rec["id"] for rec in client.get("/jobs/").json()]
+
+  def create():
+    insert_one("jobs.json", {"id": "JOB-YENI", "title": "yeni", "createdAt": "2099-01-01T00:00:00"})
+
+  assert _walk(client, "/jobs/", 4, between=create) == expected
+
+
+def test_page_copies_only_what_it_touches(client, monkeypatch):
+  total = len(load_json("jobs.json"))
+  first = client.get("/jobs/", params={"limit": 2})
+  copied = []
+  copy = data_loader._copy
+
+  def counted(value):
+    copied.append(len(value) if isinstance(value, list) else 1)
+    return copy(value)
+
+  monkeypatch.setattr(data_loader, "_copy", counted)
+  response = client.get("/jobs/", params={"limit": 2, "cursor": first.headers[NEXT_CURSOR_HEADER]})
+  assert len(response.json()) == 2
+  assert sum(copied) < total
+
+
+def test_documents_of_a_job_are_paged_by_date(client):
+  doc = load_json("documents.json")[0]
+  docs = sorted(
+    (d for d in load_json("documents.json") if d.get("jobId") == doc["jobId"]),
+    key=lambda d: (d.get("uploadedAt") or "", d["id"]),
+    reverse=True,
+  )
+  assert _walk(client, "/documents/", 1, job_id=doc["jobId"]) == [d["id"] for d in docs]
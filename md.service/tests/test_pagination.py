@@ -0,0 +1,139 @@
+"""Cursor sayfalaması: sayfalar arası ekleme / silme, geçersiz cursor, son sayfa"""
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, Page, encode_cursor
+
+RECORDS: list[dict] = []
+
+
+def _rank(record: dict) -> int:
+  return record["rank"]
+
+
+def _day(record: dict) -> str:
+  return record["day"]
+
+
+app = FastAPI()
+
+
+@app.get("/stored")
+def stored(page: Page = Depends()):
+  return page.apply(list(RECORDS))
+
+
+@app.get("/ranked")
+def ranked(page: Page = Depends()):
+  return page.apply(sorted(RECORDS, key=lambda rec: (rec["rank"], rec["id"])), key=_rank)
+
+
+@app.get("/recent")
+def recent(page: Page = Depends()):
+  # yeniden eskiye keyset: (day, id) ters sırada
+  return page.apply(sorted(RECORDS, key=lambda rec: (rec["day"], rec["id"]), reverse=True), key=_day, descending=True)
+
+
+@app.get("/ledger")
+def ledger(page: Page = Depends()):
+  # eklenen akış: en yeni gün önce, aynı gün depo sırasında
+  rows = sorted(RECORDS, key=_day, reverse=True)
+  return page.apply(iter(rows), total=len(rows), key=_day, descending=True)
+
+
+@pytest.fixture
+def client():
+  RECORDS[:] = [{"id": f"R{i:02d}", "rank": i % 4, "day": f"2026-01-{1 + i // 3:02d}"} for i in range(10)]
+  return TestClient(app)
+
+
+def _ids(response) -> list[str]:
+  return [rec["id"] for rec in response.json()]
+
+
+def _walk(client, path: str, limit: int, between=None) -> list[str]:
+  seen, cursor = [], None
+  while True:
+    response = client.get(path, params={"limit": limit, **({"cursor": cursor} if cursor else {})})
+    assert response.status_code == 200
+    seen += _ids(response)
+    cursor = response.headers.get(NEXT_CURSOR_HEADER)
+    if cursor is None:
+      return seen
+    if between:
+      between(seen)
+      between = None
+
+
+@pytest.mark.parametrize("path", ["/stored", "/ranked", "/recent", "/ledger"])
+@pytest.mark.parametrize("limit", [1, 3, 10])
+def test_walk_returns_every_record_once(client, path, limit):
+  full = _ids(client.get(path))
+  assert sorted(full) == sorted(rec["id"] for rec in RECORDS)
+  assert _walk(client, path, limit) == full
+
+
+@pytest.mark.parametrize("path", ["/stored", "/ranked", "/ledger"])
+def test_last_page_has_no_cursor(client, path):
+  response = client.get(path, params={"limit": len(RECORDS)})
+  assert NEXT_CURSOR_HEADER not in response.headers
+  assert response.headers[TOTAL_COUNT_HEADER] == str(len(RECORDS))
+
+
+@pytest.mark.parametrize("path", ["/stored", "/ranked", "/recent"])
+def test_deleted_anchor_resumes_at_next_record(client, path):
+  full = _ids(client.get(path))
+
+  def delete_anchor(seen):
+    RECORDS.remove(next(rec for rec in RECORDS if rec["id"] == seen[-1]))
+
+  assert _walk(client, path, 3, between=delete_anchor) == full
+
+
+def test_insert_before_anchor_does_not_repeat(client):
+  full = _ids(client.get("/stored"))
+  new = {"id": "NEW", "rank": 0, "day": "2026-01-01"}
+
+  def insert_first(seen):
+    RECORDS.insert(0, new)
+
+  assert _walk(client, "/stored", 3, between=insert_first) == full
+
+
+def test_insert_after_anchor_is_returned(client):
+  full = _ids(client.get("/ranked"))
+  new = {"id": "R99", "rank": 3, "day": "2026-01-09"}
+
+  def insert_later(seen):
+    RECORDS.append(new)
+
+  assert _walk(client, "/ranked", 3, between=insert_later) == full + ["R99"]
+
+
+def test_insert_newer_than_anchor_does_not_repeat(client):
+  full = _ids(client.get("/recent"))
+
+  def insert_newest(seen):
+    RECORDS.append({"id": "R99", "rank": 0, "day": "2026-02-01"})
+
+  assert _walk(client, "/recent", 3, between=insert_newest) == full
+
+
+def test_stream_continues_after_cursor(client):
+  first = client.get("/ranked", params={"limit": 4})
+  cursor = first.headers[NEXT_CURSOR_HEADER]
+  rest = client.get("/ranked", params={"cursor": cursor, "stream": "true"})
+  assert _ids(first) + _ids(rest) == _ids(client.get("/ranked"))
+
+
+@pytest.mark.parametrize("path", ["/stored", "/ranked", "/ledger"])
+@pytest.mark.parametrize("cursor", ["%%%", "bm90LWpzb24", encode_cursor("x", "R01")[:-2], "W251bGwsMV0"])
+def test_malformed_cursor_is_rejected(client, path, cursor):
+  assert client.get(path, params={"cursor": cursor}).status_code == 400
+
+
+@pytest.mark.parametrize("path", ["/stored", "/ranked", "/ledger"])
+def test_cursor_of_another_ordering_is_rejected(client, path):
+  cursor = encode_cursor(-1 if path == "/ledger" else "2026-01-01", "R01")
+  assert client.get(path, params={"cursor": cursor}).status_code == 400
@@ -0,0 +1,49 @@
+"""İyimser eşzamanlılık: kayıt revizyonları, If-Match (409) ve expected_rev"""
+import pytest
+
+from app.data_loader import ConflictError, get_by_id, load_json, record_etag, record_rev, update_one
+
+
+@pytest.fixture
+def job(client):
+  return load_json("jobs.json")[0]
+
+
+def test_get_record_sends_etag(client, job):
+  response = client.get(f"/jobs/{job['id']}")
+  assert response.status_code == 200
+  assert response.headers["ETag"] == record_etag(response.json())
+
+
+def test_if_match_with_current_etag_writes(client, job):
+  etag = client.get(f"/jobs/{job['id']}").headers["ETag"]
+  response = client.put(f"/jobs/{job['id']}/production", json={"status": "URETIMDE"}, headers={"If-Match": etag})
+  assert response.status_code == 200
+  assert response.headers["ETag"] != etag
+  assert response.headers["ETag"] == record_etag(get_by_id("jobs.json", job["id"]))
+
+
+def test_if_match_with_stale_etag_conflicts(client, job):
+  etag = client.get(f"/jobs/{job['id']}").headers["ETag"]
+  assert client.put(f"/jobs/{job['id']}/production", json={"status": "URETIMDE"}, headers={"If-Match": etag}).status_code == 200
+  rev = record_rev(get_by_id("jobs.json", job["id"]))
+
+  response = client.put(f"/jobs/{job['id']}/production", json={"status": "URETIMDE"}, headers={"If-Match": etag})
+  assert response.status_code == 409
+  assert record_rev(get_by_id("jobs.json", job["id"])) == rev
+
+
+def test_update_with_stale_revision_conflicts(data_dir):
+  job = load_json("jobs.json")[0]
+  rev = record_rev(job)
+  assert record_rev(update_one("jobs.json", job["id"], {"title": "ilk"}, expected_rev=rev)) == rev + 1
+  with pytest.raises(ConflictError):
+    update_one("jobs.json", job["id"], {"title": "ikinci"}, expected_rev=rev)
+  assert get_by_id("jobs.json", job["id"])["title"] == "ilk"
+
+
+def test_unchanged_patch_keeps_revision(data_dir):
+  job = load_json("jobs.json")[0]
+  update_one("jobs.json", job["id"], {"title": "aynı"})
+  current = get_by_id("jobs.json", job["id"])
+  assert update_one("jobs.json", job["id"], {"title": "aynı"}) == current
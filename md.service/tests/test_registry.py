@@ -0,0 +1,67 @@
+"""Alan modüllerinin veri katmanına kaydı: türetilmiş alanlar, sıralı ve arama indeksleri"""
+import ast
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app import data_loader
+from app.data_loader import (
+  load_json,
+  register_computed,
+  register_sorted_index,
+  save_json,
+  sorted_index,
+  update_one,
+)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+  # kayıtlar süreç geneli: test kendi eklediklerini geri alır
+  for name in ("COMPUTED", "SORTED_INDEXES", "SEARCH_INDEXES"):
+    monkeypatch.setattr(data_loader, name, {filename: dict(value) if isinstance(value, dict) else value
+                                            for filename, value in getattr(data_loader, name).items()})
+
+
+def _imports(path: Path) -> set[str]:
+  tree = ast.parse(path.read_text(encoding="utf-8"))
+  return {node.module for node in ast.walk(tree) if isinstance(node, ast.ImportFrom) and node.level}
+
+
+def test_data_layer_imports_no_domain_module():
+  imports = _imports(Path(data_loader.__file__))
+  assert imports and all(module.startswith("storage") for module in imports)
+
+
+def test_domain_modules_register_at_import():
+  from app import allocation, search, stock_levels
+
+  assert data_loader.COMPUTED["stockItems.json"] is stock_levels.stock_levels
+  assert data_loader.SORTED_INDEXES["stockItems.json"]["critical"] is stock_levels.by_shortage
+  assert data_loader.SEARCH_INDEXES["reservations.json"]["pending"] is allocation.ReservationQueues
+  assert data_loader.SEARCH_INDEXES["stockItems.json"]["items"] is search.StockSearchIndex
+
+
+def test_registering_computed_fields_refreshes_cached_records(data_dir, registry):
+  save_json("olcum.json", [{"id": "A", "en": 2, "boy": 3}])
+  assert "alan" not in load_json("olcum.json")[0]
+
+  register_computed("olcum.json", lambda rec: {"alan": rec["en"] * rec["boy"]})
+  assert load_json("olcum.json")[0]["alan"] == 6
+  assert update_one("olcum.json", "A", {"en": 4})["alan"] == 12
+
+
+def test_registered_sorted_index_follows_writes(data_dir, registry):
+  save_json("sira.json", [{"id": "A", "n": 3}, {"id": "B", "n": 1}, {"id": "C"}])
+  register_sorted_index("sira.json", "n", lambda rec: (rec["n"],) if "n" in rec else None)
+  assert [rec["id"] for rec in sorted_index("sira.json", "n")] == ["B", "A"]
+  update_one("sira.json", "C", {"n": 2})
+  assert [rec["id"] for rec in sorted_index("sira.json", "n")] == ["B", "C", "A"]
+
+
+def test_modules_reading_computed_fields_register_them():
+  # routers import edilmeden (ör. bakım betikleri) de stok alanları tanımlıdır
+  code = "import app.stock_analytics, app.data_loader as d; assert 'stockItems.json' in d.COMPUTED"
+  subprocess.run([sys.executable, "-c", code], cwd=Path(data_loader.__file__).parent.parent, check=True)
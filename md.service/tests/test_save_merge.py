@@ -0,0 +1,69 @@
+"""Tüm koleksiyon kaydı (save_json): isteğin okuduğu hâle karşı üç yönlü birleştirme"""
+import threading
+
+import pytest
+
+from app.data_loader import (
+  ConflictError,
+  bind_request,
+  get_by_id,
+  iter_records,
+  load_json,
+  save_json,
+  unbind_request,
+  update_one,
+)
+
+
+def _in_request(work):
+  _, token = bind_request(None, "/test")
+  try:
+    return work()
+  finally:
+    unbind_request(token)
+
+
+def _other_writer(work) -> None:
+  # başka bir worker: kendi thread'i, bağlı istek durumu yok
+  thread = threading.Thread(target=work)
+  thread.start()
+  thread.join()
+
+
+def test_concurrent_write_to_another_record_is_kept(data_dir):
+  def request():
+    jobs = load_json("jobs.json")
+    _other_writer(lambda: update_one("jobs.json", jobs[1]["id"], {"title": "başka"}))
+    jobs[0]["title"] = "benim"
+    save_json("jobs.json", jobs)
+    return jobs
+
+  jobs = _in_request(request)
+  assert get_by_id("jobs.json", jobs[0]["id"])["title"] == "benim"
+  assert get_by_id("jobs.json", jobs[1]["id"])["title"] == "başka"
+
+
+def test_both_sides_changing_a_record_conflicts(data_dir):
+  def request():
+    jobs = load_json("jobs.json")
+    _other_writer(lambda: update_one("jobs.json", jobs[0]["id"], {"title": "başka"}))
+    jobs[0]["title"] = "benim"
+    save_json("jobs.json", jobs)
+
+  with pytest.raises(ConflictError):
+    _in_request(request)
+
+
+def test_earlier_requests_read_is_not_the_ancestor(data_dir):
+  job = load_json("jobs.json")[0]
+  _in_request(lambda: load_json("jobs.json"))
+  _other_writer(lambda: update_one("jobs.json", job["id"], {"title": "başka"}))
+
+  def request():
+    # okuma load_json ile değil: bu isteğin ortak atası yok, kayıt olduğu gibi yazılır
+    jobs = list(iter_records("jobs.json"))
+    jobs[0]["title"] = job.get("title")
+    save_json("jobs.json", jobs)
+
+  _in_request(request)
+  assert get_by_id("jobs.json", job["id"]).get("title") == job.get("title")
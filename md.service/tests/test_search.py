@@ -0,0 +1,67 @@
+"""Stok arama indeksi: Türkçe harf katlaması, sıralama, yazmalarla güncel kalma"""
+import pytest
+
+from app.search import StockSearchIndex, fold
+
+
+def _item(client, product_code: str, name: str, color_name: str = "Doğal") -> str:
+  response = client.post("/stock/items", json={
+    "productCode": product_code, "colorCode": "RK1", "name": name, "colorName": color_name, "unit": "adet", "supplierId": "SUP-T",
+  })
+  assert response.status_code == 201
+  return response.json()["id"]
+
+
+def _search(client, q: str) -> list[str]:
+  response = client.get("/stock/items/search", params={"q": q})
+  assert response.status_code == 200
+  return [item["id"] for item in response.json()]
+
+
+@pytest.mark.parametrize("text, folded", [
+  ("Işık", "isik"),
+  ("IŞIK", "isik"),
+  ("Şişe", "sise"),
+  ("İĞNE ÇÖZÜM", "igne cozum"),
+  ("Gümüş Gri", "gumus gri"),
+  (None, ""),
+])
+def test_fold_maps_turkish_letters_to_ascii(text, folded):
+  assert fold(text) == folded
+
+
+@pytest.mark.parametrize("query", ["isik", "Işık", "IŞIK", "ışı"])
+def test_ascii_and_turkish_queries_find_turkish_names(client, query):
+  item_id = _item(client, "ZX-100", "Işık Bandı")
+  assert item_id in _search(client, query)
+
+
+def test_ascii_query_finds_color_name_substring(client):
+  item_id = _item(client, "ZX-200", "Cam", color_name="Şişe Yeşili")
+  assert item_id in _search(client, "sise")
+  assert item_id in _search(client, "esil")
+
+
+def test_code_matches_rank_before_name_matches():
+  index = StockSearchIndex([
+    {"id": "A", "productCode": "X-1", "name": "kasa kasi"},
+    {"id": "B", "productCode": "KASA-2", "name": "profil"},
+    {"id": "C", "productCode": "Y-3", "name": "Kasa"},
+  ])
+  assert index.search(q="kasa") == ["B", "A", "C"]
+  assert index.search(q="asa") == ["B", "A", "C"]
+  assert index.search(q="kasa", limit=1) == ["B"]
+
+
+def test_index_follows_record_writes(client):
+  item_id = _item(client, "ZX-300", "Çıta")
+  assert item_id in _search(client, "cita")
+  assert client.put(f"/stock/items/{item_id}", json={"name": "Köşebent"}).status_code == 200
+  assert item_id not in _search(client, "cita")
+  assert item_id in _search(client, "kosebent")
+
+
+def test_code_prefix_filter(client):
+  item_id = _item(client, "ÖZEL-1", "Vida")
+  response = client.get("/stock/items", params={"productCode": "ozel"})
+  assert [item["id"] for item in response.json()] == [item_id]
@@ -0,0 +1,77 @@
+"""SQLite arka ucu: içe aktarma, satır bazlı yazma, tek işlemde commit"""
+import pytest
+
+from app.data_loader import clear_cache, insert_one, load_json, update_one
+from app.storage.importer import import_json_dir
+from app.storage.journal import delete_op, insert_op, patch_op
+from app.storage.json_backend import JsonBackend
+from app.storage.sqlite_backend import KIND_DOCUMENT, SqliteBackend
+
+
+@pytest.fixture
+def sqlite(data_dir, tmp_path):
+  return SqliteBackend(tmp_path / "test.sqlite3")
+
+
+def _kind(sqlite: SqliteBackend, filename: str) -> str:
+  return sqlite.connection().execute("SELECT kind FROM collections WHERE name = ?", (filename,)).fetchone()[0]
+
+
+def test_import_reads_back_every_collection(sqlite, data_dir):
+  result = import_json_dir(data_dir, sqlite)
+  assert result["imported"] and not result["skipped"]
+  source = JsonBackend(data_dir)
+  for filename in result["imported"]:
+    assert sqlite.read(filename)[1] == source.read(filename)[1], filename
+  assert import_json_dir(data_dir, sqlite)["skipped"] == result["imported"]
+
+
+def test_record_writes_bump_the_version(backend):
+  jobs = load_json("jobs.json")
+  before = backend.signature("jobs.json")
+  update_one("jobs.json", jobs[0]["id"], {"title": "sqlite"})
+  assert backend.signature("jobs.json") != before
+  clear_cache()
+  after = load_json("jobs.json")
+  assert after[0]["title"] == "sqlite"
+  assert after[1:] == jobs[1:]
+
+
+def test_insert_keeps_collection_order(backend):
+  ids = [rec["id"] for rec in load_json("jobs.json")]
+  insert_one("jobs.json", {"id": "JOB-BAS", "title": "başa"})
+  insert_one("jobs.json", {"id": "JOB-SON", "title": "sona"}, at="end")
+  clear_cache()
+  assert [rec["id"] for rec in load_json("jobs.json")] == ["JOB-BAS", *ids, "JOB-SON"]
+
+
+def test_ops_on_missing_collection_create_it(sqlite):
+  sqlite.commit({}, {"yeni.json": [insert_op({"id": "A", "n": 1}), insert_op({"id": "B", "n": 2}, "end")]})
+  assert sqlite.read("yeni.json")[1] == [{"id": "A", "n": 1}, {"id": "B", "n": 2}]
+  assert sqlite.signature("yeni.json") == (1,)
+
+
+def test_ops_on_document_collection_rewrite_the_document(sqlite):
+  # id'si metin olmayan kayıtlar tek belge olarak saklanır
+  sqlite.write("sayilar.json", [{"id": 1, "n": 1}, {"id": 2, "n": 2}])
+  assert _kind(sqlite, "sayilar.json") == KIND_DOCUMENT
+  version = sqlite.signature("sayilar.json")
+
+  sqlite.commit({}, {"sayilar.json": [patch_op(1, {"n": 10}), delete_op(2), insert_op({"id": 3, "n": 3}, "end")]})
+  assert sqlite.read("sayilar.json")[1] == [{"id": 1, "n": 10}, {"id": 3, "n": 3}]
+  assert sqlite.signature("sayilar.json") == (version[0] + 1,)
+
+
+def test_failed_commit_writes_nothing(sqlite):
+  sqlite.write("kayitlar.json", [{"id": "A", "n": 1}])
+  sqlite.write("ayarlar.json", {"tema": "koyu"})
+  before = (sqlite.signature("kayitlar.json"), sqlite.signature("ayarlar.json"))
+
+  with pytest.raises(ValueError):
+    sqlite.commit({}, {
+      "kayitlar.json": [patch_op("A", {"n": 2})],
+      "ayarlar.json": [patch_op("tema", {"n": 2})],  # liste değil: op uygulanamaz
+    })
+  assert sqlite.read("kayitlar.json")[1] == [{"id": "A", "n": 1}]
+  assert sqlite.read("ayarlar.json")[1] == {"tema": "koyu"}
+  assert (sqlite.signature("kayitlar.json"), sqlite.signature("ayarlar.json")) == before
@@ -0,0 +1,96 @@
+"""Stok analitiği: tüketim hızı, emniyet stoğu, yeniden sipariş noktası, EOQ ve öneri sırası"""
+import json
+import math
+from datetime import date
+from statistics import NormalDist
+
+import pytest
+
+from app import ledger
+from app.data_loader import load_json, save_json
+from app.ledger import LEGACY_MOVEMENTS, ensure_ledger
+from app.stock_analytics import _usage, reorder_suggestions
+from app.stock_levels import pending_quantities
+
+TODAY = date(2026, 1, 20)
+LEGACY = [
+  {"id": "M3", "date": "2026-01-16", "itemId": "A", "change": -10, "type": "stockOut"},
+  {"id": "M2", "date": "2026-01-11", "itemId": "A", "change": -10, "type": "consume"},
+  {"id": "M1", "date": "2026-01-02", "itemId": "A", "change": -50, "type": "stockOut"},  # pencere dışı
+]
+
+
+@pytest.fixture
+def analytics(data_dir, monkeypatch):
+  monkeypatch.setattr(ledger, "_today", lambda: TODAY.isoformat())
+  (data_dir / LEGACY_MOVEMENTS).write_text(json.dumps(LEGACY), encoding="utf-8")
+  save_json("stockItems.json", [
+    {"id": "B", "productCode": "P-B", "colorCode": "1", "supplierId": "S9", "onHand": 100, "reserved": 0, "critical": 0},
+    {"id": "A", "productCode": "P-A", "colorCode": "1", "supplierId": "S1", "onHand": 5, "reserved": 0, "critical": 0, "unitCost": 10},
+  ])
+  save_json("suppliers.json", [{"id": "S1", "name": "Birinci", "leadTimeDays": 5}])
+  save_json("purchaseOrders.json", [
+    {"id": "PO-1", "status": "sent", "items": [{"productCode": "P-A", "colorCode": "1", "quantity": 5}]},
+    {"id": "PO-2", "status": "received", "items": [{"productCode": "P-A", "colorCode": "1", "quantity": 40}]},
+  ])
+  ensure_ledger()
+  return data_dir
+
+
+def test_usage_counts_days_without_demand_as_zero():
+  daily, sigma = _usage({0: 10}, 10)
+  assert daily == 1
+  assert sigma == pytest.approx(3)
+  assert _usage({}, 30) == (0, 0)
+
+
+def test_pending_quantities_skip_closed_orders_and_received_amounts():
+  orders = [
+    {"status": "draft", "items": [{"productCode": "X", "colorCode": "1", "quantity": 4}]},
+    {"status": "partial", "items": [{"productCode": "X", "colorCode": "1", "quantity": 10, "receivedQty": 7}]},
+    {"status": "partial", "items": [{"productCode": "Y", "colorCode": "2", "quantity": 3, "receivedQty": 3}]},
+    {"status": "received", "items": [{"productCode": "X", "colorCode": "1", "quantity": 99}]},
+  ]
+  assert pending_quantities(orders) == {"X_1": 7}
+
+
+def test_reorder_rows_follow_the_formulas(analytics):
+  rows = reorder_suggestions(window_days=10, order_cost=250, holding_rate=0.25, service_level=0.95, today=TODAY)
+  assert [row["id"] for row in rows] == ["A", "B"]  # en acil önce
+  a, b = rows
+
+  daily, sigma, lead = 2.0, 4.0, 5.0  # 20 birim / 10 gün; iki günde 10'ar
+  safety = NormalDist().inv_cdf(0.95) * sigma * math.sqrt(lead)
+  eoq = math.sqrt(2 * daily * 365 * 250 / (10 * 0.25))
+  assert a["dailyUsage"] == daily
+  assert a["daysOfCover"] == 2.5
+  assert a["leadTimeDays"] == lead
+  assert a["safetyStock"] == round(safety, 2)
+  assert a["reorderPoint"] == round(daily * lead + safety, 2)
+  assert a["pendingInOrders"] == 5
+  assert a["eoq"] == round(eoq, 2)
+  assert a["needsOrder"] and a["suggestedQty"] == math.ceil(eoq)
+
+  assert b["dailyUsage"] == 0 and b["daysOfCover"] is None
+  assert b["leadTimeDays"] == 7  # tedarikçi süresi yok: varsayılan
+  assert not b["needsOrder"] and b["suggestedQty"] == 0
+
+
+def test_critical_level_is_the_minimum_reorder_point(analytics):
+  items = load_json("stockItems.json")
+  items[0]["critical"] = 150
+  save_json("stockItems.json", items)
+  row = next(row for row in reorder_suggestions(today=TODAY) if row["id"] == "B")
+  assert row["reorderPoint"] == 150
+  assert row["needsOrder"] and row["suggestedQty"] == 50
+
+
+def test_reorder_endpoint(analytics, client):
+  # gerçek tarihe bağlı olmamak için öneri kritik seviyeden gelir
+  items = load_json("stockItems.json")
+  items[1]["critical"] = 50
+  save_json("stockItems.json", items)
+  rows = client.get("/stock/analytics/reorder", params={"onlyNeeded": True}).json()
+  assert [row["id"] for row in rows] == ["A"]
+  assert rows[0]["suggestedQty"] >= 40
+  assert client.get("/stock/analytics/reorder", params={"windowDays": 3}).status_code == 422
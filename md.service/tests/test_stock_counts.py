@@ -0,0 +1,81 @@
+"""Stok sayımı: partiler, aynı kalemin tekrar okutulması, sayım anındaki defter değeri ve kapanış"""
+from app.data_loader import find_by, get_by_id, load_json
+from app.stock_counts import COUNT_LINES
+
+
+def _open(client, item_ids: list[str]) -> dict:
+  response = client.post("/stock/counts", json={"itemIds": item_ids, "operator": "test"})
+  assert response.status_code == 201
+  return response.json()
+
+
+def _scan(client, session_id: str, lines: list[dict], batch_id: str | None = None) -> dict:
+  response = client.post(f"/stock/counts/{session_id}/scans", json={"batchId": batch_id, "lines": lines})
+  assert response.status_code == 200
+  return response.json()
+
+
+def _move(client, item_id: str, qty: float, type: str = "stockIn") -> None:
+  assert client.post("/stock/movements", json={"itemId": item_id, "qty": qty, "type": type}).status_code == 201
+
+
+def test_repeated_item_in_one_batch_updates_one_line(client):
+  item, other = load_json("stockItems.json")[:2]
+  session = _open(client, [item["id"]])
+  body = _scan(client, session["id"], [
+    {"itemId": item["id"], "qty": 2, "mode": "add"},
+    {"productCode": item["productCode"], "colorCode": item["colorCode"], "qty": 3, "mode": "add"},
+    {"itemId": other["id"], "qty": 1},
+  ], batch_id="B1")
+  assert body["applied"] == 2
+  assert [(error["line"], error["itemId"]) for error in body["errors"]] == [(3, other["id"])]
+  lines = find_by(COUNT_LINES, "sessionId", session["id"])
+  assert [(line["counted"], line["scans"]) for line in lines] == [(5, 2)]
+
+  # aynı parti tekrar gönderilirse işlenmez
+  again = _scan(client, session["id"], [{"itemId": item["id"], "qty": 2, "mode": "add"}], batch_id="B1")
+  assert again["duplicate"] and find_by(COUNT_LINES, "sessionId", session["id"])[0]["counted"] == 5
+  assert client.get(f"/stock/counts/{session['id']}").json()["countedItems"] == 1
+
+
+def test_older_offline_count_does_not_overwrite_newer(client):
+  item = load_json("stockItems.json")[0]
+  session = _open(client, [item["id"]])
+  _scan(client, session["id"], [{"itemId": item["id"], "qty": 7}])
+  body = _scan(client, session["id"], [{"itemId": item["id"], "qty": 9, "countedAt": session["snapshotAt"]}])
+  assert body["applied"] == 0 and body["errors"][0]["line"] == 1
+  assert find_by(COUNT_LINES, "sessionId", session["id"])[0]["counted"] == 7
+
+
+def test_variance_uses_book_value_at_count_time(client):
+  item = load_json("stockItems.json")[0]
+  on_hand = item["onHand"]
+  session = _open(client, [item["id"]])
+  _move(client, item["id"], 3)  # sayımdan önce: defter değerine girer
+  _scan(client, session["id"], [{"itemId": item["id"], "qty": on_hand + 1}])
+  _move(client, item["id"], 5)  # sayımdan sonra: farka girmez
+
+  report = client.get(f"/stock/counts/{session['id']}/variance").json()
+  row = report["lines"][0]
+  assert (row["expected"], row["bookQty"], row["delta"]) == (on_hand, on_hand + 3, -2)
+
+  response = client.post(f"/stock/counts/{session['id']}/post", json={"operator": "test"})
+  assert response.status_code == 200
+  assert [(a["delta"], a["change"]) for a in response.json()["adjustments"]] == [(-2, -2)]
+  assert get_by_id("stockItems.json", item["id"])["onHand"] == on_hand + 3 + 5 - 2
+  assert client.post(f"/stock/counts/{session['id']}/scans", json={"lines": []}).status_code == 400
+
+
+def test_zero_uncounted_and_cancel(client):
+  item, other = load_json("stockItems.json")[:2]
+  session = _open(client, [item["id"], other["id"]])
+  _scan(client, session["id"], [{"itemId": item["id"], "qty": item["onHand"]}])
+
+  report = client.get(f"/stock/counts/{session['id']}/variance").json()
+  assert report["uncounted"] == [other["id"]] and report["summary"]["withDifference"] == 0
+  report = client.get(f"/stock/counts/{session['id']}/variance", params={"zeroUncounted": True}).json()
+  assert report["uncounted"] == [] and report["summary"]["totalShortage"] == other["onHand"]
+
+  assert client.post(f"/stock/counts/{session['id']}/cancel").json()["status"] == "cancelled"
+  assert get_by_id("stockItems.json", other["id"])["onHand"] == other["onHand"]
+  assert client.post(f"/stock/counts/{session['id']}/post", json={}).status_code == 400
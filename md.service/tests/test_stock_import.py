@@ -0,0 +1,64 @@
+"""Stok kalemi içe / dışa aktarımı: Türkçe başlıklar, kod ile güncelleme, satır hataları, geri yükleme"""
+import io
+
+from app.data_loader import get_by_key, load_json
+from app.spreadsheet import read_rows
+
+
+def _import(client, content: str, filename: str = "stok.csv", **params) -> dict:
+  response = client.post(
+    "/stock/items/import",
+    params=params,
+    files={"file": (filename, content.encode("utf-8"), "text/csv")},
+  )
+  assert response.status_code == 200
+  return response.json()
+
+
+def test_turkish_headers_upsert_by_code(client):
+  item = load_json("stockItems.json")[0]
+  content = (
+    "ÜRÜN KODU,Renk Kodu,Ürün Adı,Birim,Tedarikçi Kodu,Eldeki,Kritik,Açıklama\n"
+    f"{item['productCode']},{item['colorCode']},,,,\"12,5\",,x\n"
+    "99001,7,YENİ PROFİL,boy,SUP-01,4,1,\n"
+    ",7,KODSUZ,boy,SUP-01,1,,\n"
+    "99001,7,TEKRAR,boy,SUP-01,1,,\n"
+  )
+  body = _import(client, content)
+  assert (body["rows"], body["created"], body["updated"], body["failed"]) == (4, 1, 1, 2)
+  assert [error["row"] for error in body["errors"]] == [4, 5]
+  assert body["ignoredColumns"] == ["Açıklama"]
+
+  updated = get_by_key("stockItems.json", "code", item["productCode"], item["colorCode"])
+  assert updated["id"] == item["id"]
+  # boş hücreler değiştirilmez
+  assert (updated["onHand"], updated["name"], updated["critical"]) == (12.5, item["name"], item["critical"])
+  created = get_by_key("stockItems.json", "code", "99001", "7")
+  assert (created["name"], created["onHand"], created["available"]) == ("YENİ PROFİL", 4, 4)
+
+
+def test_dry_run_counts_without_writing(client):
+  before = load_json("stockItems.json")
+  body = _import(client, "productCode,colorCode,name,unit,supplierId\n99002,1,DENEME,adet,SUP-01\n", dryRun=True)
+  assert (body["created"], body["dryRun"]) == (1, True)
+  assert load_json("stockItems.json") == before
+  assert get_by_key("stockItems.json", "code", "99002", "1") is None
+
+
+def test_new_item_missing_required_fields_is_a_row_error(client):
+  body = _import(client, "productCode,colorCode,name\n99003,1,EKSİK\n")
+  assert (body["created"], body["failed"]) == (0, 1)
+  assert body["errors"][0]["row"] == 2 and body["errors"][0]["productCode"] == "99003"
+
+
+def test_export_reimports_unchanged(client):
+  items = load_json("stockItems.json")
+  for format in ("csv", "xlsx"):
+    response = client.get("/stock/items/export", params={"format": format})
+    assert response.status_code == 200
+    rows = [row for _, row in read_rows(f"stok.{format}", io.BytesIO(response.content))]
+    assert [row["id"] for row in rows] == [item["id"] for item in items]
+
+    response = client.post("/stock/items/import", files={"file": (f"stok.{format}", response.content)})
+    body = response.json()
+    assert (body["created"], body["updated"], body["unchanged"], body["failed"]) == (0, 0, len(items), 0)
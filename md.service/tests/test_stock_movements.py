@@ -0,0 +1,54 @@
+"""Toplu stok hareketleri: satırlar sırayla doğrulanır; atomic hepsi ya da hiçbiri, bestEffort geçerlileri yazar"""
+from app.data_loader import get_by_id, load_json
+from app.ledger import movements
+
+
+def _batch(client, lines: list[dict], mode: str = "atomic"):
+  return client.post("/stock/movements/batch", json={"mode": mode, "movements": lines})
+
+
+def test_lines_see_earlier_lines(client):
+  item = load_json("stockItems.json")[0]
+  available = item["onHand"] - item["reserved"]
+  response = _batch(client, [
+    {"itemId": item["id"], "qty": 5, "type": "stockIn"},
+    {"itemId": item["id"], "qty": available + 5, "type": "stockOut"},
+  ])
+  assert response.status_code == 201
+  body = response.json()
+  assert (body["applied"], body["failed"]) == (2, 0)
+  assert [line["onHand"] for line in body["results"]] == [item["onHand"] + 5, item["onHand"] - available]
+  stored = get_by_id("stockItems.json", item["id"])
+  assert stored["onHand"] == item["onHand"] - available and stored["available"] == 0
+  written = {m["id"] for m in movements(item_id=item["id"])}
+  assert {line["movement"]["id"] for line in body["results"]} <= written
+
+
+def test_atomic_batch_with_an_invalid_line_writes_nothing(client):
+  item = load_json("stockItems.json")[0]
+  before = len(list(movements(item_id=item["id"])))
+  response = _batch(client, [
+    {"itemId": item["id"], "qty": 3, "type": "stockIn"},
+    {"itemId": "STK-YOK", "qty": 1, "type": "stockIn"},
+    {"itemId": item["id"], "qty": 1, "type": "transfer"},
+  ])
+  assert response.status_code == 400
+  errors = response.json()["detail"]["errors"]
+  assert [(error["line"], error["itemId"]) for error in errors] == [(2, "STK-YOK"), (3, item["id"])]
+  assert get_by_id("stockItems.json", item["id"]) == item
+  assert len(list(movements(item_id=item["id"]))) == before
+
+
+def test_best_effort_skips_invalid_lines(client):
+  item = load_json("stockItems.json")[0]
+  response = _batch(client, [
+    {"itemId": item["id"], "qty": 0, "type": "stockIn"},
+    {"itemId": item["id"], "qty": 2, "type": "reserve"},
+  ], mode="bestEffort")
+  assert response.status_code == 201
+  body = response.json()
+  assert [line["status"] for line in body["results"]] == ["error", "ok"]
+  assert get_by_id("stockItems.json", item["id"])["reserved"] == item["reserved"] + 2
+
+  response = _batch(client, [{"itemId": "STK-YOK", "qty": 1, "type": "stockIn"}], mode="bestEffort")
+  assert response.status_code == 200 and response.json()["applied"] == 0
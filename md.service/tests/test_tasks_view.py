@@ -0,0 +1,75 @@
+"""GET /tasks görünümü: atama / atama kaldırma görünümü yeniden kurmaz, ilgili satırı günceller"""
+import pytest
+
+from app.data_loader import load_json
+from app.routers import tasks
+
+SOURCES = ("tasks.json", "task_assignments.json", "personnel.json", "teams.json")
+build_task_view = tasks._build_task_view
+
+
+@pytest.fixture
+def builds(client, monkeypatch):
+  calls = []
+
+  def counted(*collections):
+    calls.append(1)
+    return build_task_view(*collections)
+
+  monkeypatch.setattr(tasks, "_build_task_view", counted)
+  return calls
+
+
+def _fresh_view() -> dict:
+  return build_task_view(*(load_json(filename) for filename in SOURCES))
+
+
+def _listed(client, **params) -> list:
+  response = client.get("/tasks/", params=params)
+  assert response.status_code == 200
+  return response.json()
+
+
+def test_assign_and_unassign_patch_the_view(client, builds):
+  task = load_json("tasks.json")[-1]
+  person = load_json("personnel.json")[-1]
+  _listed(client)
+  assert len(builds) == 1
+
+  response = client.post(f"/tasks/{task['id']}/assign", json={"assigneeType": "personnel", "assigneeId": person["id"]})
+  assert response.status_code == 200
+  rows = _listed(client)
+  assert len(builds) == 1
+  assert rows == _fresh_view()["tasks"]
+  assert task["id"] in [row["id"] for row in _listed(client, assigneeType="personnel", assigneeId=person["id"])]
+
+  assert client.delete(f"/tasks/{task['id']}/assign").status_code == 200
+  rows = _listed(client)
+  assert len(builds) == 1
+  row = next(row for row in rows if row["id"] == task["id"])
+  assert row["currentAssignments"] == [] and row["assigneeName"] is None
+  assert task["id"] not in [row["id"] for row in _listed(client, assigneeType="personnel", assigneeId=person["id"])]
+  assert rows == _fresh_view()["tasks"]
+
+
+def test_patched_index_matches_a_rebuild(client, builds):
+  all_tasks = [t for t in load_json("tasks.json") if not t.get("deleted")]
+  teams = load_json("teams.json")
+  for task in all_tasks[:4]:
+    client.post(f"/tasks/{task['id']}/assign", json={"assigneeType": "team", "assigneeId": teams[0]["id"]})
+  client.delete(f"/tasks/{all_tasks[1]['id']}/assign")
+  view = tasks._task_view()
+  assert len(builds) == 1
+
+  fresh = _fresh_view()
+  assert view["tasks"] == fresh["tasks"]
+  assert view["byAssignee"] == fresh["byAssignee"]
+
+
+def test_task_write_rebuilds_the_view(client, builds):
+  task = load_json("tasks.json")[0]
+  _listed(client)
+  assert client.patch(f"/tasks/{task['id']}/durum", params={"durum": "done"}).status_code == 200
+  rows = _listed(client)
+  assert len(builds) == 2
+  assert next(row for row in rows if row["id"] == task["id"])["durum"] == "done"
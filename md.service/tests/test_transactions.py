@@ -0,0 +1,154 @@
+"""Çok koleksiyonlu işlemler: çalışma kopyaları, tek revizyon ve write-ahead log'dan kurtarma"""
+import pytest
+
+from app.data_loader import DuplicateKeyError, clear_cache, get_by_id, get_by_key, load_json, record_rev, recover, transaction, update_one
+from app.storage.base import StorageBackend
+
+
+class Crash(Exception):
+  """İşlem kaydı (WAL) yazıldıktan sonra süreç çöktü"""
+
+
+@pytest.fixture
+def records(data_dir):
+  return load_json("jobs.json")[0], load_json("stockItems.json")[0]
+
+
+def _crash(monkeypatch, applied: bool) -> None:
+  # JsonBackend.commit WAL'ı yazar, sonra dosyaları StorageBackend.commit ile uygular
+  original = StorageBackend.commit
+
+  def commit(self, writes, ops):
+    if applied:
+      original(self, writes, ops)
+    raise Crash()
+
+  monkeypatch.setattr(StorageBackend, "commit", commit)
+
+
+def _write_both(job: dict, item: dict, value: str) -> None:
+  with transaction("jobs.json", "stockItems.json") as tx:
+    tx.update("jobs.json", job["id"], {"title": value})
+    tx.update("stockItems.json", item["id"], {"notes": value})
+
+
+def _wal_files(data_dir) -> list:
+  return list((data_dir / ".wal").glob("*.json"))
+
+
+def test_committed_transaction_is_replayed(data_dir, records, monkeypatch):
+  job, item = records
+  with monkeypatch.context() as patch:
+    _crash(patch, applied=False)
+    with pytest.raises(Crash):
+      _write_both(job, item, "kurtarıldı")
+
+  clear_cache()
+  assert get_by_id("jobs.json", job["id"])["title"] == job.get("title")
+  assert len(_wal_files(data_dir)) == 1
+
+  assert recover() == 1
+  assert get_by_id("jobs.json", job["id"])["title"] == "kurtarıldı"
+  assert get_by_id("stockItems.json", item["id"])["notes"] == "kurtarıldı"
+  assert _wal_files(data_dir) == []
+
+
+def test_replay_skips_collections_changed_since(data_dir, records, monkeypatch):
+  job, item = records
+  with monkeypatch.context() as patch:
+    _crash(patch, applied=True)
+    with pytest.raises(Crash):
+      _write_both(job, item, "ilk")
+
+  # İşlem uygulanmıştı; sonraki yazma kurtarmada geri alınmamalı
+  update_one("jobs.json", job["id"], {"title": "sonra"})
+  rev = record_rev(get_by_id("jobs.json", job["id"]))
+
+  assert recover() == 1
+  current = get_by_id("jobs.json", job["id"])
+  assert current["title"] == "sonra"
+  assert record_rev(current) == rev
+  assert get_by_id("stockItems.json", item["id"])["notes"] == "ilk"
+
+
+def test_recover_without_pending_transactions(data_dir):
+  assert recover() == 0
+
+
+def _reread(filename: str, record_id: str) -> dict:
+  clear_cache()
+  return get_by_id(filename, record_id)
+
+
+def test_rollback_writes_nothing(data_dir, records):
+  job, item = records
+  with transaction("jobs.json", "stockItems.json") as tx:
+    tx.update("jobs.json", job["id"], {"title": "deneme"})
+    tx.publish("job.updated", {"id": job["id"]})
+    tx.rollback()
+    with pytest.raises(ValueError):
+      tx.update("stockItems.json", item["id"], {"notes": "deneme"})
+
+  assert tx.rolled_back
+  clear_cache()
+  assert get_by_id("jobs.json", job["id"]) == job
+  assert _wal_files(data_dir) == []
+
+
+def test_update_back_to_stored_value_is_kept(backend):
+  item = load_json("stockItems.json")[0]
+  with transaction("stockItems.json") as tx:
+    tx.update("stockItems.json", item["id"], {"onHand": item["onHand"] + 7})
+    tx.update("stockItems.json", item["id"], {"onHand": item["onHand"]})
+  stored = _reread("stockItems.json", item["id"])
+  assert stored["onHand"] == item["onHand"]
+  assert stored["available"] == item["available"]
+  assert record_rev(stored) == record_rev(item) + 1
+
+
+def test_repeated_updates_bump_revision_once(backend):
+  item = load_json("stockItems.json")[0]
+  with transaction("stockItems.json") as tx:
+    tx.update("stockItems.json", item["id"], {"onHand": item["onHand"] + 1})
+    tx.update("stockItems.json", item["id"], {"notes": "iki"})
+    tx.update("stockItems.json", item["id"], {"onHand": item["onHand"] + 3})
+    assert sum(len(ops) for ops in tx._ops.values()) == 1
+  stored = _reread("stockItems.json", item["id"])
+  assert (stored["onHand"], stored["notes"]) == (item["onHand"] + 3, "iki")
+  assert record_rev(stored) == record_rev(item) + 1
+
+
+def test_working_copy_changes_are_diffed_against_transaction_state(backend):
+  item = load_json("stockItems.json")[0]
+  with transaction("stockItems.json") as tx:
+    copy = tx.get_by_id("stockItems.json", item["id"])
+    copy["onHand"] += 5
+    tx.update("stockItems.json", item["id"], copy)
+    assert copy["available"] == item["available"] + 5
+    copy["onHand"] -= 5
+    tx.update("stockItems.json", item["id"], copy)
+    assert tx.get_by_id("stockItems.json", item["id"]) is copy
+  assert _reread("stockItems.json", item["id"])["onHand"] == item["onHand"]
+
+
+def test_record_inserted_in_transaction_can_be_updated(backend):
+  with transaction("stockItems.json") as tx:
+    record = tx.insert("stockItems.json", {"id": "STK-YENI", "productCode": "T1", "colorCode": "9", "onHand": 3})
+    assert tx.get_by_id("stockItems.json", "STK-YENI") is record
+    assert tx.get_by_key("stockItems.json", "code", "T1", "9") is record
+    tx.update("stockItems.json", "STK-YENI", {"onHand": 8})
+    tx.update("stockItems.json", "STK-YENI", {"colorCode": "10"})
+    assert tx.get_by_key("stockItems.json", "code", "T1", "9") is None
+    assert sum(len(ops) for ops in tx._ops.values()) == 1
+  stored = _reread("stockItems.json", "STK-YENI")
+  assert (stored["onHand"], stored["available"], stored["colorCode"]) == (8, 8, "10")
+  assert record_rev(stored) == 1
+  assert get_by_key("stockItems.json", "code", "T1", "10")["id"] == "STK-YENI"
+
+
+def test_duplicate_key_within_transaction_is_rejected(backend):
+  with pytest.raises(DuplicateKeyError):
+    with transaction("stockItems.json") as tx:
+      tx.insert("stockItems.json", {"id": "STK-A", "productCode": "T2", "colorCode": "1"})
+      tx.insert("stockItems.json", {"id": "STK-B", "productCode": "T2", "colorCode": "1"})
+  assert _reread("stockItems.json", "STK-A") is None
@@ -0,0 +1,82 @@
+"""Akışlı belge yükleme: boyut sınırı, özet, alan doğrulaması ve geçici dosyaların temizlenmesi"""
+import hashlib
+
+from app.data_loader import get_by_id
+from app import uploads
+from app.routers import documents
+
+BOUNDARY = "sinir"
+
+
+def _tmp_files(docs) -> list:
+  return list((docs.root / "documents" / ".tmp").iterdir())
+
+
+def _post(client, fields: dict, content: bytes, filename: str = "olcu.pdf", content_type: str = "application/pdf"):
+  return client.post("/documents/upload", data=fields, files={"file": (filename, content, content_type)})
+
+
+def _file_first_body(fields: dict, content: bytes) -> bytes:
+  # Dosya parçası form alanlarından önce: alanlar gövde bitince doğrulanır
+  parts = [
+    f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="olcu.pdf"\r\n'
+    f"Content-Type: application/pdf\r\n\r\n".encode() + content + b"\r\n"
+  ]
+  for name, value in fields.items():
+    parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+  return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+def test_upload_is_hashed_and_stored(client, docs):
+  content = b"%PDF-1.4 " + b"x" * 200_000
+  response = _post(client, {"docType": "olcu", "jobId": "JOB-TEST", "description": "ölçü"}, content)
+  assert response.status_code == 200
+  doc = response.json()
+  assert doc["size"] == len(content)
+  assert doc["sha256"] == hashlib.sha256(content).hexdigest()
+  assert docs.path(doc["sha256"]).read_bytes() == content
+  assert get_by_id("documents.json", doc["id"])["description"] == "ölçü"
+  assert _tmp_files(docs) == []
+
+
+def test_file_over_the_limit_is_cut_off(client, docs, monkeypatch):
+  monkeypatch.setattr(documents, "MAX_FILE_SIZE", 1000)
+  response = _post(client, {"docType": "olcu", "jobId": "JOB-TEST"}, b"x" * 5000)
+  assert response.status_code == 413
+  assert _tmp_files(docs) == []
+
+  # Content-Length sınırın çok üstündeyse gövde okunmadan reddedilir
+  response = _post(client, {"docType": "olcu", "jobId": "JOB-TEST"}, b"x" * 200_000)
+  assert response.status_code == 413
+  assert _tmp_files(docs) == []
+
+
+def test_fields_before_the_file_are_checked_before_it_is_written(client, docs, monkeypatch):
+  created = []
+  mkstemp = uploads.tempfile.mkstemp
+  monkeypatch.setattr(uploads.tempfile, "mkstemp", lambda **kwargs: created.append(kwargs) or mkstemp(**kwargs))
+  assert _post(client, {"docType": "yok", "jobId": "JOB-TEST"}, b"%PDF").status_code == 400
+  assert _post(client, {"docType": "olcu"}, b"%PDF").status_code == 400
+  assert _post(client, {"docType": "olcu", "jobId": "JOB-TEST"}, b"MZ", "a.exe", "application/x-msdownload").status_code == 400
+  assert created == []
+  assert _tmp_files(docs) == []
+
+
+def test_fields_after_the_file_are_checked_at_the_end(client, docs):
+  def send(fields: dict):
+    return client.post(
+      "/documents/upload",
+      content=_file_first_body(fields, b"%PDF-1.4"),
+      headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+    )
+
+  assert send({"docType": "olcu"}).status_code == 400
+  assert _tmp_files(docs) == []
+  response = send({"docType": "olcu", "jobId": "JOB-TEST"})
+  assert response.status_code == 200 and response.json()["jobId"] == "JOB-TEST"
+
+
+def test_body_must_be_multipart_with_a_file(client, docs):
+  assert client.post("/documents/upload", json={"docType": "olcu"}).status_code == 400
+  assert client.post("/documents/upload", data={"docType": "olcu", "jobId": "JOB-TEST"}, files={}).status_code == 400
+
@@ -619,12 +619,13 @@ export const getJobDocuments = async (jobId) => fetchJson(`/documents/job/${jobI
 
 export const uploadDocument = async (file, jobId, docType, description = '', folderId = null, supplierId = null) => {
   const formData = new FormData();
-  formData.append('file', file);
+  // Alanlar dosyadan önce: sunucu onları dosya akmadan doğrular
   formData.append('docType', docType);
   if (jobId) formData.append('jobId', jobId);
   if (description) formData.append('description', description);
   if (folderId) formData.append('folderId', folderId);
   if (supplierId) formData.append('supplierId', supplierId);
+  formData.append('file', file);
 
   const response = await fetch(`${API_BASE}/documents/upload`, {
     method: 'POST',